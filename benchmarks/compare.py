@@ -0,0 +1,45 @@
+"""Compare two result files written by benchmarks/run.py
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as file:
+        data: Dict[str, Any] = json.load(file)
+    return data
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    print(
+        f"{'case':<55} {baseline['metadata']['commit']:>10} "
+        f"{candidate['metadata']['commit']:>10} {'change':>8}"
+    )
+    for key, result in candidate["results"].items():
+        if key not in baseline["results"]:
+            print(f"{key:<55} {'-':>10} {result['median_ms']:>10}")
+            continue
+        before = baseline["results"][key]["median_ms"]
+        after = result["median_ms"]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{key:<55} {before:>10} {after:>10} {change:>8}")
+        if baseline["results"][key]["output"] != result["output"]:
+            print(
+                f"  output changed: {baseline['results'][key]['output']} -> {result['output']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Measure worker boot time and memory with and without preloading
+
+This simulates what gunicorn does without needing it installed:
+the master forks a number of workers which each load the app
+(or get it from the master when preloading) and then handle a first
+request touching the heavy dependencies (language detection, PDF,
+XHTML and wikibaseintegrator).
+
+For each worker we report
+* boot_ms: from the fork until the app is importable
+* first_request_ms: the time the warm-up work took
+* rss_mb: resident memory
+* pss_mb: proportional share of the memory (Linux only), this is the
+  number that shows the effect of sharing pages copy-on-write
+
+Every mode runs in a fresh interpreter so the modes don't influence each other.
+
+Usage (from the repo root):
+    python -m benchmarks.measure_startup --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import mean
+from time import perf_counter
+from typing import Any, Dict, List
+
+modes = ["lazy", "preload"]
+
+
+def get_memory(pid: int) -> Dict[str, float]:
+    memory = {"rss_mb": 0.0, "pss_mb": 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as file:
+            for line in file:
+                key, value = line.split(":", 1)
+                if key in ["Rss", "Pss"]:
+                    memory[f"{key.lower()}_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        # Not Linux, fall back to the peak RSS of this process
+        import resource
+
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        memory["rss_mb"] = round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1
+        )
+    return memory
+
+
+def handle_first_request() -> None:
+    """Touch everything a worker will load during its first requests"""
+    from src.models.api.handlers.pdf import PdfHandler
+    from src.models.api.handlers.xhtml import XhtmlHandler
+    from src.models.api.job.check_url_job import UrlJob
+    from src.models.identifiers_checking.doi import get_wikibase_integrator
+
+    pdf = PdfHandler(job=UrlJob(url=""), file_path="test_data/test.pdf")
+    pdf.read_and_extract()
+    xhtml = XhtmlHandler(
+        job=UrlJob(url=""),
+        content=b"<html><body><p>"
+        + b"This is a sentence in English about the references. " * 10
+        + b'<a href="https://example.com">link</a></p></body></html>',
+    )
+    xhtml.__extract_links_and_text__()
+    xhtml.__detect_language__()
+    get_wikibase_integrator()
+
+
+def run_worker(write_fd: int, read_fd: int) -> None:
+    boot_start = perf_counter()
+    import wsgi
+
+    boot = perf_counter() - boot_start
+    request_start = perf_counter()
+    handle_first_request()
+    first_request = perf_counter() - request_start
+    os.write(
+        write_fd,
+        (
+            json.dumps(
+                {
+                    "boot_ms": round(boot * 1000, 1),
+                    "first_request_ms": round(first_request * 1000, 1),
+                }
+            )
+            + "\n"
+        ).encode(),
+    )
+    # Stay alive until the master measured the memory of all workers
+    os.read(read_fd, 1)
+    os._exit(0)  # noqa: SLF001
+
+
+def measure_mode(mode: str, workers: int) -> Dict[str, Any]:
+    """Run in a fresh interpreter, see main()"""
+    master_start = perf_counter()
+    if mode == "preload":
+        import wsgi
+        from src.helpers.preload import preload
+
+        preload()
+    master_boot = perf_counter() - master_start
+    report_read, report_write = os.pipe()
+    release_read, release_write = os.pipe()
+    pids: List[int] = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(write_fd=report_write, read_fd=release_read)
+        pids.append(pid)
+    reports: List[Dict[str, Any]] = []
+    with os.fdopen(report_read) as file:
+        for _ in range(workers):
+            reports.append(json.loads(file.readline()))
+    for pid, report in zip(pids, reports):
+        report.update(get_memory(pid=pid))
+    os.write(release_write, b"x" * workers)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "master_boot_ms": round(master_boot * 1000, 1),
+        "master": get_memory(pid=os.getpid()),
+        "mean": {
+            key: round(mean(report[key] for report in reports), 1) for key in reports[0]
+        },
+        "per_worker": reports,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="Write the results as json to this path")
+    # Used internally to run each mode in a fresh interpreter
+    parser.add_argument("--mode", choices=modes, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(measure_mode(mode=args.mode, workers=args.workers)))
+        return 0
+    results = []
+    for mode in modes:
+        output = subprocess.run(
+            [  # noqa: S603
+                sys.executable,
+                "-m",
+                "benchmarks.measure_startup",
+                "--mode",
+                mode,
+                "--workers",
+                str(args.workers),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        # Only the last line is ours, the app might print on stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(
+        f"{'mode':<10} {'master boot':>12} {'worker boot':>12} "
+        f"{'1st request':>12} {'worker rss':>11} {'worker pss':>11}"
+    )
+    for result in results:
+        print(
+            f"{result['mode']:<10} {result['master_boot_ms']:>9} ms "
+            f"{result['mean']['boot_ms']:>9} ms "
+            f"{result['mean']['first_request_ms']:>9} ms "
+            f"{result['mean']['rss_mb']:>8} MB {result['mean']['pss_mb']:>8} MB"
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Recording and replaying of HTTP fixtures so the benchmarks can run fully offline
+
+Every fixture is a json file in benchmarks/fixtures/http/ with the request
+(method, url and optionally the form data that must match) and the response
+(status code, headers and body).
+
+Everything going through requests is intercepted, that includes
+wikibaseintegrator. Requests without a matching fixture get a 404
+and are collected in ReplayAdapter.missing so the benchmark runner can fail.
+We don't raise a ConnectionError because wikibaseintegrator sleeps and
+retries on those."""
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from unittest.mock import patch
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+logger = logging.getLogger(__name__)
+
+fixtures_directory = Path(__file__).parent / "fixtures" / "http"
+
+
+def split_url(url: str):
+    parts = urlsplit(url)
+    base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+    return base, dict(parse_qsl(parts.query, keep_blank_values=True))
+
+
+def get_form_data(request: PreparedRequest) -> Dict[str, str]:
+    body = request.body
+    if not body:
+        return {}
+    if isinstance(body, bytes):
+        body = body.decode(errors="replace")
+    return dict(parse_qsl(body, keep_blank_values=True))
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Serve responses from the fixtures instead of the network"""
+
+    def __init__(self, fixtures: List[Dict[str, Any]]):
+        super().__init__()
+        self.fixtures = fixtures
+        self.missing: List[str] = []
+
+    def __find_fixture__(self, request: PreparedRequest) -> Optional[Dict[str, Any]]:
+        base, query = split_url(str(request.url))
+        data = get_form_data(request)
+        for fixture in self.fixtures:
+            fixture_base, fixture_query = split_url(fixture["url"])
+            if (
+                fixture["method"] == request.method
+                and fixture_base == base
+                and fixture_query == query
+                # The fixture only lists the form fields that identify the request
+                and all(
+                    data.get(key) == value
+                    for key, value in fixture.get("data", {}).items()
+                )
+            ):
+                return fixture
+        return None
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:  # type: ignore
+        fixture = self.__find_fixture__(request=request)
+        if not fixture:
+            message = f"{request.method} {request.url} {get_form_data(request)}"
+            logger.error(f"No fixture found for {message}")
+            self.missing.append(message)
+            fixture = {"status_code": 404, "body": "No fixture found"}
+        body = fixture["body"]
+        content = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        # A real raw response so streaming and closing work like on the network
+        raw = HTTPResponse(
+            body=BytesIO(content),
+            headers=fixture.get("headers", {}),
+            status=fixture["status_code"],
+            preload_content=False,
+        )
+        response = self.build_response(request, raw)
+        response.encoding = "utf-8"
+        return response
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Send the request to the network and store the response as a fixture"""
+
+    def __init__(self, directory: Path):
+        super().__init__()
+        self.directory = directory
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:  # type: ignore
+        response = super().send(request, **kwargs)
+        try:
+            body: Any = response.json()
+        except ValueError:
+            body = response.text
+        fixture = {
+            "method": request.method,
+            "url": request.url,
+            "data": get_form_data(request),
+            "status_code": response.status_code,
+            "headers": {
+                key: value
+                for key, value in response.headers.items()
+                if key.lower() in ["content-type", "etag", "last-modified"]
+            },
+            "body": body,
+        }
+        name = hashlib.md5(
+            f"{request.method} {request.url} {request.body!r}".encode()
+        ).hexdigest()[:8]
+        path = self.directory / f"{urlsplit(str(request.url)).netloc}-{name}.json"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(fixture, file, ensure_ascii=False, indent=4)
+        logger.info(f"Recorded {request.method} {request.url} to {path}")
+        return response
+
+
+def load_fixtures(directory: Path = fixtures_directory) -> List[Dict[str, Any]]:
+    fixtures = []
+    for path in sorted(directory.glob("*.json")):
+        with open(path) as file:
+            fixtures.append(json.load(file))
+    return fixtures
+
+
+@contextmanager
+def offline_http(
+    directory: Path = fixtures_directory, record: bool = False
+) -> Iterator[HTTPAdapter]:
+    """Route every request made with requests through the fixtures
+
+    When record is True the requests go to the network
+    and the responses are stored as fixtures instead"""
+    adapter: HTTPAdapter = (
+        RecordingAdapter(directory=directory)
+        if record
+        else ReplayAdapter(fixtures=load_fixtures(directory=directory))
+    )
+    with patch.object(requests.Session, "get_adapter", return_value=adapter):
+        yield adapter
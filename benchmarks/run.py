@@ -0,0 +1,299 @@
+"""Offline benchmark suite for the hot paths of IARI
+
+Every case runs against recorded inputs only:
+* wikitext from test_data/test_content.py
+* PDFs from test_data/
+* HTTP responses from benchmarks/fixtures/http/ (see replay.py)
+
+so the numbers are comparable between commits and machines without
+network noise. The results are written as json to benchmarks/results/
+so two runs can be compared with benchmarks/compare.py.
+
+Usage (from the repo root):
+    python -m benchmarks.run
+    python -m benchmarks.run --case extractor --rounds 10
+    python -m benchmarks.run --record  # refresh the http fixtures from the network
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+from unittest.mock import patch
+
+import config
+from benchmarks.replay import ReplayAdapter, offline_http
+from src.models.api.handlers.pdf import PdfHandler, debug_output_formats
+from src.models.api.handlers.xhtml import XhtmlHandler
+from src.models.api.job.article_job import ArticleJob
+from src.models.api.job.check_url_job import UrlJob
+from src.models.api.language_detection import language_detector
+from src.models.exceptions import LanguageDetectionError
+from src.models.file_io.hash_based import HashBasedFileIo
+from src.models.identifiers_checking.doi import Doi
+from src.models.wikimedia.wikipedia.analyzer import WikipediaAnalyzer
+from src.models.wikimedia.wikipedia.reference.extractor import (
+    WikipediaReferenceExtractor,
+)
+from test_data import test_content  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+results_directory = Path(__file__).parent / "results"
+regex = "bibliography|further reading|works cited|sources|external links"
+wikitexts = [
+    "easter_island_head_excerpt",
+    "electrical_breakdown_full_article",
+    "old_norse_sources",
+]
+pdfs = [
+    "test_data/test.pdf",
+    "test_data/d-ind-global.01-2022-pdf-e-184.pdf",
+    "test_data/mwg-fdr-document-04-16-23-1-270.pdf",
+    "test_data/FFO-FLASH-REPORT-REV.pdf",
+]
+large_pdf = "test_data/Addressing-College-Drinking-and-Drug-Use.pdf"
+
+
+def extract_references(name: str) -> Dict[str, Any]:
+    extractor = WikipediaReferenceExtractor(
+        wikitext=getattr(test_content, name), job=ArticleJob(regex=regex)
+    )
+    extractor.extract_all_references()
+    return {"references": extractor.number_of_references}
+
+
+def analyze_article() -> Dict[str, Any]:
+    job = ArticleJob(
+        url="https://en.wikipedia.org/wiki/Electrical_breakdown", regex=regex
+    )
+    job.__extract_url__()
+    statistics_ = WikipediaAnalyzer(job=job).get_statistics()
+    return {"references": len(statistics_["dehydrated_references"])}
+
+
+def extract_pdf(file_path: str) -> Dict[str, Any]:
+    handler = PdfHandler(job=UrlJob(url=""), file_path=file_path)
+    handler.read_and_extract()
+    data = handler.get_dict()
+    return {"pages": data["pages_total"], "characters": data["characters"]}
+
+
+@lru_cache(maxsize=None)
+def get_large_pdf() -> bytes:
+    """A 400 page PDF made of 10 copies of a test PDF with 40 pages"""
+    from fitz import Document  # type: ignore
+
+    large_document = Document()
+    with Document(large_pdf) as document:
+        for _ in range(10):
+            large_document.insert_pdf(document)
+    content: bytes = large_document.tobytes()
+    return content
+
+
+def extract_large_pdf(parallel: bool) -> Dict[str, Any]:
+    """The parallel case uses 4 processes, it only pays off with as many cores"""
+    with patch.multiple(
+        config,
+        pdf_parallel_extraction_min_pages=1 if parallel else 0,
+        pdf_parallel_extraction_max_workers=4,
+    ):
+        handler = PdfHandler(job=UrlJob(url=""), content=get_large_pdf())
+        handler.__extract_pages_and_links__()
+    return {"pages": handler.number_of_pages, "characters": len(handler.text)}
+
+
+def render_pdf_debug_outputs(file_path: str) -> Dict[str, Any]:
+    """What a request with debug=true and all 4 renderings costs"""
+    handler = PdfHandler(job=UrlJob(url=""), file_path=file_path)
+    handler.read_and_extract()
+    data = handler.get_dict(debug_outputs=debug_output_formats)
+    return {"renderings": len([key for key in data if key.startswith("debug_")])}
+
+
+@lru_cache(maxsize=None)
+def get_pdf_text(file_path: str) -> str:
+    handler = PdfHandler(job=UrlJob(url=""), file_path=file_path)
+    handler.read_and_extract()
+    return handler.text
+
+
+def detect_language(file_path: str) -> Dict[str, Any]:
+    """Only the detection, the text is extracted once in the warm-up round"""
+    text = get_pdf_text(file_path=file_path)
+    try:
+        language = language_detector.detect(text=text)
+    except LanguageDetectionError:
+        language = ""
+    return {"characters": len(text), "language": language}
+
+
+def extract_xhtml() -> Dict[str, Any]:
+    handler = XhtmlHandler(
+        job=UrlJob(url="https://www.example.org/recorded-report.xhtml")
+    )
+    handler.download_and_extract()
+    return {"links": handler.get_dict()["links_total"]}
+
+
+def lookup_doi() -> Dict[str, Any]:
+    doi = Doi(doi="10.1136/GUT.52.12.1678")
+    doi.lookup_doi()
+    return {"retracted": doi.marked_as_retracted_in_wikidata}
+
+
+def write_and_read_json() -> Dict[str, Any]:
+    job = ArticleJob(
+        url="https://en.wikipedia.org/wiki/Electrical_breakdown", regex=regex
+    )
+    job.__extract_url__()
+    data = WikipediaAnalyzer(job=job).get_statistics()
+    with TemporaryDirectory() as directory, patch.object(
+        config, "subdirectory_for_json", new=f"{directory}/"
+    ):
+        io = HashBasedFileIo(hash_based_id="benchmark", data=data)
+        io.write_to_disk()
+        io.data = {}
+        io.read_from_disk()
+    return {"keys": len(io.data)}
+
+
+def get_cases() -> Dict[str, Dict[str, Callable[[], Dict[str, Any]]]]:
+    """Return the cases grouped by the area of the code they exercise"""
+    return {
+        "extractor": {
+            name: lambda name=name: extract_references(name=name)  # type: ignore
+            for name in wikitexts
+        },
+        "analyzer": {"electrical_breakdown": analyze_article},
+        "pdf": {
+            Path(path).stem: lambda path=path: extract_pdf(file_path=path)  # type: ignore
+            for path in pdfs
+        },
+        "pdf_large": {
+            "serial": lambda: extract_large_pdf(parallel=False),
+            "parallel": lambda: extract_large_pdf(parallel=True),
+        },
+        "pdf_debug": {
+            Path(path).stem: lambda path=path: render_pdf_debug_outputs(  # type: ignore
+                file_path=path
+            )
+            for path in pdfs
+        },
+        "language": {
+            Path(path).stem: lambda path=path: detect_language(file_path=path)  # type: ignore
+            for path in pdfs
+        },
+        "xhtml": {"recorded_report": extract_xhtml},
+        "doi": {"gut": lookup_doi},
+        "file_io": {"electrical_breakdown": write_and_read_json},
+    }
+
+
+def measure(function: Callable[[], Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    """Run the function once to warm up and then the given number of rounds"""
+    output = function()
+    durations: List[float] = []
+    for _ in range(rounds):
+        start = perf_counter()
+        function()
+        durations.append((perf_counter() - start) * 1000)
+    return {
+        "rounds": rounds,
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "mean_ms": round(statistics.mean(durations), 3),
+        "stdev_ms": round(statistics.stdev(durations), 3) if rounds > 1 else 0.0,
+        # This makes it visible if an optimization changed the output
+        "output": output,
+    }
+
+
+def get_metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S603, S607
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "isodate": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def run(groups: List[str], rounds: int, record: bool = False) -> Dict[str, Any]:
+    cases = get_cases()
+    results: Dict[str, Any] = {}
+    with offline_http(record=record) as adapter:
+        for group in groups:
+            for name, function in cases[group].items():
+                key = f"{group}.{name}"
+                logger.info(f"Running {key}")
+                results[key] = measure(function=function, rounds=rounds)
+                print(
+                    f"{key:<55} median {results[key]['median_ms']:>10} ms "
+                    f"(min {results[key]['min_ms']} ms)"
+                )
+    missing = adapter.missing if isinstance(adapter, ReplayAdapter) else []
+    return {"metadata": get_metadata(), "results": results, "missing": missing}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--case",
+        action="append",
+        choices=list(get_cases().keys()),
+        help="Only run this group of cases (can be given multiple times)",
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--output", help="Path of the json result file (default: results/<commit>.json)"
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Use the network and store the responses as fixtures",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    data = run(
+        groups=args.case or list(get_cases().keys()),
+        rounds=args.rounds,
+        record=args.record,
+    )
+    path = (
+        Path(args.output)
+        if args.output
+        else results_directory / f"{data['metadata']['commit']}.json"
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(data, file, indent=4)
+    print(f"Results written to {path}")
+    if data["missing"]:
+        print("These requests had no fixture, record them with --record:")
+        for request in data["missing"]:
+            print(f"  {request}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
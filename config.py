@@ -1,4 +1,5 @@
 import logging
+import os
 import re
 
 # Settings:
@@ -8,3 +9,142 @@ link_extraction_regex = re.compile(
 subdirectory_for_json = "json/"  # create it manually before running the api
 loglevel = logging.ERROR
 user_agent = "IARI, see https://github.com/internetarchive/iari"
+
+# Profiling of individual requests via the profile=true parameter
+# It is allowed for everyone when enabled and otherwise only for
+# patrons sending the admin token in the X-Admin-Token header
+profiling_enabled = False
+profiling_admin_token = os.environ.get("IARI_PROFILING_ADMIN_TOKEN", "")
+profiling_number_of_top_functions = 25
+
+# Every request has a time budget, see src/models/api/deadline.py
+# It stays below the gunicorn timeout of 200 seconds so the patron gets a
+# partial result instead of a killed worker. Patrons can ask for less
+# with the deadline parameter but not for more.
+request_deadline_seconds = 180
+# The timeout of requests to the Wikipedia APIs and ORES
+wikimedia_api_timeout_seconds = 30
+
+# Guards against pathological wikitext, see src/models/wikimedia/wikipedia/reference/parsing.py
+# Larger or more deeply nested wikitext is refused with 422 without parsing it.
+# MediaWiki refuses to save pages larger than 2 MiB.
+wikitext_max_characters = 2_100_000
+wikitext_max_template_depth = 40
+# We stop extracting after this many references and mark the result incomplete
+wikitext_max_references = 5_000
+# Parse in a separate process that is killed after this much CPU time and answer 422.
+# It is off by default because sending the parsed wikitext back takes time too.
+wikitext_parse_in_subprocess = False
+wikitext_parse_max_cpu_seconds = 60
+wikitext_parse_start_method = "forkserver"
+
+# URL checking
+# We stream the response and stop reading the body after this many bytes
+url_check_max_bytes = 1_000_000
+# The total time allowed for checking a URL including redirects and reading the body
+url_check_max_seconds = 10
+# We only read the body of these content types, e.g. not of videos or PDFs
+url_check_text_content_types = [
+    "application/xhtml+xml",
+    "application/xml",
+    "text/html",
+    "text/plain",
+    "text/xml",
+]
+# Circuit breaker for hosts that are clearly down, see
+# src/models/identifiers_checking/host_health.py
+host_health_enabled = True
+# Failures in a row before we consider a host down. A nonexistent name counts immediately.
+host_health_failure_threshold = 3
+# How long we infer the results for a host that is down before probing it again
+host_health_ttl_seconds = 600
+# Hosts we keep a history for, the ones that failed longest ago are forgotten first.
+# A host is forgotten anyway after a TTL without failures or two TTLs down without a probe.
+host_health_max_hosts = 10_000
+# DNS cache, see src/models/identifiers_checking/dns_cache.py
+dns_timeout_seconds = 2
+dns_cache_max_ttl_seconds = 3600
+# Used for nonexistent names if the zone does not tell us
+dns_cache_negative_ttl_seconds = 300
+dns_cache_max_entries = 10_000
+dns_max_concurrent_lookups = 20
+# The testdeadlink API takes many URLs per request, see
+# src/models/identifiers_checking/testdeadlink.py
+testdeadlink_api_url = "https://iabot-api.archive.org/testdeadlink.php"
+testdeadlink_authcode = os.environ.get(
+    "IARI_TESTDEADLINK_AUTHCODE", "579331d2dc3f96739b7c622ed248a7d3"
+)
+testdeadlink_chunk_size = 50
+testdeadlink_max_concurrent_requests = 3
+testdeadlink_timeout_seconds = 60
+# The check-urls endpoint
+check_urls_max_urls = 1000
+# How many URLs are checked at the same time in one request
+check_urls_max_concurrent_checks = 10
+
+# DOI lookup, see src/models/identifiers_checking/doi.py
+openalex_api_url = "https://api.openalex.org"
+openalex_email = "info@archive.org"  # gets us into the polite pool of OpenAlex
+wikidata_api_url = "https://www.wikidata.org/w/api.php"
+wikidata_sparql_url = "https://query.wikidata.org/sparql"
+internet_archive_scholar_url = "https://scholar.archive.org"
+fatcat_api_url = "https://api.fatcat.wiki/v0"
+# All sources are looked up at the same time. Sources that did not answer
+# within this many seconds are left out and the result is marked partial.
+doi_lookup_max_seconds = 10
+# Local index of DOIs built with src/helpers/ingest_doi_index.py
+# DOIs found in it are answered without asking the sources. It is used if the file exists.
+doi_index_path = os.environ.get(
+    "IARI_DOI_INDEX_PATH", f"{subdirectory_for_json}doi_index.sqlite"
+)
+doi_index_ingestion_chunk_size = 10_000
+# Looking up many DOIs at once, see src/models/identifiers_checking/doi_batch.py
+doi_batch_openalex_chunk_size = 50  # the maximum OpenAlex allows in one filter
+doi_batch_max_concurrent_requests = 10
+wikidata_search_max_query_length = 300  # longer queries are refused by CirrusSearch
+# The check-dois endpoint
+check_dois_max_dois = 1000
+# Language detection, see src/models/api/language_detection.py
+# "langdetect" or the dotted path of a LanguageDetectionBackend class
+language_detection_backend = "langdetect"
+# The detection gets slow on large texts and does not get better after a few pages
+# of text so we detect on this many slices of this many characters spread over the text
+language_detection_samples = 5
+language_detection_sample_characters = 1000
+language_detection_min_characters = 200  # below this the result is not reliable
+language_detection_seed = 0  # langdetect is random, this makes it deterministic
+# Documents fetched by check-url, pdf and xhtml are shared between them for this long,
+# see src/models/file_io/document_store.py. The store is used if the directory exists.
+document_store_directory = f"{subdirectory_for_json}documents/"
+document_store_max_age_seconds = 3600
+# Expired documents and blobs no longer referenced are removed at most this often by each
+# worker when it stores a document. The oldest documents are removed as well when the
+# blobs take up more than document_store_max_bytes.
+document_store_prune_interval_seconds = 600
+document_store_max_bytes = 5_000_000_000
+# Blobs younger than this are never pruned because their record may not be written yet
+document_store_prune_grace_seconds = 300
+# A refresh of check-url, pdf or xhtml sends the ETag and Last-Modified of the cached result
+# and reuses the result if the server answers 304 Not Modified,
+# see src/models/api/revalidation.py
+conditional_refresh_enabled = True
+# XHTML pages, see src/models/api/downloader.py
+# The download is streamed and we give up on pages larger than this
+xhtml_max_bytes = 20_000_000
+xhtml_download_chunk_size = 64 * 1024
+xhtml_content_types = ["application/xhtml+xml", "text/html"]
+# PDFs
+# The download is streamed and we give up on PDFs larger than this
+pdf_max_bytes = 250_000_000
+pdf_download_chunk_size = 1024 * 1024
+# Larger PDFs are written to a temporary file instead of being kept in memory
+pdf_spool_threshold_bytes = 10_000_000
+# Also cache the debug renderings of PyMuPDF, one file per PDF and format in json/pdfs/debug/
+# They can be hundreds of MB so this is off by default.
+pdf_cache_debug_outputs = False
+# PDFs with at least this many pages are extracted in a process pool, one page range per process.
+# Smaller ones are extracted in the worker handling the request. 0 turns the process pool off.
+pdf_parallel_extraction_min_pages = 100
+pdf_parallel_extraction_max_workers = min(4, os.cpu_count() or 1)
+# forkserver starts the processes from a clean server process, fork is unsafe in threaded workers
+pdf_parallel_extraction_start_method = "forkserver"
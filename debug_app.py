@@ -1,3 +1,5 @@
 from src import app
 
-app.run(debug=True)
+# The guard is needed because the processes extracting large PDFs import the main module
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -0,0 +1,14 @@
+"""Gunicorn settings, picked up automatically when gunicorn is started in the repo root
+
+We load the app in the master and preload the heavy dependencies there
+so all workers share them copy-on-write instead of each importing them.
+See src/helpers/preload.py"""
+preload_app = True
+
+
+def when_ready(server):
+    """This runs in the master after the app was loaded and before forking the workers"""
+    from src.helpers.preload import preload
+
+    preload()
+    server.log.info("Preloaded heavy dependencies before forking the workers")
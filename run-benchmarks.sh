@@ -0,0 +1,2 @@
+# This runs the offline benchmark suite and writes the results to benchmarks/results/
+poetry run python -m benchmarks.run "$@"
@@ -0,0 +1,2 @@
+# This builds or updates the local DOI index, see src/helpers/ingest_doi_index.py
+poetry run python -m src.helpers.ingest_doi_index "$@"
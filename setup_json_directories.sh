@@ -3,4 +3,6 @@ mkdir json/references/
 mkdir json/dois/
 mkdir json/urls/
 mkdir json/xhtmls/
-mkdir json/pdfs/
\ No newline at end of file
+mkdir json/pdfs/
+mkdir json/pdfs/debug/
+mkdir json/documents/
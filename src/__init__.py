@@ -14,7 +14,9 @@ from flask_restful import Api, Resource  # type: ignore
 
 import config
 from src.views.check_doi import CheckDoi
+from src.views.check_dois import CheckDois
 from src.views.check_url import CheckUrl
+from src.views.check_urls import CheckUrls
 from src.views.statistics.all import All
 from src.views.statistics.article import Article
 from src.views.statistics.pdf import Pdf
@@ -33,7 +35,9 @@ api = Api(app, prefix="/v2")
 # Here we link together the API views and endpoint urls
 # api.add_resource(LookupByWikidataQid, "/wikidata-qid/<string:qid>")
 api.add_resource(CheckUrl, "/check-url")
+api.add_resource(CheckUrls, "/check-urls")
 api.add_resource(CheckDoi, "/check-doi")
+api.add_resource(CheckDois, "/check-dois")
 api.add_resource(Article, "/statistics/article")
 api.add_resource(All, "/statistics/all")
 api.add_resource(References, "/statistics/references")
@@ -0,0 +1,52 @@
+"""Build or update the local DOI index from bulk files
+
+Examples:
+    # All the works of an OpenAlex snapshot, see https://docs.openalex.org/download-all-data
+    python -m src.helpers.ingest_doi_index openalex-snapshot/data/works
+    # The Retraction Watch list
+    python -m src.helpers.ingest_doi_index retraction_watch.csv
+
+Running it again only ingests the files that are new or changed,
+e.g. the new updated_date partitions of the OpenAlex snapshot.
+See src/models/identifiers_checking/doi_index.py"""
+import argparse
+import logging
+import sys
+from time import perf_counter
+
+import config
+from src.models.identifiers_checking.doi_index import DoiIndex
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "paths", nargs="+", help="Files or directories with JSON lines or CSV files"
+    )
+    parser.add_argument(
+        "--index",
+        default=config.doi_index_path,
+        help=f"Path of the index (default: {config.doi_index_path})",
+    )
+    parser.add_argument(
+        "--doi-column",
+        default="OriginalPaperDOI",
+        help="The column with the DOI in CSV files (default: OriginalPaperDOI)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Also ingest files that did not change"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    index = DoiIndex(path=args.index)
+    start = perf_counter()
+    count = sum(
+        index.ingest(path=path, doi_column=args.doi_column, force=args.force)
+        for path in args.paths
+    )
+    print(f"Ingested {count} rows into {args.index} in {perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""Initialization that is safe to run once before the workers are forked
+
+The heavy dependencies are imported lazily where they are used so that
+a worker only loads what its requests need. When running gunicorn with
+--preload (see gunicorn.conf.py) we instead load everything once in the
+master process so the forked workers share the memory copy-on-write.
+
+Nothing in here may open sockets, files or threads because those
+would be shared between the workers after the fork."""
+import gc
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+heavy_modules = [
+    "aiohttp",
+    "bs4",
+    "dns.resolver",
+    "fitz",
+    "langdetect",
+    "lxml.html",
+    "wikibaseintegrator",
+]
+
+
+def preload() -> None:
+    """Import the heavy dependencies and build the read-only state"""
+    from src.models.api.language_detection import language_detector
+    from src.models.identifiers_checking.doi import get_wikibase_integrator
+
+    for module in heavy_modules:
+        importlib.import_module(module)
+    # This loads the language profiles which is otherwise done in the first request
+    language_detector.load()
+    get_wikibase_integrator()
+    # Move everything allocated so far out of reach of the garbage collector.
+    # Otherwise the first collection in each worker touches (and thereby copies)
+    # all the shared pages.
+    gc.freeze()
+    logger.info(f"Preloaded {len(heavy_modules)} modules")
@@ -0,0 +1,74 @@
+"""The time budget of a single request
+
+The view starts the budget from the deadline parameter of the patron and
+config.request_deadline_seconds and it is carried on the job like the timer.
+Every outbound request gets the remaining budget as its timeout at most and
+the slow steps stop when it runs out. We then return what we got so far with
+the stages we cut short instead of getting the worker killed by gunicorn."""
+from time import monotonic
+from typing import List
+
+from pydantic import BaseModel
+
+import config
+from src.models.api.enums import TimingStage
+from src.models.exceptions import DeadlineExceededError
+
+
+class Deadline(BaseModel):
+    """We use BaseModel to be able to carry it on the job"""
+
+    seconds: float = 0.0  # the budget, 0 means no deadline, e.g. outside of requests
+    start: float = 0.0  # monotonic() when the budget started
+    # The TimingStage values of the stages we cut short
+    incomplete_stages: List[str] = []
+
+    @classmethod
+    def start_now(cls, seconds: float = 0.0) -> "Deadline":
+        """Start the budget the patron asked for, at most config.request_deadline_seconds"""
+        maximum = config.request_deadline_seconds
+        return cls(
+            seconds=min(seconds, maximum) if seconds > 0 else maximum,
+            start=monotonic(),
+        )
+
+    @property
+    def remaining(self) -> float:
+        if not self.seconds:
+            return float("inf")
+        return max(0.0, self.start + self.seconds - monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining <= 0
+
+    @property
+    def incomplete(self) -> bool:
+        return bool(self.incomplete_stages)
+
+    def cap(self, seconds: float) -> float:
+        """The seconds or what is left of the budget if that is less"""
+        return min(float(seconds), self.remaining)
+
+    def get_timeout(self, timeout: float) -> float:
+        """The timeout of the next request
+
+        Raises DeadlineExceededError if nothing is left of the budget"""
+        if self.expired:
+            raise DeadlineExceededError(
+                f"The request used up its budget of {self.seconds} seconds"
+            )
+        return self.cap(seconds=timeout)
+
+    def ran_out(self, stage: TimingStage) -> bool:
+        """Check the budget in a loop and stop when this returns True
+
+        It marks the stage incomplete if the budget ran out"""
+        if self.expired:
+            self.mark_incomplete(stage=stage)
+            return True
+        return False
+
+    def mark_incomplete(self, stage: TimingStage) -> None:
+        if stage.value not in self.incomplete_stages:
+            self.incomplete_stages.append(stage.value)
@@ -0,0 +1,187 @@
+"""Streamed downloads of the documents the pdf and xhtml endpoints work on
+
+The status code, the content type and the Content-Length are checked
+before the body is read, so e.g. a video linked as a web page is rejected
+without transferring it. The body is read in chunks and we give up as
+soon as it is larger than the maximum of the policy. Large bodies can be
+written to a temporary file instead of being kept in memory.
+
+The download stays within the time budget of the request and raises
+DeadlineExceededError when it runs out, see src/models/api/deadline.py"""
+import logging
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, List, Mapping, Optional
+
+import requests
+from pydantic import BaseModel
+from requests import Response, Timeout
+from requests.structures import CaseInsensitiveDict
+
+from src.models.api.deadline import Deadline
+from src.models.exceptions import DeadlineExceededError, DownloadError
+
+logger = logging.getLogger(__name__)
+
+
+def get_media_type(content_type: str) -> str:
+    """The content type without parameters like the charset"""
+    return content_type.split(";")[0].strip().lower()
+
+
+def get_charset(content_type: str) -> Optional[str]:
+    """The charset parameter of the content type if the server sent one"""
+    for parameter in content_type.split(";")[1:]:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip("\"'") or None
+    return None
+
+
+class DownloadPolicy(BaseModel):
+    """What we accept from the server"""
+
+    name: str  # what we download, used in the error messages
+    content_types: List[str] = []  # the accepted media types, all if empty
+    max_bytes: int
+    chunk_size: int
+    # Larger bodies are written to a temporary file, 0 keeps all in memory
+    spool_threshold_bytes: int = 0
+
+    def check_response(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Raise DownloadError if we don't want the body
+
+        The headers have to be case-insensitive like the ones of requests"""
+        if status_code != 200:
+            raise DownloadError(
+                400,
+                f"Failed to download {self.name} file from URL. "
+                f"Got status code {status_code}",
+            )
+        content_type = headers.get("content-type", "")
+        if (
+            self.content_types
+            and get_media_type(content_type) not in self.content_types
+        ):
+            raise DownloadError(
+                415,
+                f"Invalid content type for {self.name} file. "
+                f"Got {content_type or 'no content type'}",
+            )
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise self.too_large_error
+
+    @property
+    def too_large_error(self) -> DownloadError:
+        return DownloadError(
+            413,
+            f"The {self.name} is larger than the maximum of {self.max_bytes} bytes",
+        )
+
+
+class Download(BaseModel):
+    """The response, the body is either in content or in the file at spool_path"""
+
+    status_code: int
+    headers: Dict[str, str] = {}
+    content: bytes = b""
+    spool_path: str = ""  # the caller deletes it
+    size: int = 0
+    not_modified: bool = False  # the conditional request got 304 Not Modified
+
+    @property
+    def encoding(self) -> Optional[str]:
+        return get_charset(CaseInsensitiveDict(self.headers).get("content-type", ""))
+
+
+class Downloader:
+    def __init__(self, policy: DownloadPolicy, deadline: Optional[Deadline] = None):
+        self.policy = policy
+        self.deadline = deadline or Deadline()
+
+    def download(
+        self, url: str, timeout: int, conditional_headers: Optional[Dict[str, str]]
+    ) -> Download:
+        """Download the body if the headers pass the policy or raise DownloadError
+
+        With conditional headers, see src/models/api/revalidation.py,
+        a 304 Not Modified is returned without a body."""
+        try:
+            return self.__download__(
+                url=url, timeout=timeout, conditional_headers=conditional_headers
+            )
+        except Timeout as e:
+            if self.deadline.expired and not isinstance(e, DeadlineExceededError):
+                raise DeadlineExceededError(
+                    f"Gave up downloading the {self.policy.name} because the time ran out"
+                ) from e
+            raise
+
+    def __download__(
+        self, url: str, timeout: int, conditional_headers: Optional[Dict[str, str]]
+    ) -> Download:
+        with requests.get(
+            url,
+            timeout=self.deadline.get_timeout(timeout=timeout),
+            headers=conditional_headers or {},
+            stream=True,
+        ) as response:
+            if response.status_code == 304 and conditional_headers:
+                return Download(
+                    status_code=response.status_code,
+                    headers=dict(response.headers),
+                    not_modified=True,
+                )
+            self.policy.check_response(
+                status_code=response.status_code, headers=response.headers
+            )
+            download = Download(
+                status_code=response.status_code, headers=dict(response.headers)
+            )
+            self.__read_body__(response=response, download=download)
+        logger.debug(f"Downloaded {download.size} bytes from {url}")
+        return download
+
+    def __read_body__(self, response: Response, download: Download) -> None:
+        buffer = bytearray()
+        spool_file = None
+        try:
+            for chunk in response.iter_content(chunk_size=self.policy.chunk_size):
+                if self.deadline.expired:
+                    raise DeadlineExceededError(
+                        f"Gave up downloading the {self.policy.name} "
+                        f"because the time ran out after {download.size} bytes"
+                    )
+                download.size += len(chunk)
+                if download.size > self.policy.max_bytes:
+                    raise self.policy.too_large_error
+                if (
+                    spool_file is None
+                    and self.policy.spool_threshold_bytes
+                    and download.size > self.policy.spool_threshold_bytes
+                ):
+                    spool_file = NamedTemporaryFile(
+                        prefix="iari-", suffix=".download", delete=False
+                    )
+                    download.spool_path = spool_file.name
+                    spool_file.write(buffer)
+                    buffer = bytearray()
+                if spool_file:
+                    spool_file.write(chunk)
+                else:
+                    buffer.extend(chunk)
+        except BaseException:
+            # Too large or the connection failed, e.g. a ReadTimeout
+            if spool_file:
+                spool_file.close()
+                Path(download.spool_path).unlink(missing_ok=True)
+            raise
+        if spool_file:
+            spool_file.close()
+        if not download.size:
+            raise DownloadError(
+                400,
+                f"Got status code {response.status_code} but no content from the URL",
+            )
+        download.content = bytes(buffer)
@@ -1,8 +1,19 @@
-# from enum import Enum
-
+from enum import Enum
 
 # class Return(Enum):
 #     INVALID_QID = "Invalid Wikidata QID"
 #     NO_QID = "No Wikidata QID was given"
 #     # https://www.geeksforgeeks.org/string-formatting-in-python/
 #     NO_MATCH = "404: No match found for Wikidata QID {qid} in {wikibase}"
+
+
+class TimingStage(Enum):
+    """The stages we measure and return in the timing breakdown
+    and the Server-Timing header"""
+
+    CACHE_READ = "cache_read"
+    FETCH = "fetch"
+    PARSE = "parse"
+    EXTRACT = "extract"
+    ORES = "ores"
+    WRITE = "write"
@@ -1,4 +1,3 @@
-from langdetect import LangDetectException, detect  # type: ignore
 from pydantic import BaseModel
 
 
@@ -10,25 +9,20 @@ class BaseHandler(BaseModel):
 
     def __detect_language__(self):
         from src import app
+        from src.models.api.language_detection import language_detector
+        from src.models.exceptions import LanguageDetectionError
 
-        # langdetect does not work reliably for text with less than 200 characters
         if not self.text:
             message = "No text, skipping language detection"
             self.detected_language_error = True
             self.detected_language_error_details = message
             app.logger.error(message)
         else:
-            if len(self.text) < 200:
-                message = "Not enough text for us to reliably detect the language"
+            try:
+                self.detected_language = language_detector.detect(text=self.text)
+                app.logger.debug(f"The detected language is: {self.detected_language}")
+            except LanguageDetectionError as e:
+                message = str(e)
                 self.detected_language_error = True
                 self.detected_language_error_details = message
                 app.logger.error(message)
-            else:
-                try:
-                    self.detected_language = detect(self.text)
-                    print(f"The detected language is: {self.detected_language}")
-                except LangDetectException as e:
-                    message = f"An error occurred while detecting the language: {e}"
-                    self.detected_language_error = True
-                    self.detected_language_error_details = message
-                    app.logger.error(message)
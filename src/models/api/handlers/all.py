@@ -6,9 +6,10 @@ import asyncio
 from typing import Any, Dict, List, Set
 from urllib.parse import quote
 
-import aiohttp
 import requests
 
+import config
+from src.models.api.enums import TimingStage
 from src.models.api.job.article_job import ArticleJob
 from src.models.base import WariBaseModel
 from src.models.exceptions import MissingInformationError
@@ -39,13 +40,43 @@ class AllHandler(WariBaseModel):
         self.__extract_dois__()
         return len(self.dois)
 
+    @property
+    def __timeout__(self) -> float:
+        """What is left of the time budget, the endpoints we call have at most
+        config.request_deadline_seconds themselves"""
+        return self.job.deadline.get_timeout(timeout=config.request_deadline_seconds)
+
+    def __get_session__(self):
+        import aiohttp
+
+        return aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.__timeout__)
+        )
+
+    def __run__(self, coroutine) -> List[Any]:
+        """Run the requests and return nothing if the time ran out"""
+        from src import app
+
+        # this code from chatgpt does not work via flask
+        # loop = asyncio.get_event_loop()
+        # solution from https://techoverflow.net/2020/10/01/how-to-fix-python-asyncio-runtimeerror-there-is-no-current-event-loop-in-thread/
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            results: List[Any] = loop.run_until_complete(coroutine)
+        except asyncio.TimeoutError:
+            app.logger.warning("Gave up on the details because the time ran out")
+            self.job.deadline.mark_incomplete(stage=TimingStage.FETCH)
+            return []
+        return results
+
     @staticmethod
     async def fetch_data(session, url):
         async with session.get(url) as response:
             return await response.json()
 
     async def get_reference_details(self, ids: List[str]):
-        async with aiohttp.ClientSession() as session:
+        async with self.__get_session__() as session:
             tasks = []
             for reference_id in ids:
                 url = f"http://18.217.22.248/v2/statistics/reference/{reference_id}"
@@ -60,7 +91,7 @@ class AllHandler(WariBaseModel):
         return quote(string, safe="")
 
     async def check_urls(self, urls: Set[str]):
-        async with aiohttp.ClientSession() as session:
+        async with self.__get_session__() as session:
             tasks = []
             for url in urls:
                 url = f"http://18.217.22.248/v2/check-url?url={self.__quote__(url)}"
@@ -70,7 +101,7 @@ class AllHandler(WariBaseModel):
             return results
 
     async def check_dois(self, dois: Set[str]):
-        async with aiohttp.ClientSession() as session:
+        async with self.__get_session__() as session:
             tasks = []
             for doi in dois:
                 url = f"http://18.217.22.248/v2/check-doi?doi={self.__quote__(doi)}"
@@ -99,12 +130,7 @@ class AllHandler(WariBaseModel):
         if not self.error and not self.references and self.number_of_references:
             self.__extract_reference_ids__()
             app.logger.debug("__fetch_references__: running")
-            # this code from chatgpt does not work via flask
-            # loop = asyncio.get_event_loop()
-            # solution from https://techoverflow.net/2020/10/01/how-to-fix-python-asyncio-runtimeerror-there-is-no-current-event-loop-in-thread/
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            self.references = loop.run_until_complete(
+            self.references = self.__run__(
                 self.get_reference_details(self.reference_ids)
             )
 
@@ -113,30 +139,20 @@ class AllHandler(WariBaseModel):
 
         if not self.error:
             app.logger.debug("__fetch_url_details__: running")
-            # this code from chatgpt does not work via flask
-            # loop = asyncio.get_event_loop()
-            # solution from https://techoverflow.net/2020/10/01/how-to-fix-python-asyncio-runtimeerror-there-is-no-current-event-loop-in-thread/
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             # we use a set here to avoid duplicates
             urls = set(self.data["urls"])
             app.logger.info(f"Checking {len(urls)} URLs")
-            self.url_details = loop.run_until_complete(self.check_urls(urls))
+            self.url_details = self.__run__(self.check_urls(urls))
 
     def __fetch_doi_details__(self):
         from src import app
 
         if not self.error:
             app.logger.debug("__fetch_doi_details__: running")
-            # this code from chatgpt does not work via flask
-            # loop = asyncio.get_event_loop()
-            # solution from https://techoverflow.net/2020/10/01/how-to-fix-python-asyncio-runtimeerror-there-is-no-current-event-loop-in-thread/
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             self.__extract_dois__()
             if self.dois:
                 app.logger.info(f"Checking {len(self.dois)} DOIs")
-                self.doi_details = loop.run_until_complete(self.check_dois(self.dois))
+                self.doi_details = self.__run__(self.check_dois(self.dois))
             else:
                 app.logger.info("Not checking DOIs because none were found")
 
@@ -146,7 +162,7 @@ class AllHandler(WariBaseModel):
         app.logger.debug("__fetch_article__: running")
         url = f"http://18.217.22.248/v2/statistics/article?url={self.__quote__(self.job.url)}&regex={self.__quote__(self.job.regex)}&refresh={self.job.refresh}"
         app.logger.debug(f"using url: {url}")
-        response = requests.get(url)
+        response = requests.get(url, timeout=self.__timeout__)
         if response.status_code == 200:
             self.data = response.json()
             app.logger.info(
@@ -166,6 +182,7 @@ class AllHandler(WariBaseModel):
             self.compilation["doi_details"] = self.doi_details
             self.compilation["reference_details"] = self.references
             self.compilation["url_details"] = self.url_details
+            self.compilation["incomplete"] = self.job.deadline.incomplete
 
     def __extract_dois__(self):
         """Extract the DOIs which are hiding in the templates"""
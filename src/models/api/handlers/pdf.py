@@ -1,28 +1,25 @@
 import logging
-import re
-from copy import deepcopy
-from io import BytesIO
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-import fitz  # type: ignore
-import requests
-import validators  # type: ignore
-from fitz import (
-    Document,  # type: ignore
-    FileDataError,
-)
-
-# type: ignore
 from requests import ReadTimeout
 
-from config import link_extraction_regex
+import config
+from src.models.api.downloader import Download, Downloader, DownloadPolicy
+from src.models.api.enums import TimingStage
 from src.models.api.handlers import BaseHandler
+from src.models.api.handlers.pdf_pages import extract_all_pages
 from src.models.api.job.check_url_job import UrlJob
 from src.models.api.link.pdf_link import PdfLink
-from src.models.exceptions import MissingInformationError
+from src.models.api.revalidation import get_validators
+from src.models.exceptions import DownloadError, MissingInformationError
+from src.models.file_io.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
+# The renderings of PyMuPDF the patron can ask for in debug mode
+debug_output_formats = ["html", "xml", "json", "blocks"]
+
 
 class PdfHandler(BaseHandler):
     job: UrlJob
@@ -38,59 +35,52 @@ class PdfHandler(BaseHandler):
     url_annotations: Dict[int, List[Any]] = {}
     error_details: Tuple[int, str] = (0, "")
     file_path: str = ""
-    pdf_document: Optional[Document] = None
+    pdf_document: Optional[Any] = None  # fitz Document
+    page_count: int = 0
+    spool_path: str = ""  # the temporary file large PDFs are downloaded to
+    stored_path: str = ""  # the file in the document store, we never delete it
+    conditional_headers: Dict[str, str] = {}  # see src/models/api/revalidation.py
+    validators: Dict[str, str] = {}  # the ETag and Last-Modified of the PDF
+    not_modified: bool = False  # the conditional download got 304 Not Modified
     word_counts: List[int] = []
+    debug_outputs: Dict[str, Dict[int, Any]] = {}
     # html_pages: Dict[int, str] = {}
 
     class Config:  # dead: disable
         arbitrary_types_allowed = True  # dead: disable
 
-    @property
-    def __get_html_output__(self):
-        html_pages: Dict[int, str] = {}
-        for index, page in enumerate(self.pdf_document.pages()):
-            html = page.get_text("html")
-            html_pages[index] = html
-        return html_pages
-
-    @property
-    def __get_xml_output__(self):
-        xml_pages: Dict[int, str] = {}
-        for index, page in enumerate(self.pdf_document.pages()):
-            xml = page.get_text("xml")
-            xml_pages[index] = xml
-        return xml_pages
-
-    @property
-    def __get_json_output__(self):
-        json_pages: Dict[int, str] = {}
-        for index, page in enumerate(self.pdf_document.pages()):
-            json = page.get_text("json")
-            json_pages[index] = json
-        return json_pages
-
-    @property
-    def __get_blocks__(self):
+    def __get_blocks__(self, page) -> List[Dict[str, Any]]:
         """Extract blocks of text"""
-        block_pages: Dict[int, list] = {}
-        for index, page in enumerate(self.pdf_document.pages()):
-            raw_blocks = page.get_text("blocks")
-            blocks = []
-            for block in raw_blocks:
-                block_bbox = block[:4]  # Bounding box coordinates
-                block_text = block[4]  # Text content
-                block_no = block[5]  # Block number
-                block_type = block[6]  # Block type
-                blocks.append(
-                    {
-                        "bbox": block_bbox,
-                        "text": block_text,
-                        "block_no": block_no,
-                        "block_type": block_type,
-                    }
-                )
-            block_pages[index] = blocks
-        return block_pages
+        blocks = []
+        for block in page.get_text("blocks"):
+            blocks.append(
+                {
+                    "bbox": block[:4],  # Bounding box coordinates
+                    "text": block[4],  # Text content
+                    "block_no": block[5],  # Block number
+                    "block_type": block[6],  # Block type
+                }
+            )
+        return blocks
+
+    def get_debug_output(self, output_format: str) -> Dict[int, Any]:
+        """Render every page in one of the debug_output_formats
+
+        Each rendering goes through the whole document again so it is only
+        done when the patron asks for it and only once per handler."""
+        if output_format not in self.debug_outputs:
+            if output_format not in debug_output_formats:
+                raise ValueError(f"Unknown debug output format {output_format}")
+            if not self.pdf_document:
+                raise MissingInformationError()
+            pages: Dict[int, Any] = {}
+            for index, page in enumerate(self.pdf_document.pages()):
+                if output_format == "blocks":
+                    pages[index] = self.__get_blocks__(page=page)
+                else:
+                    pages[index] = page.get_text(output_format)
+            self.debug_outputs[output_format] = pages
+        return self.debug_outputs[output_format]
 
     @property
     def number_of_total_text_characters(self) -> int:
@@ -136,34 +126,50 @@ class PdfHandler(BaseHandler):
 
     @property
     def number_of_pages(self):
-        return self.pdf_document.page_count
+        return self.page_count
 
     def __count_words__(self) -> None:
         self.word_counts = [
             len(page_text.split()) for page_text in self.text_pages.values()
         ]
 
+    @property
+    def __download_policy__(self) -> DownloadPolicy:
+        # PDFs are often served as application/octet-stream or worse
+        # so we leave it to PyMuPDF to decide if it is a PDF
+        return DownloadPolicy(
+            name="PDF",
+            max_bytes=config.pdf_max_bytes,
+            chunk_size=config.pdf_download_chunk_size,
+            spool_threshold_bytes=config.pdf_spool_threshold_bytes,
+        )
+
     def __download_pdf__(self):
-        """Download PDF file from URL"""
+        """Download PDF file from URL, see src/models/api/downloader.py
+
+        Up to config.pdf_spool_threshold_bytes are kept in memory, larger
+        PDFs are written to a temporary file which PyMuPDF then reads from.
+        We give up on PDFs larger than config.pdf_max_bytes.
+
+        With conditional headers a 304 Not Modified means the result made
+        from the PDF before is still valid, so we download nothing."""
         from src import app
 
         app.logger.debug("__download_pdf__: running")
-        if not self.content:
+        if not self.content and not self.__read_from_document_store__():
             try:
-                response = requests.get(self.job.url, timeout=self.job.timeout)
-                if response.content:
-                    self.content = response.content
-                else:
-                    # We got a response but there is no content to work on
-                    self.error = True
-                    self.error_details = (
-                        400,
-                        (
-                            f"Got status code {response.status_code} but no "
-                            f"content from the URL"
-                        ),
-                    )
-                    logger.warning(self.error_details)
+                download = Downloader(
+                    policy=self.__download_policy__, deadline=self.job.deadline
+                ).download(
+                    url=self.job.url,
+                    timeout=self.job.timeout,
+                    conditional_headers=self.conditional_headers,
+                )
+            except DownloadError as e:
+                self.error = True
+                self.error_details = (e.status_code, e.message)
+                logger.warning(self.error_details)
+                return
             except ReadTimeout:
                 self.error = True
                 self.error_details = (
@@ -171,126 +177,94 @@ class PdfHandler(BaseHandler):
                     f"Got a ReadTimeout when trying to reach the url {self.job.url}",
                 )
                 logger.warning(self.error_details)
+                return
+            if download.not_modified:
+                self.not_modified = True
+                return
+            self.validators = get_validators(headers=download.headers)
+            # We delete the temporary file in close()
+            self.content, self.spool_path = download.content, download.spool_path
+            self.__write_to_document_store__(download=download)
+
+    def __read_from_document_store__(self) -> bool:
+        """Use the PDF if it was fetched recently, e.g. by check-url or an earlier
+        request. A refresh always fetches it again."""
+        if self.job.refresh:
+            return False
+        stored = document_store.get(url=self.job.url)
+        if not stored or stored.status_code != 200:
+            return False
+        logger.info(f"Using {self.job.url} from the document store")
+        self.validators = get_validators(headers=stored.headers)
+        if stored.size > config.pdf_spool_threshold_bytes:
+            self.stored_path = stored.path
+        else:
+            self.content = document_store.read(document=stored)
+        return True
+
+    def __write_to_document_store__(self, download: Download) -> None:
+        document_store.put(
+            url=self.job.url,
+            status_code=download.status_code,
+            headers=download.headers,
+            content=Path(self.spool_path) if self.spool_path else self.content,
+        )
 
-    def __clean_linebreaks_from_page_text__(self):
-        """Clean the page strings and put them into a dictionary attribute"""
-        for index, _ in enumerate(self.text_pages):
-            self.text_pages_without_linebreaks[index] = self.__clean_linebreaks__(
-                string=self.text_pages[index]
-            )
-
-    def __clean_spaces_from_page_text__(self):
-        """Clean the page strings and put them into a dictionary attribute"""
-        for index, _ in enumerate(self.text_pages):
-            self.text_pages_without_spaces[index] = self.__clean_spaces__(
-                string=self.text_pages[index]
-            )
-
-    # def __extract_links_from_html__(self) -> None:
-    #     """Extract all links from the html extract per page"""
-    #     for index, _ in enumerate(self.html_pages):
-    #         xhtml = XhtmlHandler(content=self.html_pages[index])
-    #         xhtml.__parse_into_soup__()
-    #         xhtml.__extract_links__()
-    #         print(xhtml.links)
-    #         # for url in urls:
-    #         #     if validators.url(url):
-    #         #         self.all_text_links.append(PdfLink(url=url, page=index))
-
-    def __extract_links_from_original_text__(self) -> None:
-        """Extract all links from the text extract per page"""
-        for index, _ in enumerate(self.text_pages):
-            # We remove the linebreaks to avoid clipping of URLs, see https://github.com/internetarchive/iari/issues/766
-            # provided by chatgpt:
-            urls = re.findall(
-                link_extraction_regex,
-                self.text_pages[index],
-            )
-            # cleaned_urls = self.__clean_urls__(urls=urls)
-            # valid_urls = self.__discard_invalid_urls__(urls=cleaned_urls)
-            for url in urls:
-                if validators.url(url):
-                    self.links_from_original_text.append(PdfLink(url=url, page=index))
-
-    def __extract_links_from_text_without_linebreaks__(self) -> None:
-        """Extract all links from the text extract per page"""
-        for index, _ in enumerate(self.text_pages):
-            # We remove the linebreaks to avoid clipping of URLs, see https://github.com/internetarchive/iari/issues/766
-            # provided by chatgpt:
-            urls = re.findall(
-                link_extraction_regex,
-                self.text_pages_without_linebreaks[index],
-            )
-            # cleaned_urls = self.__clean_urls__(urls=urls)
-            # valid_urls = self.__discard_invalid_urls__(urls=cleaned_urls)
-            for url in urls:
-                if validators.url(url):
-                    self.links_from_text_without_linebreaks.append(
-                        PdfLink(url=url, page=index)
-                    )
-
-    def __extract_links_from_text_without_spaces__(self) -> None:
-        """Extract all links from the text extract per page"""
-        for index, _ in enumerate(self.text_pages):
-            # We remove the linebreaks to avoid clipping of URLs, see https://github.com/internetarchive/iari/issues/766
-            # provided by chatgpt:
-            urls = re.findall(
-                link_extraction_regex,
-                self.text_pages_without_spaces[index],
-            )
-            # cleaned_urls = self.__clean_urls__(urls=urls)
-            # valid_urls = self.__discard_invalid_urls__(urls=cleaned_urls)
-            for url in urls:
-                if validators.url(url):
-                    self.links_from_text_without_spaces.append(
-                        PdfLink(url=url, page=index)
-                    )
-
-    def __get_annotations__(self):
-        """Extract the raw annotations into an attribute dictionary"""
-        if not self.pdf_document:
-            raise MissingInformationError()
-        for page_num in range(self.pdf_document.page_count):
-            page = self.pdf_document.load_page(page_num)
-            # todo is this zero based?
-            all_annotations = page.get_links()
-            url_annotations = []
-            for annotation in all_annotations:
-                if annotation["kind"] == fitz.LINK_URI:
-                    # We remove Rect() here because it is not understood by the json encoder
-                    cleaned_annotation = deepcopy(annotation)
-                    if cleaned_annotation["from"]:
-                        cleaned_annotation["from"] = str(cleaned_annotation["from"])
-                    url_annotations.append(cleaned_annotation)
-            # print(type(annotations))
-            # console.print(annotations)
-            # exit()
-            if url_annotations:
-                self.url_annotations[page_num] = url_annotations
-
-    def __extract_links_from_annotations__(self) -> None:
-        if not self.pdf_document:
-            raise MissingInformationError()
-        for page_num in range(self.pdf_document.page_count):
-            page = self.pdf_document.load_page(page_num)
-            annotations = page.get_links()
-            for annotation in annotations:
-                # print(annotation)
-                if annotation["kind"] == fitz.LINK_URI:
-                    url = annotation["uri"]
-                    if validators.url(url):
-                        self.annotation_links.append(PdfLink(url=url, page=page_num))
-
-    def __extract_text_pages__(self) -> None:
-        """Extract all text from all pages"""
-        if not self.pdf_document:
-            self.__extract_pdf_document__()
+    @property
+    def __document_path__(self) -> str:
+        """The path of the PDF if it is on disk"""
+        return self.spool_path or self.stored_path
+
+    def __delete_spool_file__(self) -> None:
+        if self.spool_path:
+            Path(self.spool_path).unlink(missing_ok=True)
+            self.spool_path = ""
+
+    def close(self) -> None:
+        """Close the document and delete the temporary file, if any
+
+        Use the handler as a context manager to make sure this happens.
+        Nothing that needs the document, like the debug outputs, works after this."""
+        if self.pdf_document:
+            self.pdf_document.close()
+            self.pdf_document = None
+        self.__delete_spool_file__()
+
+    def __enter__(self) -> "PdfHandler":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __extract_pages__(self) -> None:
+        """Extract the text and the links of all pages,
+        see src/models/api/handlers/pdf_pages.py"""
         if not self.pdf_document:
             raise MissingInformationError()
-        for index, page in enumerate(self.pdf_document.pages()):
-            # See https://pymupdf.readthedocs.io/en/latest/app1.html
-            text = page.get_text("text")
-            self.text_pages[index] = text
+        for page_range in extract_all_pages(
+            document=self.pdf_document, source=self.__document_path__ or self.content
+        ):
+            self.text_pages.update(page_range.text_pages)
+            self.text_pages_without_linebreaks.update(
+                page_range.text_pages_without_linebreaks
+            )
+            self.text_pages_without_spaces.update(page_range.text_pages_without_spaces)
+            self.url_annotations.update(page_range.url_annotations)
+            for links, page_links in [
+                (self.annotation_links, page_range.annotation_urls),
+                (self.links_from_original_text, page_range.links_from_original_text),
+                (
+                    self.links_from_text_without_linebreaks,
+                    page_range.links_from_text_without_linebreaks,
+                ),
+                (
+                    self.links_from_text_without_spaces,
+                    page_range.links_from_text_without_spaces,
+                ),
+            ]:
+                links.extend(
+                    PdfLink(url=url, page=page_num) for page_num, url in page_links
+                )
 
     # def __extract_html_pages__(self) -> None:
     #     """Extract all text from all pages"""
@@ -304,27 +278,40 @@ class PdfHandler(BaseHandler):
     #         self.html_pages[index] = html
 
     def __extract_pdf_document__(self):
-        if not self.content:
+        # PyMuPDF is slow to import so we only do it when a PDF is requested
+        from fitz import Document, FileDataError  # type: ignore
+
+        if not self.content and not self.__document_path__:
             raise MissingInformationError()
-        with BytesIO(self.content) as pdf_file:
-            try:
+        try:
+            if self.__document_path__:
+                # PyMuPDF reads the pages from the file as they are needed
+                self.pdf_document = Document(
+                    filename=self.__document_path__, filetype="pdf"
+                )
+            else:
                 # noinspection PyUnresolvedReferences
-                self.pdf_document = Document(stream=pdf_file.read(), filetype="pdf")
-            except FileDataError:
-                self.error = True
-                self.error_details = (415, "Not a valid PDF according to PyMuPDF")
-                logger.error(self.error_details)
+                self.pdf_document = Document(stream=self.content, filetype="pdf")
+            self.page_count = self.pdf_document.page_count
+        except FileDataError:
+            self.error = True
+            self.error_details = (415, "Not a valid PDF according to PyMuPDF")
+            logger.error(self.error_details)
 
     def download_and_extract(self):
-        self.__download_pdf__()
-        self.__extract_pages_and_links__()
+        with self.job.timer.measure(stage=TimingStage.FETCH):
+            self.__download_pdf__()
+        if not self.not_modified:
+            self.__extract_pages_and_links__()
 
     def read_and_extract(self):  # dead: disable
         self.__read_pdf_from_file__()
         self.__extract_pages_and_links__()
 
-    def get_dict(self):
-        """Return data to the patron"""
+    def get_dict(self, debug_outputs: Optional[List[str]] = None):
+        """Return data to the patron
+
+        The debug renderings are only included for the formats in debug_outputs"""
         links_from_original_text = [
             link.dict() for link in self.links_from_original_text
         ]
@@ -344,6 +331,7 @@ class PdfHandler(BaseHandler):
             "links_from_text_without_linebreaks": links_from_text_without_linebreaks,
             "links_from_text_without_spaces": links_from_text_without_spaces,
             "url": self.job.url,
+            "validators": self.validators,
             "timeout": self.job.timeout,
             "pages_total": self.number_of_pages,
             "detected_language": self.detected_language,
@@ -353,12 +341,12 @@ class PdfHandler(BaseHandler):
             "debug_text_without_linebreaks": self.text_pages_without_linebreaks,
             "debug_text_without_spaces": self.text_pages_without_spaces,
             "debug_url_annotations": self.url_annotations,
-            "debug_html": self.__get_html_output__,
-            "debug_xml": self.__get_xml_output__,
-            "debug_json": self.__get_json_output__,
-            "debug_blocks": self.__get_blocks__,
             "characters": self.number_of_total_text_characters,
         }
+        for output_format in debug_outputs or []:
+            data[f"debug_{output_format}"] = self.get_debug_output(
+                output_format=output_format
+            )
         # console.print(data)
         # exit()
         return data
@@ -373,37 +361,15 @@ class PdfHandler(BaseHandler):
 
         app.logger.debug("__extract_pages_and_links__: running")
         if not self.error:
-            self.__extract_pdf_document__()
-        if not self.error:
-            self.__get_annotations__()
-            self.__extract_links_from_annotations__()
-        if not self.error:
-            self.__clean_and_extract_links_from_text__()
-        self.__concatenate_text_from_all_pages__()
-        self.__detect_language__()
-
-    @staticmethod
-    def __clean_linebreaks__(string: str):
-        for char in ["\n", "\r", "\v", "\f", "\u2028", "\u2029"]:
-            string = string.replace(char, "")
-        return string
-
-    @staticmethod
-    def __clean_spaces__(string: str):
-        for char in [" "]:
-            string = string.replace(char, "")
-        return string
+            with self.job.timer.measure(stage=TimingStage.PARSE):
+                self.__extract_pdf_document__()
+        with self.job.timer.measure(stage=TimingStage.EXTRACT):
+            if not self.error:
+                self.__extract_pages__()
+            self.__concatenate_text_from_all_pages__()
+            self.__detect_language__()
 
     def __concatenate_text_from_all_pages__(self):
         """This is needed for language detection"""
         for index, _ in enumerate(self.text_pages):
             self.text += self.text_pages[index]
-
-    def __clean_and_extract_links_from_text__(self):
-        """Helper method"""
-        self.__extract_text_pages__()
-        self.__clean_linebreaks_from_page_text__()
-        self.__clean_spaces_from_page_text__()
-        self.__extract_links_from_original_text__()
-        self.__extract_links_from_text_without_linebreaks__()
-        self.__extract_links_from_text_without_spaces__()
@@ -0,0 +1,184 @@
+"""Extraction of the text and the links of the pages of a PDF
+
+Every page is read once: the links of the annotations and the links in
+three versions of the text are all extracted in extract_page().
+
+Large PDFs are split into page ranges which are extracted in a process
+pool, see extract_pages_in_parallel(). Small PDFs are extracted in the
+process handling the request because starting the pool costs more than
+it saves. Both use extract_pages() so they give the same result."""
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from copy import deepcopy
+from math import ceil
+from typing import Any, Dict, List, Tuple, Union
+
+import validators  # type: ignore
+from pydantic import BaseModel
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+# PyMuPDF breaks long URLs over lines so we also look for links in the text without them,
+# see https://github.com/internetarchive/iari/issues/766
+linebreaks = str.maketrans("", "", "\n\r\v\f\u2028\u2029")
+
+
+class PdfPageRange(BaseModel):
+    """What we extracted from the pages first to last (exclusive)
+
+    The links are (page number, url) tuples in page order."""
+
+    first: int
+    last: int
+    text_pages: Dict[int, str] = {}
+    text_pages_without_linebreaks: Dict[int, str] = {}
+    text_pages_without_spaces: Dict[int, str] = {}
+    url_annotations: Dict[int, List[Any]] = {}
+    annotation_urls: List[Tuple[int, str]] = []
+    links_from_original_text: List[Tuple[int, str]] = []
+    links_from_text_without_linebreaks: List[Tuple[int, str]] = []
+    links_from_text_without_spaces: List[Tuple[int, str]] = []
+
+
+class PageUrlValidator:
+    """validators.url() with a memory
+
+    The three versions of the text of a page mostly contain the same
+    URLs so each URL is only validated once per page."""
+
+    def __init__(self):
+        self.results: Dict[str, bool] = {}
+
+    def is_valid(self, url: str) -> bool:
+        if url not in self.results:
+            self.results[url] = bool(validators.url(url))
+        return self.results[url]
+
+    def get_links(self, page_num: int, text: str) -> List[Tuple[int, str]]:
+        return [
+            (page_num, url)
+            for url in re.findall(config.link_extraction_regex, text)
+            if self.is_valid(url=url)
+        ]
+
+
+def extract_page(page: Any, page_num: int, page_range: PdfPageRange) -> None:
+    """Extract everything from the page in one pass"""
+    import fitz  # type: ignore
+
+    validator = PageUrlValidator()
+    for annotation in page.get_links():
+        if annotation["kind"] == fitz.LINK_URI:
+            # We remove Rect() here because it is not understood by the json encoder
+            cleaned_annotation = deepcopy(annotation)
+            if cleaned_annotation["from"]:
+                cleaned_annotation["from"] = str(cleaned_annotation["from"])
+            page_range.url_annotations.setdefault(page_num, []).append(
+                cleaned_annotation
+            )
+            if validator.is_valid(url=annotation["uri"]):
+                page_range.annotation_urls.append((page_num, annotation["uri"]))
+    # See https://pymupdf.readthedocs.io/en/latest/app1.html
+    text = page.get_text("text")
+    text_without_linebreaks = text.translate(linebreaks)
+    text_without_spaces = text.replace(" ", "")
+    page_range.text_pages[page_num] = text
+    page_range.text_pages_without_linebreaks[page_num] = text_without_linebreaks
+    page_range.text_pages_without_spaces[page_num] = text_without_spaces
+    page_range.links_from_original_text.extend(
+        validator.get_links(page_num=page_num, text=text)
+    )
+    page_range.links_from_text_without_linebreaks.extend(
+        validator.get_links(page_num=page_num, text=text_without_linebreaks)
+    )
+    page_range.links_from_text_without_spaces.extend(
+        validator.get_links(page_num=page_num, text=text_without_spaces)
+    )
+
+
+def extract_pages(document: Any, first: int, last: int) -> PdfPageRange:
+    """Extract the pages first to last of the fitz Document"""
+    page_range = PdfPageRange(first=first, last=last)
+    for page_num in range(first, last):
+        extract_page(
+            page=document.load_page(page_num),
+            page_num=page_num,
+            page_range=page_range,
+        )
+    return page_range
+
+
+def extract_page_range(
+    source: Union[bytes, str], first: int, last: int
+) -> PdfPageRange:
+    """Run in the worker processes, every worker opens the document itself
+    from the content or the path of the PDF"""
+    from fitz import Document  # type: ignore
+
+    arguments = {"filename" if isinstance(source, str) else "stream": source}
+    with Document(filetype="pdf", **arguments) as document:
+        return extract_pages(document=document, first=first, last=last)
+
+
+def get_page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    size = ceil(page_count / workers)
+    return [
+        (first, min(first + size, page_count)) for first in range(0, page_count, size)
+    ]
+
+
+def use_process_pool(page_count: int) -> bool:
+    return (
+        config.pdf_parallel_extraction_min_pages > 0
+        and page_count >= config.pdf_parallel_extraction_min_pages
+        and config.pdf_parallel_extraction_max_workers > 1
+    )
+
+
+def extract_pages_in_parallel(
+    source: Union[bytes, str], page_count: int
+) -> List[PdfPageRange]:
+    """Extract one page range per worker process
+
+    The workers are started with config.pdf_parallel_extraction_start_method.
+    The default forkserver forks them from a server process which has
+    imported this module, so they start fast and don't inherit the threads
+    and locks of the worker handling the request like fork would.
+
+    A PDF downloaded to a temporary file is passed by path so it is not
+    copied to every worker. The process pool only lives for this call.
+    Return the page ranges in order."""
+    ranges = get_page_ranges(
+        page_count=page_count, workers=config.pdf_parallel_extraction_max_workers
+    )
+    context = multiprocessing.get_context(config.pdf_parallel_extraction_start_method)
+    if config.pdf_parallel_extraction_start_method == "forkserver":
+        context.set_forkserver_preload([__name__])
+    logger.info(f"Extracting {page_count} pages in {len(ranges)} processes")
+    with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as executor:
+        return list(
+            executor.map(
+                extract_page_range,
+                [source] * len(ranges),
+                [first for first, _ in ranges],
+                [last for _, last in ranges],
+            )
+        )
+
+
+def extract_all_pages(document: Any, source: Union[bytes, str]) -> List[PdfPageRange]:
+    """Extract all pages, in a process pool if the document is large enough"""
+    if use_process_pool(page_count=document.page_count):
+        try:
+            return extract_pages_in_parallel(
+                source=source, page_count=document.page_count
+            )
+        except (BrokenProcessPool, OSError) as e:
+            logger.error(f"Extracting in parallel failed, falling back to serial: {e}")
+    return [extract_pages(document=document, first=0, last=document.page_count)]
@@ -1,14 +1,18 @@
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Dict, List, Optional
 
-import requests
-import validators  # type: ignore
-from bs4 import BeautifulSoup
+from requests.structures import CaseInsensitiveDict
 
+import config
+from src.models.api.downloader import Downloader, DownloadPolicy, get_charset
+from src.models.api.enums import TimingStage
 from src.models.api.handlers import BaseHandler
+from src.models.api.handlers.xhtml_links import extract_links_and_text
 from src.models.api.job.check_url_job import UrlJob
 from src.models.api.link.xhtml_link import XhtmlLink
-from src.models.exceptions import MissingInformationError
+from src.models.api.revalidation import get_validators
+from src.models.exceptions import DownloadError
+from src.models.file_io.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
@@ -21,81 +25,112 @@ class XhtmlHandler(BaseHandler):
     links: List[XhtmlLink] = []
     error: bool = False
     error_details: str = ""
-    soup: Optional[Any]
-
-    class Config:  # dead: disable
-        arbitrary_types_allowed = True  # dead: disable
+    encoding: Optional[str] = None  # the charset the server sent
+    conditional_headers: Dict[str, str] = {}  # see src/models/api/revalidation.py
+    validators: Dict[str, str] = {}  # the ETag and Last-Modified of the document
+    not_modified: bool = False  # the conditional download got 304 Not Modified
 
     @property
     def __total_number_of_links__(self):
         return len(self.links)
 
+    @property
+    def __download_policy__(self) -> DownloadPolicy:
+        return DownloadPolicy(
+            name="XHTML",
+            content_types=config.xhtml_content_types,
+            max_bytes=config.xhtml_max_bytes,
+            chunk_size=config.xhtml_download_chunk_size,
+        )
+
     def __download_xhtml__(self):
-        """Download XHTML file from URL."""
-        # see https://stackoverflow.com/questions/23714383/what-are-all-the-possible-values-for-http-content-type-header
-        valid_content_types = [
-            "application/xhtml+xml",
-            "text/html; charset=utf-8",
-            "text/html",
-        ]
-        if not self.content:
-            response = requests.get(self.job.url, timeout=self.job.timeout)
-            content_type = response.headers["content-type"]
-            if response.status_code != 200:
-                self.error = True
-                self.error_details = "Failed to download XHTML file from URL."
-                logger.error(self.error_details)
-                return
-            # We keep strict to the types above for now
-            if content_type.lower() not in valid_content_types:
-                self.error = True
-                self.error_details = (
-                    f"Invalid content type for XHTML file. Got {content_type}"
+        """Download XHTML file from URL, see src/models/api/downloader.py
+
+        The status code and the content type are checked before the body is read.
+        With conditional headers a 304 Not Modified means the result made
+        from the document before is still valid."""
+        if not self.content and not self.__read_from_document_store__():
+            try:
+                download = Downloader(
+                    policy=self.__download_policy__, deadline=self.job.deadline
+                ).download(
+                    url=self.job.url,
+                    timeout=self.job.timeout,
+                    conditional_headers=self.conditional_headers,
                 )
-                logger.error(self.error_details)
+            except DownloadError as e:
+                self.__set_error__(error=e)
                 return
-            self.content = response.content
-
-    def __extract_links__(self) -> None:
-        """Written by chatgpt and adjusted a little"""
-        # extract all the links from the HTML content
-        if not self.soup:
-            raise MissingInformationError()
-        for link in self.soup.find_all("a"):
-            href = link.get("href")
-            if href is not None and validators.url(href):
-                link_obj = XhtmlLink(
-                    context=link,
-                    href=href,
-                    title=link.get("title", ""),
-                    parent=link.parent,
-                )
-                self.links.append(link_obj)
+            if download.not_modified:
+                self.not_modified = True
+                return
+            self.validators = get_validators(headers=download.headers)
+            self.content = download.content
+            self.encoding = download.encoding
+            document_store.put(
+                url=self.job.url,
+                status_code=download.status_code,
+                headers=download.headers,
+                content=self.content,
+            )
+
+    def __read_from_document_store__(self) -> bool:
+        """Use the document if it was fetched recently, e.g. by check-url.
+        A refresh always fetches it again."""
+        if self.job.refresh:
+            return False
+        stored = document_store.get(url=self.job.url)
+        if not stored:
+            return False
+        logger.info(f"Using {self.job.url} from the document store")
+        self.validators = get_validators(headers=stored.headers)
+        headers = CaseInsensitiveDict(stored.headers)
+        policy = self.__download_policy__
+        try:
+            policy.check_response(status_code=stored.status_code, headers=headers)
+            if stored.size > policy.max_bytes:
+                raise policy.too_large_error
+        except DownloadError as e:
+            self.__set_error__(error=e)
+            return True
+        self.content = document_store.read(document=stored)
+        self.encoding = get_charset(content_type=headers.get("content-type", ""))
+        return True
+
+    def __set_error__(self, error: DownloadError) -> None:
+        self.error = True
+        self.error_details = error.message
+        logger.error(self.error_details)
+
+    def __extract_links_and_text__(self) -> None:
+        """Extract the links and the text in one pass without building
+        a tree, see src/models/api/handlers/xhtml_links.py"""
+        extraction = extract_links_and_text(
+            content=self.content, encoding=self.encoding
+        )
+        self.links = extraction.links
+        self.text = extraction.text
 
     def __get_links_dicts__(self) -> List[Dict[str, str]]:
         """This is needed to please the json encoder"""
         return [link.get_dict() for link in self.links]
 
-    def __parse_into_soup__(self):
-        self.soup = BeautifulSoup(self.content, "lxml")
-
-    def __get_text__(self):
-        self.text = self.soup.get_text()
-
     def download_and_extract(self):
-
-        self.__download_xhtml__()
-        if not self.error and not self.links:
-            self.__parse_into_soup__()
-            self.__extract_links__()
-            self.__get_text__()
-            self.__detect_language__()
+        with self.job.timer.measure(stage=TimingStage.FETCH):
+            self.__download_xhtml__()
+        if not self.error and not self.not_modified and not self.links:
+            # Parsing and extracting the links is one pass now
+            with self.job.timer.measure(stage=TimingStage.PARSE):
+                self.__extract_links_and_text__()
+            with self.job.timer.measure(stage=TimingStage.EXTRACT):
+                self.__detect_language__()
 
     def get_dict(self):
         """Return data to the patron"""
         return {
             "links": self.__get_links_dicts__(),
             "links_total": self.__total_number_of_links__,
+            "validators": self.validators,
             "detected_language": self.detected_language,
             "detected_language_error": self.detected_language_error,
             "detected_language_error_details": self.detected_language_error_details,
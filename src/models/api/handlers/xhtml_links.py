@@ -0,0 +1,201 @@
+"""Extraction of the links and the text of a XHTML document in one pass
+
+The document is fed to the lxml HTML parser in chunks and the parser calls
+LinkCollector for every start tag, end tag and piece of text. No tree is
+built: the collector writes the markup of the open elements to a list of
+fragments and only keeps the strings we return, the markup of each link
+(the context) and of the element containing it (the parent).
+
+The fragments are dropped every time a top level element in the body
+ends, so memory is bounded by the largest such element and not by the
+size of the document. For the same reason a link directly in the body gets
+its own markup as parent instead of the whole body."""
+import codecs
+import re
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+import validators  # type: ignore
+from pydantic import BaseModel
+
+import config
+from src.models.api.link.xhtml_link import XhtmlLink
+
+# Elements without an end tag, see https://html.spec.whatwg.org/#void-elements
+void_elements = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+# The text of these is not text of the document, like BeautifulSoup.get_text()
+non_text_elements = {"script", "style", "template"}
+# Links in these get their own markup as parent
+root_elements = {"html", "body"}
+# Where browsers look for the charset if the server did not send it
+charset_regex = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w-]+)""", re.I)
+charset_sniffing_bytes = 1024
+
+
+def escape_attribute(value: str) -> str:
+    return escape(value, {'"': "&quot;"})
+
+
+class XhtmlExtraction(BaseModel):
+    links: List[XhtmlLink] = []
+    text: str = ""
+
+
+class OpenElement(BaseModel):
+    tag: str
+    start: int  # the index of its start tag in the fragments
+    link: Optional[XhtmlLink] = None  # if it is a link
+    child_links: List[XhtmlLink] = []  # the links this is the parent of
+
+
+class LinkCollector:
+    """Parser target, see https://lxml.de/parsing.html#the-target-parser-interface"""
+
+    def __init__(self):
+        self.fragments: List[str] = []
+        self.stack: List[OpenElement] = []
+        self.links: List[XhtmlLink] = []
+        self.text: List[str] = []
+        self.non_text_depth = 0
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        attributes = "".join(
+            f' {name}="{escape_attribute(value)}"' for name, value in attrib.items()
+        )
+        closing = "/" if tag in void_elements else ""
+        element = OpenElement(tag=tag, start=len(self.fragments))
+        self.fragments.append(f"<{tag}{attributes}{closing}>")
+        if tag in non_text_elements:
+            self.non_text_depth += 1
+        href = attrib.get("href")
+        if tag == "a" and href is not None and validators.url(href):
+            element.link = XhtmlLink(
+                context="", href=href, title=attrib.get("title", ""), parent=""
+            )
+            self.links.append(element.link)
+            if self.stack and self.stack[-1].tag not in root_elements:
+                self.stack[-1].child_links.append(element.link)
+        self.stack.append(element)
+
+    def end(self, tag: str) -> None:
+        if tag not in void_elements:
+            self.fragments.append(f"</{tag}>")
+        if tag in non_text_elements:
+            self.non_text_depth -= 1
+        element = self.stack.pop()
+        if element.link or element.child_links:
+            markup = "".join(self.fragments[element.start :])
+            if element.link:
+                element.link.context = markup
+                if not self.stack or self.stack[-1].tag in root_elements:
+                    element.link.parent = markup
+            for link in element.child_links:
+                link.parent = markup
+        if all(open_element.tag in root_elements for open_element in self.stack):
+            # Nothing still open needs the markup
+            self.fragments = []
+
+    def data(self, data: str) -> None:
+        if self.non_text_depth:
+            self.fragments.append(data)
+        else:
+            self.fragments.append(escape(data))
+            self.text.append(data)
+
+    def close(self) -> XhtmlExtraction:
+        return XhtmlExtraction(links=self.links, text="".join(self.text))
+
+
+def get_encoding(content: bytes) -> str:
+    """Find the charset in the byte order mark or a <meta> at the start of
+    the document and fall back to UTF-8 which most of the web uses"""
+    for bom, encoding in [
+        (codecs.BOM_UTF8, "utf-8-sig"),
+        (codecs.BOM_UTF16_LE, "utf-16"),
+        (codecs.BOM_UTF16_BE, "utf-16"),
+    ]:
+        if content.startswith(bom):
+            return encoding
+    match = charset_regex.search(content[:charset_sniffing_bytes])
+    if match:
+        encoding = match.group(1).decode("ascii")
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            return "utf-8"
+        return encoding
+    return "utf-8"
+
+
+class XhtmlStreamParser:
+    """Feed the document in chunks as it arrives and close() to get the
+    links and the text
+
+    The bytes are decoded incrementally with the given encoding, usually the
+    charset from the Content-Type header, or else the one found by get_encoding()
+    in the first chunk."""
+
+    def __init__(self, encoding: Optional[str] = None):
+        from lxml import etree  # type: ignore
+
+        self.encoding = encoding
+        self.decoder: Optional[Any] = None
+        self.collector = LinkCollector()
+        self.parser = etree.HTMLParser(target=self.collector)
+        self.fed = False
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        if self.decoder is None:
+            encoding = self.encoding or get_encoding(content=chunk)
+            try:
+                self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            except LookupError:
+                # The server sent an unknown charset
+                self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.__feed_text__(text=self.decoder.decode(chunk))
+
+    def __feed_text__(self, text: str) -> None:
+        if text:
+            self.parser.feed(text)
+            self.fed = True
+
+    def close(self) -> XhtmlExtraction:
+        from lxml import etree  # type: ignore
+
+        if self.decoder:
+            self.__feed_text__(text=self.decoder.decode(b"", final=True))
+        if not self.fed:
+            # lxml refuses to close a parser that got nothing
+            return XhtmlExtraction()
+        try:
+            extraction: XhtmlExtraction = self.parser.close()
+        except etree.LxmlError:
+            extraction = self.collector.close()
+        return extraction
+
+
+def extract_links_and_text(
+    content: bytes, encoding: Optional[str] = None
+) -> XhtmlExtraction:
+    """Feed the content in chunks so it is never decoded all at once"""
+    parser = XhtmlStreamParser(encoding=encoding)
+    for start in range(0, len(content), config.xhtml_download_chunk_size):
+        parser.feed(content[start : start + config.xhtml_download_chunk_size])
+    return parser.close()
@@ -1,6 +1,13 @@
 from pydantic import BaseModel
 
+from src.models.api.deadline import Deadline
+from src.models.api.timing import StageTimer
+
 
 class Job(BaseModel):
     refresh: bool = False
     testing: bool = False
+    profile: bool = False
+    deadline_seconds: float = 0.0  # the deadline parameter of the patron
+    timer: StageTimer = StageTimer()
+    deadline: Deadline = Deadline()  # started by the view, see StatisticsView
@@ -4,6 +4,7 @@ from urllib.parse import quote, unquote
 import requests
 
 import config
+from src.models.api.enums import TimingStage
 from src.models.api.job import Job
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 from src.models.wikimedia.enums import WikimediaDomain
@@ -50,7 +51,14 @@ class ArticleJob(Job):
                 f"w/rest.php/v1/page/{self.quoted_title}"
             )
             headers = {"User-Agent": config.user_agent}
-            response = requests.get(url, headers=headers)
+            with self.timer.measure(stage=TimingStage.FETCH):
+                response = requests.get(
+                    url,
+                    headers=headers,
+                    timeout=self.deadline.get_timeout(
+                        timeout=config.wikimedia_api_timeout_seconds
+                    ),
+                )
             # console.print(response.json())
             if response.status_code == 200:
                 data = response.json()
@@ -0,0 +1,14 @@
+from typing import List
+from urllib.parse import unquote
+
+from src.models.api.job import Job
+
+
+class CheckDoisJob(Job):
+    dois: List[str]
+    timeout: int = 2
+
+    @property
+    def unquoted_dois(self) -> List[str]:
+        """Decoded dois"""
+        return [unquote(doi) for doi in self.dois]
@@ -0,0 +1,15 @@
+from typing import List
+from urllib.parse import unquote
+
+from src.models.api.job import Job
+
+
+class CheckUrlsJob(Job):
+    urls: List[str]
+    timeout: int = 2  # We default to 2 seconds
+    debug: bool = False
+
+    @property
+    def unquoted_urls(self) -> List[str]:
+        """Decoded urls"""
+        return [unquote(url) for url in self.urls]
@@ -0,0 +1,134 @@
+"""Detection of the language of the text of a document
+
+The detection runs on a sample of the text instead of all of it, see
+get_sample(). A few pages of text are enough to detect the language and
+the time langdetect takes grows with the length of the text.
+
+The backend is chosen with config.language_detection_backend. It is either
+one of the names in backends or the dotted path of a class implementing
+LanguageDetectionBackend, e.g. "my_module.FastNgramBackend", so a faster
+detector can be swapped in without changing the handlers."""
+import importlib
+import logging
+from typing import Any, Dict, List, Optional, Type
+
+import config
+from src.models.exceptions import LanguageDetectionError
+
+logger = logging.getLogger(__name__)
+
+
+class LanguageDetectionBackend:
+    """Interface of the detectors"""
+
+    def load(self) -> None:
+        """Load the profiles/models, this is called once, see src/helpers/preload.py"""
+        raise NotImplementedError()
+
+    def detect(self, text: str) -> str:
+        """Return the ISO 639-1 code of the language of the text
+        or raise LanguageDetectionError"""
+        raise NotImplementedError()
+
+
+class LangdetectBackend(LanguageDetectionBackend):
+    """Detector based on https://github.com/Mimino666/langdetect
+
+    langdetect picks random n-grams from the text so we seed the factory
+    to get the same answer for the same text."""
+
+    factory: Any = None
+
+    def load(self) -> None:
+        from langdetect.detector_factory import (  # type: ignore
+            PROFILES_DIRECTORY,
+            DetectorFactory,
+        )
+
+        if self.factory is None:
+            factory = DetectorFactory()
+            factory.load_profile(PROFILES_DIRECTORY)
+            factory.set_seed(config.language_detection_seed)
+            self.factory = factory
+
+    def detect(self, text: str) -> str:
+        from langdetect import LangDetectException  # type: ignore
+
+        self.load()
+        detector = self.factory.create()
+        try:
+            detector.append(text)
+            language: str = detector.detect()
+        except LangDetectException as e:
+            raise LanguageDetectionError(
+                f"An error occurred while detecting the language: {e}"
+            ) from e
+        return language
+
+
+backends: Dict[str, Type[LanguageDetectionBackend]] = {
+    "langdetect": LangdetectBackend,
+}
+
+
+def get_sample(text: str) -> str:
+    """Return config.language_detection_samples slices of
+    config.language_detection_sample_characters evenly spread over the text
+
+    Documents often start with a title page, a table of contents or
+    boilerplate in another language so we don't only look at the beginning.
+    Slices are moved to the next whitespace to not cut words in half.
+    Texts shorter than all slices together are returned as is."""
+    size = config.language_detection_sample_characters
+    samples = config.language_detection_samples
+    if len(text) <= size * samples:
+        return text
+    step = (len(text) - size) // max(samples - 1, 1)
+    slices: List[str] = []
+    for number in range(samples):
+        start = number * step
+        if start:
+            space = text.find(" ", start, start + 50)
+            start = space + 1 if space != -1 else start
+        slices.append(text[start : start + size])
+    return "\n".join(slices)
+
+
+class LanguageDetector:
+    """Detect the language with the configured backend"""
+
+    def __init__(self, backend: Optional[LanguageDetectionBackend] = None):
+        self._backend = backend
+
+    @property
+    def backend(self) -> LanguageDetectionBackend:
+        if self._backend is None:
+            self._backend = self.__get_configured_backend__()
+        return self._backend
+
+    @staticmethod
+    def __get_configured_backend__() -> LanguageDetectionBackend:
+        name = config.language_detection_backend
+        if name in backends:
+            return backends[name]()
+        module, _, class_name = name.rpartition(".")
+        backend: LanguageDetectionBackend = getattr(
+            importlib.import_module(module), class_name
+        )()
+        return backend
+
+    def load(self) -> None:
+        self.backend.load()
+        logger.info(f"Loaded the language detection backend {type(self.backend)}")
+
+    def detect(self, text: str) -> str:
+        """Return the language of the text or raise LanguageDetectionError"""
+        if len(text) < config.language_detection_min_characters:
+            # The detectors do not work reliably for short texts
+            raise LanguageDetectionError(
+                "Not enough text for us to reliably detect the language"
+            )
+        return self.backend.detect(text=get_sample(text=text))
+
+
+language_detector = LanguageDetector()
@@ -0,0 +1,160 @@
+import cProfile
+import hmac
+import logging
+import pstats
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# The directory of the src package, a pattern like "/src/" would also match
+# other projects installed in site-packages
+iari_directory = f"{Path(__file__).resolve().parents[2]}/"
+
+
+class RequestProfiler(BaseModel):
+    """This profiles a single request with the deterministic profiler
+    from the standard library and stores the pstats artifact on disk
+
+    The artifact can be inspected with e.g. snakeviz or
+    python -m pstats json/profiles/<name>.pstats
+
+    We group the time spent by package in the summary, so it is easy to
+    see whether time went into e.g. mwparserfromhell, bs4, fitz or the network.
+    Builtins like socket.recv_into have no file, their time is charged to
+    the group of the function calling them."""
+
+    name: str
+    stats: Optional[Any] = None
+    subfolder = "profiles/"
+
+    # These are the packages we care about when looking for the bottleneck
+    # The first match wins, so the more specific ones go first
+    package_groups: Dict[str, List[str]] = {
+        "network": ["/socket.py", "/ssl.py", "/urllib3/", "/requests/", "/dns/"],
+        "mwparserfromhell": ["/mwparserfromhell/"],
+        "bs4": ["/bs4/", "/lxml/"],
+        "fitz": ["/fitz/", "/pymupdf/"],
+        "langdetect": ["/langdetect/"],
+        "json": ["/json/"],
+        "iari": [iari_directory],
+    }
+
+    class Config:  # dead: disable
+        arbitrary_types_allowed = True  # dead: disable
+
+    @staticmethod
+    def is_allowed(admin_token: str = "") -> bool:
+        """Profiling is allowed if enabled in the config
+        or if the patron supplied the correct admin token"""
+        if config.profiling_enabled:
+            return True
+        if config.profiling_admin_token and admin_token:
+            return hmac.compare_digest(config.profiling_admin_token, admin_token)
+        return False
+
+    @property
+    def path_filename(self) -> str:
+        return f"{config.subdirectory_for_json}{self.subfolder}{self.name}.pstats"
+
+    def run(self, function: Callable, *args, **kwargs) -> Any:
+        """Run the function in the profiler and return its return value"""
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            self.stats = pstats.Stats(profile)
+
+    def write_to_disk(self) -> str:
+        """Store the pstats artifact and return the path"""
+        if not self.stats:
+            raise ValueError("nothing has been profiled yet")
+        path = Path(self.path_filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.stats.dump_stats(str(path))
+        logger.info(f"Wrote profile to {path}")
+        return str(path)
+
+    def __get_group__(self, filename: str) -> str:
+        for group, patterns in self.package_groups.items():
+            if any(pattern in filename for pattern in patterns):
+                return group
+        return "other"
+
+    def __get_caller_group__(self, function: Tuple, seen: Set[Tuple]) -> str:
+        """The group of the function or of its main caller if it is a builtin"""
+        if not self.stats:
+            raise ValueError("nothing has been profiled yet")
+        filename = function[0]
+        if filename != "~":
+            return self.__get_group__(filename=filename)
+        callers = self.stats.stats.get(function, (0, 0, 0, 0, {}))[4]
+        unseen = [caller for caller in callers if caller not in seen]
+        if not unseen:
+            return "other"
+        # The caller that spent the most time in it
+        caller = max(unseen, key=lambda caller: callers[caller][2])
+        return self.__get_caller_group__(function=caller, seen=seen | {function})
+
+    def __get_time_by_group__(
+        self, function: Tuple, total_time: float, callers: Dict[Tuple, Tuple]
+    ) -> Dict[str, float]:
+        """Split the time of a builtin over the groups of its callers"""
+        if function[0] != "~" or not callers:
+            return {self.__get_group__(filename=function[0]): total_time}
+        by_group: Dict[str, float] = {}
+        for caller, (_, _, caller_total_time, _) in callers.items():
+            group = self.__get_caller_group__(function=caller, seen={function})
+            by_group[group] = by_group.get(group, 0.0) + caller_total_time
+        return by_group
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Return the time spent per package group and the top functions in seconds"""
+        if not self.stats:
+            raise ValueError("nothing has been profiled yet")
+        by_group: Dict[str, float] = {}
+        functions = []
+        # stats maps (filename, line, function) to
+        # (primitive calls, total calls, total time, cumulative time, callers)
+        for (filename, line, function), (
+            _,
+            calls,
+            total_time,
+            cumulative_time,
+            callers,
+        ) in self.stats.stats.items():
+            for group, seconds in self.__get_time_by_group__(
+                function=(filename, line, function),
+                total_time=total_time,
+                callers=callers,
+            ).items():
+                by_group[group] = by_group.get(group, 0.0) + seconds
+            functions.append(
+                {
+                    "function": f"{filename}:{line}({function})",
+                    "calls": calls,
+                    "tottime": round(total_time, 6),
+                    "cumtime": round(cumulative_time, 6),
+                }
+            )
+        functions.sort(key=lambda x: x["cumtime"], reverse=True)
+        return {
+            "total_time": round(self.stats.total_tt, 6),
+            "by_package": {
+                group: round(seconds, 6)
+                for group, seconds in sorted(
+                    by_group.items(), key=lambda x: x[1], reverse=True
+                )
+            },
+            "top_functions": functions[: config.profiling_number_of_top_functions],
+        }
+
+    @staticmethod
+    def generate_name(endpoint: str) -> str:
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return f"{endpoint.strip('/').replace('/', '_')}-{timestamp}"
@@ -0,0 +1,41 @@
+"""Conditional requests when the patron asks for a refresh
+
+We keep the ETag and Last-Modified headers of the response a result was
+made from. A refresh sends them back as If-None-Match and If-Modified-Since
+and if the server answers 304 Not Modified the cached result is still
+valid, so we skip both the download and the extraction."""
+from typing import Dict, Mapping
+
+from requests.structures import CaseInsensitiveDict
+
+import config
+
+# The validators of a response and the headers sending them back
+conditional_headers_by_validator = {
+    "etag": "if-none-match",
+    "last-modified": "if-modified-since",
+}
+
+
+def get_validators(headers: Mapping[str, str]) -> Dict[str, str]:
+    """Return the validators found in the response headers"""
+    headers = CaseInsensitiveDict(headers)
+    return {
+        validator: headers[validator]
+        for validator in conditional_headers_by_validator
+        if headers.get(validator)
+    }
+
+
+def get_conditional_headers(validators: Mapping[str, str]) -> Dict[str, str]:
+    """Return the request headers that make the request conditional
+
+    The validators can also be all headers of the previous response."""
+    if not config.conditional_refresh_enabled:
+        return {}
+    validators = CaseInsensitiveDict(validators)
+    return {
+        header: validators[validator]
+        for validator, header in conditional_headers_by_validator.items()
+        if validators.get(validator)
+    }
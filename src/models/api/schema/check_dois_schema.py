@@ -0,0 +1,29 @@
+from marshmallow import post_load, validate
+from marshmallow.fields import Int, List, String
+
+import config
+from src.models.api.job.check_dois_job import CheckDoisJob
+from src.models.api.schema.refresh import BaseSchema
+
+
+class CheckDoisSchema(BaseSchema):
+    """This validates the patron input in the json body of the post request"""
+
+    dois = List(
+        # Blank DOIs would all normalize to the same empty DOI
+        String(validate=validate.Regexp(r".*\S", error="The DOI must not be blank")),
+        required=True,
+        validate=validate.Length(min=1, max=config.check_dois_max_dois),
+    )
+    timeout = Int(required=False)
+
+    # noinspection PyUnusedLocal
+    @post_load
+    # **kwargs is needed here despite what the validator claims
+    def return_object(self, data, **kwargs) -> CheckDoisJob:  # type: ignore # dead: disable
+        """Return job object"""
+        from src import app
+
+        app.logger.debug("return_object: running")
+        job = CheckDoisJob(**data)
+        return job
@@ -0,0 +1,29 @@
+from marshmallow import post_load, validate
+from marshmallow.fields import Bool, Int, List, String
+
+import config
+from src.models.api.job.check_urls_job import CheckUrlsJob
+from src.models.api.schema.refresh import BaseSchema
+
+
+class CheckUrlsSchema(BaseSchema):
+    """This validates the patron input in the json body of the post request"""
+
+    urls = List(
+        String(),
+        required=True,
+        validate=validate.Length(min=1, max=config.check_urls_max_urls),
+    )
+    timeout = Int(required=False)
+    debug = Bool(required=False)
+
+    # noinspection PyUnusedLocal
+    @post_load
+    # **kwargs is needed here despite what the validator claims
+    def return_object(self, data, **kwargs) -> CheckUrlsJob:  # type: ignore # dead: disable
+        """Return job object"""
+        from src import app
+
+        app.logger.debug("return_object: running")
+        job = CheckUrlsJob(**data)
+        return job
@@ -15,6 +15,7 @@ class ReferencesSchema(Schema):
     wari_id = String()
     chunk_size = Int()
     all = Bool()
+    profile = Bool()
 
     # noinspection PyUnusedLocal
     @post_load
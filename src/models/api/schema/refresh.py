@@ -1,6 +1,11 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class BaseSchema(Schema):
     refresh = fields.Bool(required=False)
     testing = fields.Bool(required=False)
+    profile = fields.Bool(required=False)
+    # The time budget in seconds, see src/models/api/deadline.py
+    deadline_seconds = fields.Float(
+        required=False, data_key="deadline", validate=validate.Range(min=0)
+    )
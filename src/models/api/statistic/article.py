@@ -20,7 +20,7 @@ class ArticleStatistics(BaseModel):
     site: str = WikimediaDomain.wikipedia.value  # wikimedia site in question
     timestamp: int = 0  # timestamp at beginning of analysis
     isodate: str = ""  # isodate (human readable) at beginning of analysis
-    timing: int = 0  # time to analyze in seconds
+    timing: Dict[str, float] = {}  # time spent in each stage in milliseconds
     title: str = ""
     fld_counts: Dict[str, int] = {}
     urls: List[str] = []
@@ -28,6 +28,9 @@ class ArticleStatistics(BaseModel):
     revision_id: int = 0
     revision_isodate: str = ""
     revision_timestamp: int = 0
+    # True if the time ran out, see src/models/api/deadline.py
+    incomplete: bool = False
+    incomplete_stages: List[str] = []  # the stages that were cut short
 
     class Config:  # dead: disable
         extra = Extra.forbid  # dead: disable
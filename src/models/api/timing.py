@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List
+
+from pydantic import BaseModel
+
+from src.models.api.enums import TimingStage
+
+
+class StageTimer(BaseModel):
+    """This models the per-stage timing breakdown of a single request
+
+    Durations are stored in milliseconds. Stages can be nested
+    (e.g. a fetch happening while reading the cache) and in that case
+    the time is only attributed to the innermost stage, so the stages
+    never overlap and can be summed.
+
+    We use BaseModel to be able to carry it on the job"""
+
+    stages: Dict[str, float] = {}
+    # This holds the time spent in child stages for each open stage
+    open_stages: List[float] = []
+
+    @contextmanager
+    def measure(self, stage: TimingStage) -> Iterator[None]:
+        """Measure the time spent in the block and attribute it to the stage"""
+        start = perf_counter()
+        self.open_stages.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            time_in_children = self.open_stages.pop()
+            self.add(stage=stage, seconds=elapsed - time_in_children)
+            if self.open_stages:
+                self.open_stages[-1] += elapsed
+
+    def add(self, stage: TimingStage, seconds: float) -> None:
+        milliseconds = self.stages.get(stage.value, 0.0) + seconds * 1000
+        self.stages[stage.value] = round(milliseconds, 3)
+
+    def get_dict(self) -> Dict[str, float]:
+        """Return the stages in a stable order followed by the sum of them"""
+        data = {
+            stage.value: self.stages[stage.value]
+            for stage in TimingStage
+            if stage.value in self.stages
+        }
+        data["total"] = round(sum(data.values()), 3)
+        return data
+
+    def get_server_timing_header(self, total_seconds: float = 0.0) -> str:
+        """Format the stages according to https://www.w3.org/TR/server-timing/
+
+        The total is the wall time of the request as measured by the view
+        and includes time not attributed to any stage"""
+        metrics = [
+            f"{stage};dur={duration}"
+            for stage, duration in self.get_dict().items()
+            if stage != "total"
+        ]
+        if total_seconds:
+            metrics.append(f"total;dur={round(total_seconds * 1000, 3)}")
+        return ", ".join(metrics)
@@ -1,3 +1,6 @@
+from requests import Timeout
+
+
 class MissingInformationError(BaseException):
     pass
 
@@ -8,3 +11,29 @@ class WikipediaApiFetchError(BaseException):
 
 class ResolveError(BaseException):
     pass
+
+
+class UrlCheckDeadlineError(Timeout):
+    """The whole URL check took longer than config.url_check_max_seconds"""
+
+
+class LanguageDetectionError(BaseException):
+    """The language of the text could not be detected"""
+
+
+class DownloadError(BaseException):
+    """The document could not be downloaded or is not one we can work on"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code  # the status code we answer with
+        self.message = message
+
+
+class DeadlineExceededError(Timeout):
+    """The request used up its time budget, see src/models/api/deadline.py"""
+
+
+class WikitextTooComplexError(BaseException):
+    """The wikitext is too large or too complex to parse, see
+    src/models/wikimedia/wikipedia/reference/parsing.py"""
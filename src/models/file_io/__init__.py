@@ -1,9 +1,11 @@
 import json
 import logging
+from contextlib import nullcontext
 from os.path import exists
-from typing import Any, Dict, Optional
+from typing import Any, ContextManager, Dict, Optional
 
 import config
+from src.models.api.enums import TimingStage
 from src.models.api.job import Job
 from src.models.base import WariBaseModel
 
@@ -37,6 +39,12 @@ class FileIo(WariBaseModel):
         app.logger.debug(f"using path: {path_filename}")
         return path_filename
 
+    def __measure__(self, stage: TimingStage) -> ContextManager[None]:
+        """Measure the stage on the job timer if we got a job"""
+        if self.job:
+            return self.job.timer.measure(stage=stage)
+        return nullcontext()
+
     def write_to_disk(
         self,
     ) -> None:
@@ -44,7 +52,16 @@ class FileIo(WariBaseModel):
 
         app.logger.debug("write_to_disk: running")
         # app.logger.debug(os.getcwd())
-        if self.data:
+        with self.__measure__(stage=TimingStage.WRITE):
+            self.__write_to_disk__()
+
+    def __write_to_disk__(self) -> None:
+        from src import app
+
+        if self.data.get("incomplete"):
+            # The next patron should get a chance of a complete result
+            app.logger.info("Skipping write because the data is incomplete")
+        elif self.data:
             path_filename = self.path_filename
             if exists(path_filename):
                 with open(file=path_filename, mode="w") as file:
@@ -66,6 +83,12 @@ class FileIo(WariBaseModel):
         message = "read_from_disk: running"
         app.logger.debug(message)
         app.logger.debug(message)
+        with self.__measure__(stage=TimingStage.CACHE_READ):
+            self.__read_from_disk__()
+
+    def __read_from_disk__(self) -> None:
+        from src import app
+
         path_filename = self.path_filename
         if exists(path_filename):
             with open(file=path_filename) as file:
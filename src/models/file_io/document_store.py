@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import shutil
+from collections import Counter
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import monotonic, time
+from typing import Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class StoredDocument(BaseModel):
+    """What we know about a fetched URL, the content is in the blob at path"""
+
+    url: str
+    content_hash: str  # sha256 of the content
+    size: int
+    status_code: int
+    headers: Dict[str, str] = {}
+    fetched: float  # unix time
+    path: str = ""  # set when read from the store
+
+    @property
+    def age(self) -> float:
+        return time() - self.fetched
+
+
+class DocumentStore:
+    """Content-addressed store of the documents we fetched
+
+    The check-url, pdf and xhtml endpoints fetch the same URL one after
+    another when a patron checks a citation. They share the documents
+    through this store instead of each downloading it again.
+
+    The layout in config.document_store_directory is
+    * urls/<sha256 of the url>.json with a StoredDocument
+    * blobs/<first 2 characters>/<sha256 of the content> with the content
+    so identical documents at different URLs are stored once.
+
+    The store is only used if the directory exists, see
+    setup_json_directories.sh. Files are written to a temporary file
+    and renamed so concurrent workers never see a partial file. Any error
+    is logged and treated as a miss because the store is only a shortcut.
+
+    Storing a document prunes the store every
+    config.document_store_prune_interval_seconds, see prune()."""
+
+    def __init__(self, directory: str = ""):
+        self.directory = directory or config.document_store_directory
+        self.last_pruned = monotonic()
+        self.prune_lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return Path(self.directory).is_dir()
+
+    @staticmethod
+    def __get_hash__(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def __get_record_path__(self, url: str) -> Path:
+        return Path(self.directory, "urls", f"{self.__get_hash__(url.encode())}.json")
+
+    def __get_blob_path__(self, content_hash: str) -> Path:
+        return Path(self.directory, "blobs", content_hash[:2], content_hash)
+
+    @staticmethod
+    def __write_atomically__(path: Path, source: Union[bytes, Path]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(dir=path.parent, delete=False) as file:
+            temporary_path = Path(file.name)
+            if isinstance(source, bytes):
+                file.write(source)
+        if isinstance(source, Path):
+            shutil.copyfile(source, temporary_path)
+        temporary_path.replace(path)
+
+    def get(self, url: str, max_age: int = 0) -> Optional[StoredDocument]:
+        """Return the stored document if it was fetched at most max_age
+        seconds ago (default config.document_store_max_age_seconds)"""
+        if not self.enabled:
+            return None
+        record_path = self.__get_record_path__(url=url)
+        try:
+            document = StoredDocument(**json.loads(record_path.read_text()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read {record_path} from the document store: {e}")
+            return None
+        if document.age > (max_age or config.document_store_max_age_seconds):
+            return None
+        path = self.__get_blob_path__(content_hash=document.content_hash)
+        if not path.exists():
+            return None
+        document.path = str(path)
+        return document
+
+    @staticmethod
+    def read(document: StoredDocument) -> bytes:
+        return Path(document.path).read_bytes()
+
+    def put(
+        self,
+        url: str,
+        status_code: int,
+        headers: Dict[str, str],
+        content: Union[bytes, Path],
+    ) -> Optional[StoredDocument]:
+        """Store the content fetched from the url, large content is
+        passed as the path of the file it was downloaded to"""
+        if not self.enabled:
+            return None
+        try:
+            if isinstance(content, Path):
+                content_hash, size = self.__hash_file__(path=content)
+            else:
+                content_hash, size = self.__get_hash__(content), len(content)
+            blob_path = self.__get_blob_path__(content_hash=content_hash)
+            if blob_path.exists():
+                # prune() must not see it as an old orphan before the record is written
+                blob_path.touch()
+            else:
+                self.__write_atomically__(path=blob_path, source=content)
+            document = StoredDocument(
+                url=url,
+                content_hash=content_hash,
+                size=size,
+                status_code=status_code,
+                headers=dict(headers),
+                fetched=time(),
+            )
+            self.__write_atomically__(
+                path=self.__get_record_path__(url=url),
+                source=document.json(exclude={"path"}).encode(),
+            )
+        except OSError as e:
+            logger.error(f"Could not store {url} in the document store: {e}")
+            return None
+        document.path = str(blob_path)
+        self.__prune_if_due__()
+        return document
+
+    def __prune_if_due__(self) -> None:
+        if (
+            monotonic() - self.last_pruned
+            < config.document_store_prune_interval_seconds
+        ):
+            return
+        # Another thread of this worker is already pruning
+        if not self.prune_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_pruned = monotonic()
+            self.prune()
+        except OSError as e:
+            logger.error(f"Could not prune the document store: {e}")
+        finally:
+            self.prune_lock.release()
+
+    def prune(self) -> None:
+        """Remove the expired records and the blobs no longer referenced
+
+        If the blobs still take up more than config.document_store_max_bytes
+        the oldest records are removed until they fit. Files written less
+        than config.document_store_prune_grace_seconds ago are kept because
+        put() writes the blob before the record."""
+        records: List[Tuple[Path, StoredDocument]] = []
+        for record_path in Path(self.directory, "urls").glob("*"):
+            try:
+                document = StoredDocument(**json.loads(record_path.read_text()))
+            except (OSError, ValueError):
+                # A leftover temporary file or a broken record
+                self.__remove_if_old__(path=record_path)
+                continue
+            if document.age > config.document_store_max_age_seconds:
+                record_path.unlink(missing_ok=True)
+            else:
+                records.append((record_path, document))
+        records.sort(key=lambda record: record[1].fetched)
+        referenced = {document.content_hash for _, document in records}
+        blobs: Dict[str, Path] = {}
+        for blob_path in Path(self.directory, "blobs").glob("*/*"):
+            if blob_path.name in referenced:
+                blobs[blob_path.name] = blob_path
+            else:
+                self.__remove_if_old__(path=blob_path)
+        self.__remove_oldest__(records=records, blobs=blobs)
+
+    def __remove_oldest__(
+        self, records: List[Tuple[Path, StoredDocument]], blobs: Dict[str, Path]
+    ) -> None:
+        """Remove the oldest records and their blobs until the blobs fit"""
+        total = sum(path.stat().st_size for path in blobs.values())
+        references = Counter(document.content_hash for _, document in records)
+        for record_path, document in records:
+            if total <= config.document_store_max_bytes:
+                return
+            record_path.unlink(missing_ok=True)
+            logger.info(f"Removed {document.url} to keep the store small")
+            references[document.content_hash] -= 1
+            if not references[document.content_hash]:
+                blob_path = blobs.pop(document.content_hash, None)
+                if blob_path:
+                    total -= blob_path.stat().st_size
+                    blob_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def __remove_if_old__(path: Path) -> None:
+        if time() - path.stat().st_mtime > config.document_store_prune_grace_seconds:
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def __hash_file__(path: Path) -> Tuple[str, int]:
+        sha256 = hashlib.sha256()
+        with path.open("rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest(), path.stat().st_size
+
+
+document_store = DocumentStore()
@@ -0,0 +1,13 @@
+import logging
+from typing import Any, Dict
+
+from src.models.file_io.hash_based import HashBasedFileIo
+
+logger = logging.getLogger(__name__)
+
+
+class PdfDebugFileIo(HashBasedFileIo):
+    """A debug rendering of a PDF, the id is <url hash>-<format>"""
+
+    data: Dict[str, Any] = {}
+    subfolder = "pdfs/debug/"
@@ -0,0 +1,181 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from ipaddress import ip_address
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from pydantic import BaseModel
+
+import config
+from src.models.api.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class DnsAnswer(BaseModel):
+    """The outcome of resolving a name"""
+
+    name: str
+    found: bool = False
+    nxdomain: bool = False  # the name does not exist
+    no_answer: bool = False  # the name exists but has no A or AAAA record
+    error: bool = False  # e.g. a timeout, these are never cached
+    error_details: str = ""
+    # monotonic() after which the answer must not be used anymore
+    expires: float = 0.0
+
+    @property
+    def is_expired(self) -> bool:
+        return monotonic() >= self.expires
+
+
+class DnsCache:
+    """Process-wide cache of DNS answers
+
+    The same hosts (doi.org, archive.org, nytimes.com, ...) recur in
+    every article so we keep the answers for as long as their TTL allows,
+    capped by config.dns_cache_max_ttl_seconds. Nonexistent names are
+    cached negatively for the TTL given by the SOA record of the zone
+    (or config.dns_cache_negative_ttl_seconds if there is none).
+
+    The resolver can be replaced e.g. to point it at a fake one in tests."""
+
+    def __init__(self, resolver: Optional[Any] = None):
+        self.resolver = resolver
+        self.answers: Dict[str, DnsAnswer] = {}
+        self.lock = Lock()
+
+    def __get_resolver__(self) -> Any:
+        if not self.resolver:
+            from dns.resolver import Resolver
+
+            self.resolver = Resolver()
+            self.resolver.lifetime = config.dns_timeout_seconds
+        return self.resolver
+
+    @staticmethod
+    def __get_key__(name: str) -> str:
+        return name.lower().rstrip(".")
+
+    def get(self, name: str) -> Optional[DnsAnswer]:
+        """Return the cached answer without resolving"""
+        with self.lock:
+            answer = self.answers.get(self.__get_key__(name))
+            if answer and answer.is_expired:
+                del self.answers[self.__get_key__(name)]
+                return None
+            return answer
+
+    def resolve(self, name: str) -> DnsAnswer:
+        """Return the cached answer or resolve the name"""
+        answer = self.get(name=name)
+        if answer:
+            return answer
+        answer = self.__resolve__(name=name)
+        if not answer.error:
+            self.__store__(answer=answer)
+        return answer
+
+    def resolve_many(
+        self, names: Iterable[str], deadline: Optional[Deadline] = None
+    ) -> Dict[str, DnsAnswer]:
+        """Resolve the names concurrently, e.g. for all URLs in an article
+
+        Names that are still waiting when the deadline runs out are skipped."""
+        unique_names = list(dict.fromkeys(self.__get_key__(name) for name in names))
+        deadline = deadline or Deadline()
+
+        def resolve(name: str) -> Optional[DnsAnswer]:
+            return None if deadline.expired else self.resolve(name=name)
+
+        with ThreadPoolExecutor(
+            max_workers=config.dns_max_concurrent_lookups
+        ) as executor:
+            answers = executor.map(resolve, unique_names)
+            return {
+                name: answer
+                for name, answer in zip(unique_names, answers)
+                if answer is not None
+            }
+
+    def resolve_hosts(
+        self, urls: Iterable[str], deadline: Optional[Deadline] = None
+    ) -> Dict[str, DnsAnswer]:
+        """Resolve the distinct hosts of the URLs before checking them
+
+        The checks then skip the hosts that do not exist without a request,
+        see Url.__is_known_to_not_exist__(). IP addresses and names without
+        a dot like localhost are left to the system resolver."""
+        hosts = []
+        for url in urls:
+            host = urlparse(url).hostname or ""
+            if "." not in host.strip("."):
+                continue
+            try:
+                ip_address(host)
+            except ValueError:
+                hosts.append(host)
+        return self.resolve_many(names=hosts, deadline=deadline)
+
+    def __store__(self, answer: DnsAnswer) -> None:
+        with self.lock:
+            if len(self.answers) >= config.dns_cache_max_entries:
+                # Evict the oldest entry, dicts keep the insertion order
+                del self.answers[next(iter(self.answers))]
+            self.answers[self.__get_key__(answer.name)] = answer
+
+    @staticmethod
+    def __get_negative_ttl__(exception: Any) -> float:
+        """Find the SOA record in the authority section of the NXDOMAIN response
+
+        See https://www.rfc-editor.org/rfc/rfc2308#section-5"""
+        from dns.rdatatype import SOA
+
+        for response in exception.responses().values():
+            for rrset in response.authority:
+                if rrset.rdtype == SOA:
+                    return float(min(rrset.ttl, rrset[0].minimum))
+        return float(config.dns_cache_negative_ttl_seconds)
+
+    def __resolve_addresses__(self, name: str) -> Any:
+        """The A records or the AAAA records of IPv6-only hosts"""
+        from dns.resolver import NoAnswer
+
+        try:
+            return self.__get_resolver__().resolve(name, "A")
+        except NoAnswer:
+            return self.__get_resolver__().resolve(name, "AAAA")
+
+    def __resolve__(self, name: str) -> DnsAnswer:
+        from dns.exception import DNSException
+        from dns.resolver import NXDOMAIN, NoAnswer
+
+        logger.info(f"Trying to resolve {name}")
+        answer = DnsAnswer(name=self.__get_key__(name))
+        ttl: float = 0.0
+        try:
+            result = self.__resolve_addresses__(name=name)
+            answer.found = True
+            ttl = float(result.rrset.ttl) if result.rrset else 0.0
+        except NXDOMAIN as e:
+            answer.nxdomain = True
+            ttl = self.__get_negative_ttl__(exception=e)
+        except NoAnswer:
+            answer.no_answer = True
+            ttl = float(config.dns_cache_negative_ttl_seconds)
+        except DNSException as e:
+            # e.g. LifetimeTimeout, NoNameservers or EmptyLabel
+            answer.error = True
+            answer.error_details = str(e)
+        answer.expires = monotonic() + min(ttl, config.dns_cache_max_ttl_seconds)
+        return answer
+
+    def clear(self) -> None:  # dead: disable
+        """Convenience method used in tests"""
+        with self.lock:
+            self.answers.clear()
+
+
+dns_cache = DnsCache()
@@ -1,20 +1,44 @@
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from time import monotonic
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, List, Optional, Set
 from urllib.parse import quote
 
-import pyalex  # type: ignore
 import requests
-from pyalex import Works  # type: ignore
 from pydantic import BaseModel
-from wikibaseintegrator import WikibaseIntegrator  # type: ignore
-from wikibaseintegrator.entities import ItemEntity  # type: ignore
-from wikibaseintegrator.models import Claim  # type: ignore
-from wikibaseintegrator.wbi_config import config  # type: ignore
-from wikibaseintegrator.wbi_helpers import fulltext_search  # type: ignore
+from requests import Timeout
+
+import config
+from src.models.api.deadline import Deadline
+from src.models.identifiers_checking.doi_index import doi_index
+from src.models.identifiers_checking.enums import DoiSourceStatus
+
+if TYPE_CHECKING:
+    from wikibaseintegrator import WikibaseIntegrator  # type: ignore
 
 instance_of = "P31"
 retracted_item = "Q45182324"  # see https://www.wikidata.org/wiki/Q45182324
-pyalex.config.email = "info@archive.org"
-config["USER_AGENT"] = "wcdimportbot"
+
+
+@lru_cache(maxsize=None)
+def get_wikibase_integrator() -> "WikibaseIntegrator":
+    """Import and configure wikibaseintegrator on first use
+
+    It is slow to import so we don't want every worker to pay for it
+    when booting. See src/helpers/preload.py"""
+    from wikibaseintegrator import WikibaseIntegrator
+    from wikibaseintegrator.wbi_config import config  # type: ignore
+
+    config["USER_AGENT"] = "wcdimportbot"
+    return WikibaseIntegrator()
+
+
+def get_outcome(future: Future, done: Set[Future]) -> Dict[str, Any]:
+    """Return the result and error of the future if it is done"""
+    if future not in done:
+        return {"result": None, "error": None}
+    error = future.exception()
+    return {"result": None if error else future.result(), "error": error}
 
 
 class Doi(BaseModel):
@@ -27,67 +51,255 @@ class Doi(BaseModel):
     doi: str
     found_in_wikidata: bool = False
     found_in_openalex: bool = False
-    wikidata_entity: Optional[ItemEntity]
+    wikidata_instance_of: List[str] = []  # the P31 values of the item
     marked_as_retracted_in_wikidata: bool = False
     marked_as_retracted_in_openalex: bool = False
     wikidata_entity_qid: str = ""
     openalex_work_uri: str = ""
-    wbi = WikibaseIntegrator()
     timeout: int = 2
     internet_archive_scholar: Dict[str, Any] = {}
+    # monotonic() after which we stop waiting for the sources, 0 means no deadline
+    deadline: float = 0.0
+    # The time budget of the request, the lookup never goes beyond it
+    request_deadline: Deadline = Deadline()
+    # The DoiSourceStatus value of every source
+    sources: Dict[str, str] = {}
+    partial: bool = False  # True if any of the sources timed out or failed
+    found_in_index: bool = False
+    index: Dict[str, Any] = {}  # the record in the local index, see DoiIndex
 
-    class Config:  # dead: disable
-        arbitrary_types_allowed = True  # dead: disable
+    # The fields each source sets, see __lookup_in_source__()
+    source_fields: ClassVar[Dict[str, List[str]]] = {
+        "openalex": [
+            "found_in_openalex",
+            "marked_as_retracted_in_openalex",
+            "openalex",
+        ],
+        "wikidata": [
+            "found_in_wikidata",
+            "wikidata_entity_qid",
+            "wikidata_instance_of",
+            "marked_as_retracted_in_wikidata",
+            "wikidata",
+        ],
+        "internet_archive_scholar": ["internet_archive_scholar"],
+        "fatcat": ["fatcat"],
+    }
 
     @property
     def wikidata_entity_uri(self):
         return f"http://www.wikidata.org/entity/{self.wikidata_entity_qid}"
 
+    @property
+    def __request_timeout__(self) -> float:
+        """The timeout of a single request to a source
+
+        It never goes beyond the deadline of the whole lookup"""
+        if not self.deadline:
+            return float(self.timeout)
+        return max(0.1, min(float(self.timeout), self.deadline - monotonic()))
+
+    @property
+    def __wikidata_api_arguments__(self) -> Dict[str, Any]:
+        """Arguments for the wikibaseintegrator helpers
+
+        By default they retry for ages which is not what a patron wants"""
+        return {
+            "mediawiki_api_url": config.wikidata_api_url,
+            "max_retries": 1,
+            "retry_after": 0,
+            "timeout": self.__request_timeout__,
+        }
+
     def lookup_doi(self):
-        """Helper method"""
+        """Look up the DOI in all the sources at the same time
+
+        We wait at most config.doi_lookup_max_seconds or what is left of the
+        time budget of the request. Sources that did not answer by then are
+        marked as timed out in self.sources and the result is partial."""
         from src import app
 
         app.logger.debug("lookup_doi: running")
-        self.__lookup_doi_in_openalex__()
-        self.__lookup_via_cirrussearch__()
-        self.__lookup_in_internet_archive_scholar__()
-        self.__analyze_wikidata_entity__()
-        self.__get_wikidata_json__()
-        self.__log_if_retracted_or_not__()
-        self.__lookup_in_fatcat__()
+        if self.__lookup_in_index__():
+            self.__finish_lookup__()
+            return
+        max_seconds = self.request_deadline.cap(seconds=config.doi_lookup_max_seconds)
+        if not max_seconds:
+            self.__give_up__()
+            self.__finish_lookup__()
+            return
+        self.deadline = monotonic() + max_seconds
+        executor = ThreadPoolExecutor(max_workers=len(self.source_fields))
+        futures = {
+            executor.submit(self.__lookup_in_source__, source): source
+            for source in self.source_fields
+        }
+        done, _ = wait(futures, timeout=max_seconds)
+        # We don't wait for the slow sources, their requests time out on their own.
+        # shutdown(cancel_futures=True) needs Python 3.9 so we cancel them here.
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+        for future, source in futures.items():
+            self.__set_outcome__(source=source, **get_outcome(future=future, done=done))
+        self.__finish_lookup__()
 
-    def __lookup_doi_in_openalex__(self):
+    def __lookup_in_index__(self) -> bool:
+        """Answer from the local index if it knows the DOI, see DoiIndex"""
         from src import app
 
-        app.logger.info("Looking up DOI in OpenAlex")
-        work = Works()[f"https://doi.org/{self.doi}"]
-        if work:
-            app.logger.debug("found work :)")
+        record = doi_index.get(doi=self.doi)
+        if not record:
+            return False
+        app.logger.info("Found the DOI in the local index")
+        self.found_in_index = True
+        self.index = record
+        if record["openalex_id"]:
             self.found_in_openalex = True
-            self.marked_as_retracted_in_openalex = bool(work["is_retracted"])
+            self.marked_as_retracted_in_openalex = bool(record["retracted_in_openalex"])
             self.openalex = {
-                "id": work["id"],
-                "details": work,
+                "id": record["openalex_id"],
                 "retracted": self.marked_as_retracted_in_openalex,
             }
-            app.logger.info(
-                f"Retracted in OpenAlex: {self.marked_as_retracted_in_openalex}"
-            )
+        self.sources = {"index": DoiSourceStatus.OK.value}
+        return True
+
+    def __give_up__(self) -> None:
+        """The time budget of the request ran out so we don't ask the sources"""
+        from src import app
 
-    def __get_wikidata_entity__(self):
+        app.logger.warning(f"Not looking up {self.doi} because the time ran out")
+        for source in self.source_fields:
+            self.sources[source] = DoiSourceStatus.TIMEOUT.value
+
+    def __set_outcome__(
+        self,
+        source: str,
+        result: Optional["Doi"],
+        error: Optional[BaseException],
+    ) -> None:
+        """Take over the fields the source set on its copy of the DOI
+
+        No result and no error means the source did not answer in time"""
         from src import app
 
-        app.logger.debug("__get_wikidata_entity__: running")
+        if isinstance(error, Timeout) or (not result and not error):
+            app.logger.warning(f"{source} did not answer in time for {self.doi}")
+            self.sources[source] = DoiSourceStatus.TIMEOUT.value
+        elif error or not result:
+            app.logger.error(f"Could not look up {self.doi} in {source}: {error}")
+            self.sources[source] = DoiSourceStatus.ERROR.value
+        else:
+            for field in self.source_fields[source]:
+                setattr(self, field, getattr(result, field))
+            self.sources[source] = DoiSourceStatus.OK.value
+
+    def __finish_lookup__(self) -> None:
+        self.partial = any(
+            status != DoiSourceStatus.OK.value for status in self.sources.values()
+        )
+        self.__log_if_retracted_or_not__()
+
+    def __lookup_in_source__(self, source: str) -> "Doi":
+        """Look up the DOI in the source using a copy of this object
+
+        A source that misses the deadline keeps running in the background
+        so it must not change the result after we returned it"""
+        doi = self.copy(deep=True)
+        if source == "openalex":
+            doi.__lookup_doi_in_openalex__()
+        elif source == "wikidata":
+            doi.__lookup_via_cirrussearch__()
+            doi.__analyze_wikidata_entity__()
+            doi.__get_wikidata_json__()
+        elif source == "internet_archive_scholar":
+            doi.__lookup_in_internet_archive_scholar__()
+        elif source == "fatcat":
+            doi.__lookup_in_fatcat__()
+        return doi
+
+    def __get_json__(self, url: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Return None if the source does not know the DOI"""
+        response = requests.get(url, timeout=self.__request_timeout__, **kwargs)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        data: Dict[str, Any] = response.json()
+        return data
+
+    def __lookup_doi_in_openalex__(self):
+        from src import app
+
+        app.logger.info("Looking up DOI in OpenAlex")
+        work = self.__get_json__(
+            f"{config.openalex_api_url}/works/https://doi.org/{self.doi}",
+            params={"mailto": config.openalex_email},
+        )
+        if work:
+            self.__set_openalex_work__(work=work)
+
+    def __set_openalex_work__(self, work: Dict[str, Any]) -> None:
+        from src import app
+
+        app.logger.debug("found work :)")
+        self.found_in_openalex = True
+        self.marked_as_retracted_in_openalex = bool(work["is_retracted"])
+        self.openalex = {
+            "id": work["id"],
+            "details": work,
+            "retracted": self.marked_as_retracted_in_openalex,
+        }
+        app.logger.info(
+            f"Retracted in OpenAlex: {self.marked_as_retracted_in_openalex}"
+        )
+
+    def __get_wikidata_instance_of__(self):
+        """Fetch only the instance of claims instead of the whole item
+
+        Scholarly items can be huge because of all the authors and cited works"""
+        from wikibaseintegrator.wbi_helpers import (  # type: ignore
+            mediawiki_api_call_helper,
+        )
+
+        from src import app
+
+        app.logger.debug("__get_wikidata_instance_of__: running")
         if self.found_in_wikidata:
-            self.wikidata_entity = self.wbi.item.get(
-                entity_id=self.wikidata_entity_qid.replace(
-                    "https://www.wikidata.org/wiki/", ""
-                )
+            # get_wikibase_integrator() sets the user agent
+            get_wikibase_integrator()
+            data = mediawiki_api_call_helper(
+                data={
+                    "action": "wbgetclaims",
+                    "entity": self.wikidata_entity_qid.replace(
+                        "https://www.wikidata.org/wiki/", ""
+                    ),
+                    "property": instance_of,
+                    # We don't need the references
+                    "props": "",
+                    "format": "json",
+                },
+                allow_anonymous=True,
+                **self.__wikidata_api_arguments__,
             )
+            self.wikidata_instance_of = [
+                claim["mainsnak"]["datavalue"]["value"]["id"]
+                for claim in data.get("claims", {}).get(instance_of, [])
+                if claim["mainsnak"].get("datavalue")
+            ]
+
+    def __set_wikidata_instance_of__(
+        self, qid: str, instance_of_values: List[str]
+    ) -> None:
+        """Analyze what we got for many DOIs at once, see DoiBatch"""
+        self.found_in_wikidata = True
+        self.wikidata_entity_qid = qid
+        self.wikidata_instance_of = instance_of_values
+        self.__determine_if_retracted_in_wikidata__()
+        self.__get_wikidata_json__()
 
     def __analyze_wikidata_entity__(self):
         """Helper method"""
-        self.__get_wikidata_entity__()
+        self.__get_wikidata_instance_of__()
         self.__determine_if_retracted_in_wikidata__()
         # self.count_cites_work_statements()
         # self.get_count_of_all_statements()
@@ -95,17 +307,26 @@ class Doi(BaseModel):
     def __determine_if_retracted_in_wikidata__(self):
         from src import app
 
-        if self.wikidata_entity:
-            instance_of_claims = self.wikidata_entity.claims.get(property=instance_of)
-            app.logger.debug(f"Found {len(instance_of_claims)} instance of claims")
-            # console.print(instance_of_claims)
-            self.__iterate_claims__(claims=instance_of_claims)
+        app.logger.debug(
+            f"Found {len(self.wikidata_instance_of)} instance of claims: "
+            f"{self.wikidata_instance_of}"
+        )
+        if retracted_item in self.wikidata_instance_of:
+            self.marked_as_retracted_in_wikidata = True
+            app.logger.info("This paper is marked as retracted in Wikidata")
 
     def __lookup_via_cirrussearch__(self) -> None:
+        from wikibaseintegrator.wbi_helpers import fulltext_search  # type: ignore
+
         from src import app
 
+        # get_wikibase_integrator() sets the user agent
+        get_wikibase_integrator()
         entities = fulltext_search(
-            search=f"haswbstatement:P356={self.doi}", max_results=1
+            # Wikidata stores DOIs upper-cased by convention and the search is exact
+            search=f"haswbstatement:P356={self.doi.upper()}",
+            max_results=1,
+            **self.__wikidata_api_arguments__,
         )
         if entities:
             # We only care about the first because there should only be one
@@ -116,25 +337,6 @@ class Doi(BaseModel):
             self.found_in_wikidata = False
             app.logger.info("DOI not found via CirrusSearch")
 
-    def __determine_if_retracted__(self, claim: Claim) -> None:
-        from src import app
-
-        app.logger.debug("__determine_if_retracted__: running")
-        # console.print(claim)
-        datavalue = claim.mainsnak.datavalue
-        # print(datavalue)
-        value = datavalue["value"]
-        if isinstance(value, dict) and "id" in value:
-            qid_value = value["id"]
-            app.logger.debug(f"found P31: '{qid_value}'")
-            if qid_value == retracted_item:
-                self.marked_as_retracted_in_wikidata = True
-                app.logger.info("This paper is marked as retracted in Wikidata")
-
-    def __iterate_claims__(self, claims: List[Claim]) -> None:
-        for claim in claims:
-            self.__determine_if_retracted__(claim=claim)
-
     def __log_if_retracted_or_not__(self):
         from src import app
 
@@ -181,33 +383,38 @@ class Doi(BaseModel):
                 "doi",
                 "fatcat",
                 "internet_archive_scholar",
+                "sources",
+                "partial",
+                "index",
             }
         )
         return data
 
     def __lookup_in_fatcat__(self):
         """DOIs in fatcat are all lowercase"""
-        url = f"https://api.fatcat.wiki/v0/release/lookup?doi={self.doi.lower()}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
+        data = self.__get_json__(
+            f"{config.fatcat_api_url}/release/lookup",
+            params={"doi": self.doi.lower()},
+        )
+        if data:
             self.fatcat["id"] = data["ident"]
             self.fatcat["details"] = data
             # console.print(self.fatcat)
 
     def __get_wikidata_json__(self):
-        if self.found_in_wikidata and self.wikidata_entity:
+        if self.found_in_wikidata:
             self.wikidata = {
-                "details": self.wikidata_entity.get_json(),
-                "id": self.wikidata_entity.id,
+                "id": self.wikidata_entity_qid,
+                "instance_of": self.wikidata_instance_of,
                 "retracted": self.marked_as_retracted_in_wikidata,
             }
 
     def __lookup_in_internet_archive_scholar__(self):
         """This is a fastapi frontend to elastic search"""
         query = f"doi{quote(':')}{quote(self.doi, safe='')}"
-        url = f"https://scholar.archive.org/search?q={query}"
-        response = requests.get(url, headers={"Accept": "application/json"})
-        if response.status_code == 200:
-            data = response.json()
+        data = self.__get_json__(
+            f"{config.internet_archive_scholar_url}/search?q={query}",
+            headers={"Accept": "application/json"},
+        )
+        if data:
             self.internet_archive_scholar = data
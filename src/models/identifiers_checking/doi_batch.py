@@ -0,0 +1,228 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from src.models.api.deadline import Deadline
+from src.models.identifiers_checking.doi import (
+    Doi,
+    get_outcome,
+    get_wikibase_integrator,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_doi(doi: str) -> str:
+    """DOIs are case-insensitive, see https://www.doi.org/the-identifier/resources/handbook/2_numbering#2.4"""
+    return doi.strip().lower()
+
+
+class DoiBatch:
+    """Look up many DOIs with as few requests as possible
+
+    OpenAlex takes up to config.doi_batch_openalex_chunk_size DOIs in one
+    filter. Wikidata is searched for many P356 values at once and the
+    DOIs and instance of values of the items found are fetched in one
+    SPARQL query. Internet Archive Scholar and
+    fatcat have no batch API so every DOI is looked up on its own, a few
+    at a time.
+
+    Like Doi.lookup_doi() we wait at most config.doi_lookup_max_seconds
+    or what is left of the time budget of the request and every lookup
+    works on copies of the DOIs."""
+
+    def __init__(
+        self, dois: List[str], timeout: int = 2, deadline: Optional[Deadline] = None
+    ):
+        self.deadline = deadline or Deadline()
+        self.dois: Dict[str, Doi] = {}
+        for doi in dois:
+            normalized_doi = normalize_doi(doi)
+            if normalized_doi and normalized_doi not in self.dois:
+                self.dois[normalized_doi] = Doi(
+                    doi=normalized_doi,
+                    timeout=timeout,
+                    request_deadline=self.deadline,
+                )
+
+    @staticmethod
+    def __get_chunks__(dois: List[str], size: int) -> List[List[str]]:
+        return [dois[index : index + size] for index in range(0, len(dois), size)]
+
+    @staticmethod
+    def __get_search_chunks__(dois: List[str]) -> List[List[str]]:
+        """CirrusSearch refuses queries longer than
+        config.wikidata_search_max_query_length characters"""
+        chunks: List[List[str]] = []
+        length = 0
+        for doi in dois:
+            term = f"P356={doi}"
+            if (
+                chunks
+                and length + len(term) + 1 <= config.wikidata_search_max_query_length
+            ):
+                chunks[-1].append(doi)
+                length += len(term) + 1
+            else:
+                chunks.append([doi])
+                length = len("haswbstatement:") + len(term)
+        return chunks
+
+    def __copy_dois__(self, dois: List[str]) -> Dict[str, Doi]:
+        return {doi: self.dois[doi].copy(deep=True) for doi in dois}
+
+    def __lookup_in_openalex__(self, dois: List[str]) -> Dict[str, Doi]:
+        results = self.__copy_dois__(dois=dois)
+        data = results[dois[0]].__get_json__(
+            f"{config.openalex_api_url}/works",
+            params={
+                "filter": f"doi:{'|'.join(dois)}",
+                "per-page": len(dois),
+                "mailto": config.openalex_email,
+            },
+        )
+        for work in (data or {}).get("results", []):
+            doi = normalize_doi(str(work.get("doi")).replace("https://doi.org/", ""))
+            if doi in results:
+                results[doi].__set_openalex_work__(work=work)
+        return results
+
+    def __lookup_in_wikidata__(self, dois: List[str]) -> Dict[str, Doi]:
+        """Find the items by searching and get the DOIs and instance of
+        values of all of them in one query"""
+        from wikibaseintegrator.wbi_helpers import fulltext_search  # type: ignore
+
+        results = self.__copy_dois__(dois=dois)
+        first = results[dois[0]]
+        # get_wikibase_integrator() sets the user agent
+        get_wikibase_integrator()
+        # The search matches the value exactly and Wikidata stores DOIs
+        # upper-cased by convention, the lowercase DOIs are only our keys
+        terms = "|".join(f"P356={doi.upper()}" for doi in dois)
+        entities = fulltext_search(
+            search=f"haswbstatement:{terms}",
+            # A DOI can be on more than one item by mistake
+            max_results=min(2 * len(dois), 50),
+            **first.__wikidata_api_arguments__,
+        )
+        qids = list(dict.fromkeys(entity["title"] for entity in entities))
+        if not qids:
+            return results
+        data = first.__get_json__(
+            config.wikidata_sparql_url,
+            params={"query": self.__get_sparql_query__(qids=qids)},
+            headers={
+                "Accept": "application/sparql-results+json",
+                "User-Agent": config.user_agent,
+            },
+        )
+        for qid, item in self.__get_items__(data=data or {}).items():
+            for doi in item["dois"]:
+                if doi in results and not results[doi].found_in_wikidata:
+                    results[doi].__set_wikidata_instance_of__(
+                        qid=qid, instance_of_values=item["instance_of"]
+                    )
+        return results
+
+    @staticmethod
+    def __get_sparql_query__(qids: List[str]) -> str:
+        values = " ".join(f"wd:{qid}" for qid in qids)
+        return (
+            "SELECT ?item ?doi ?instance_of WHERE { "
+            f"VALUES ?item {{ {values} }} "
+            "?item p:P356/ps:P356 ?doi . "
+            "OPTIONAL { ?item p:P31/ps:P31 ?instance_of . } }"
+        )
+
+    @staticmethod
+    def __get_items__(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Group the rows by item, there is a row per DOI and instance of value"""
+        items: Dict[str, Dict[str, Any]] = {}
+        for row in data.get("results", {}).get("bindings", []):
+            qid = row["item"]["value"].rsplit("/", 1)[-1]
+            item = items.setdefault(qid, {"dois": set(), "instance_of": []})
+            item["dois"].add(normalize_doi(row["doi"]["value"]))
+            if "instance_of" in row:
+                value = row["instance_of"]["value"].rsplit("/", 1)[-1]
+                if value not in item["instance_of"]:
+                    item["instance_of"].append(value)
+        return items
+
+    def __lookup_one__(self, doi: str, source: str) -> Dict[str, Doi]:
+        return {doi: self.dois[doi].__lookup_in_source__(source=source)}
+
+    def __get_tasks__(
+        self, dois: List[str]
+    ) -> List[Tuple[str, List[str], Callable, Dict[str, Any]]]:
+        """Return (source, dois, function, arguments) for every request we need"""
+        # These characters separate the values in the OpenAlex filter
+        batchable = [doi for doi in dois if "|" not in doi and "," not in doi]
+        tasks: List[Tuple[str, List[str], Callable, Dict[str, Any]]] = [
+            ("openalex", chunk, self.__lookup_in_openalex__, {"dois": chunk})
+            for chunk in self.__get_chunks__(
+                dois=batchable, size=config.doi_batch_openalex_chunk_size
+            )
+        ]
+        tasks.extend(
+            ("openalex", [doi], self.__lookup_one__, {"doi": doi, "source": "openalex"})
+            for doi in dois
+            if doi not in batchable
+        )
+        tasks.extend(
+            ("wikidata", chunk, self.__lookup_in_wikidata__, {"dois": chunk})
+            for chunk in self.__get_search_chunks__(dois=dois)
+        )
+        for source in ["internet_archive_scholar", "fatcat"]:
+            tasks.extend(
+                (source, [doi], self.__lookup_one__, {"doi": doi, "source": source})
+                for doi in dois
+            )
+        return tasks
+
+    def lookup(self) -> None:
+        """Look up all the DOIs in all the sources"""
+        # The DOIs in the local index need no requests at all
+        misses = [
+            doi
+            for doi, looked_up in self.dois.items()
+            if not looked_up.__lookup_in_index__()
+        ]
+        if misses:
+            self.__lookup_in_sources__(dois=misses)
+        for looked_up in self.dois.values():
+            looked_up.__finish_lookup__()
+
+    def __lookup_in_sources__(self, dois: List[str]) -> None:
+        max_seconds = self.deadline.cap(seconds=config.doi_lookup_max_seconds)
+        if not max_seconds:
+            for doi in dois:
+                self.dois[doi].__give_up__()
+            return
+        deadline = monotonic() + max_seconds
+        for looked_up in self.dois.values():
+            looked_up.deadline = deadline
+        executor = ThreadPoolExecutor(
+            max_workers=config.doi_batch_max_concurrent_requests
+        )
+        futures: Dict[Future, Tuple[str, List[str]]] = {
+            executor.submit(function, **arguments): (source, task_dois)
+            for source, task_dois, function, arguments in self.__get_tasks__(dois=dois)
+        }
+        logger.info(f"Looking up {len(dois)} DOIs with {len(futures)} requests")
+        done, _ = wait(futures, timeout=max_seconds)
+        # We don't wait for the slow sources, their requests time out on their own.
+        # The requests that did not start yet are cancelled, we don't use
+        # shutdown(cancel_futures=True) because it needs Python 3.9.
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+        for future, (source, task_dois) in futures.items():
+            outcome = get_outcome(future=future, done=done)
+            for doi in task_dois:
+                self.dois[doi].__set_outcome__(
+                    source=source,
+                    result=outcome["result"][doi] if outcome["result"] else None,
+                    error=outcome["error"],
+                )
@@ -0,0 +1,219 @@
+import csv
+import gzip
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+schema = """
+CREATE TABLE IF NOT EXISTS works (
+    doi TEXT PRIMARY KEY,  -- lowercased
+    openalex_id TEXT,
+    retracted_in_openalex INTEGER,
+    retracted_in_retraction_list INTEGER NOT NULL DEFAULT 0,
+    updated TEXT  -- the updated_date of the OpenAlex work
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    modified REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested TEXT NOT NULL
+);
+"""
+
+upsert_openalex_work = """
+INSERT INTO works (doi, openalex_id, retracted_in_openalex, updated)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (doi) DO UPDATE SET
+    openalex_id = excluded.openalex_id,
+    retracted_in_openalex = excluded.retracted_in_openalex,
+    updated = excluded.updated
+WHERE works.updated IS NULL OR excluded.updated >= works.updated
+"""
+
+upsert_retracted_doi = """
+INSERT INTO works (doi, retracted_in_retraction_list) VALUES (?, 1)
+ON CONFLICT (doi) DO UPDATE SET retracted_in_retraction_list = 1
+"""
+
+
+class DoiIndex:
+    """Local index of DOIs built from bulk files, see src/helpers/ingest_doi_index.py
+
+    It is a SQLite database with one row per DOI so a lookup is a
+    single primary key read. Two kinds of files can be ingested:
+    * a snapshot of OpenAlex works as (gzipped) JSON lines,
+      we keep only the DOI, the id, is_retracted and updated_date
+    * a retraction list as CSV, e.g. the one from Retraction Watch
+
+    Ingesting is incremental: files that did not change since they were
+    ingested are skipped and newer OpenAlex records replace older ones.
+
+    The API only reads the index. Every thread gets its own read-only
+    connection which is opened on first use, so nothing is shared
+    between the workers forked by gunicorn."""
+
+    def __init__(self, path: str = ""):
+        self.path = path or config.doi_index_path
+        self.local = threading.local()
+
+    def __get_reader__(self) -> Optional[sqlite3.Connection]:
+        if getattr(self.local, "path", "") == self.path:
+            connection: sqlite3.Connection = self.local.connection
+            return connection
+        if not Path(self.path).exists():
+            return None
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        self.local.connection = connection
+        self.local.path = self.path
+        return connection
+
+    def get(self, doi: str) -> Optional[Dict[str, Any]]:
+        """Return the record of the DOI or None if it is not in the index"""
+        connection = self.__get_reader__()
+        if not connection:
+            return None
+        try:
+            row = connection.execute(
+                "SELECT * FROM works WHERE doi = ?", (doi.strip().lower(),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Could not read the DOI index: {e}")
+            return None
+        if not row:
+            return None
+        record = dict(row)
+        for key in ["retracted_in_openalex", "retracted_in_retraction_list"]:
+            if record[key] is not None:
+                record[key] = bool(record[key])
+        return record
+
+    def __connect_for_writing__(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        # Readers are not blocked while we ingest
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(schema)
+        return connection
+
+    @staticmethod
+    def __open__(path: str) -> IO[str]:
+        if path.endswith(".gz"):
+            return gzip.open(path, mode="rt", encoding="utf-8")
+        return Path(path).open(encoding="utf-8")
+
+    @staticmethod
+    def __get_openalex_rows__(
+        lines: Iterable[str],
+    ) -> Iterator[Tuple[str, str, int, str]]:
+        for line in lines:
+            if not line.strip():
+                continue
+            work = json.loads(line)
+            doi = work.get("doi") or ""
+            if not doi:
+                continue
+            yield (
+                doi.replace("https://doi.org/", "").strip().lower(),
+                work.get("id", ""),
+                int(bool(work.get("is_retracted"))),
+                work.get("updated_date") or "",
+            )
+
+    @staticmethod
+    def __get_retraction_list_rows__(
+        file: IO[str], doi_column: str
+    ) -> Iterator[Tuple[str]]:
+        for row in csv.DictReader(file):
+            doi = (row.get(doi_column) or "").strip().lower()
+            # The list uses e.g. "unavailable" for papers without a DOI
+            if doi.startswith("10."):
+                yield (doi,)
+
+    @staticmethod
+    def __execute_in_chunks__(
+        connection: sqlite3.Connection, sql: str, rows: Iterator[Tuple]
+    ) -> int:
+        count = 0
+        chunk: List[Tuple] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == config.doi_index_ingestion_chunk_size:
+                connection.executemany(sql, chunk)
+                count += len(chunk)
+                chunk = []
+        connection.executemany(sql, chunk)
+        return count + len(chunk)
+
+    def ingest_file(
+        self,
+        path: str,
+        doi_column: str = "OriginalPaperDOI",
+        force: bool = False,
+    ) -> int:
+        """Ingest a file unless it was already ingested and did not change
+
+        CSV files are retraction lists, everything else is read as OpenAlex works.
+        Return the number of rows ingested."""
+        absolute_path = str(Path(path).resolve())
+        stat = Path(path).stat()
+        connection = self.__connect_for_writing__()
+        try:
+            known = connection.execute(
+                "SELECT size, modified FROM files WHERE path = ?",
+                (absolute_path,),
+            ).fetchone()
+            if known == (stat.st_size, stat.st_mtime) and not force:
+                logger.info(f"Skipping {path} which did not change")
+                return 0
+            # Everything from one file is committed at once
+            with connection, self.__open__(path) as file:
+                if ".csv" in path:
+                    count = self.__execute_in_chunks__(
+                        connection=connection,
+                        sql=upsert_retracted_doi,
+                        rows=self.__get_retraction_list_rows__(
+                            file=file, doi_column=doi_column
+                        ),
+                    )
+                else:
+                    count = self.__execute_in_chunks__(
+                        connection=connection,
+                        sql=upsert_openalex_work,
+                        rows=self.__get_openalex_rows__(lines=file),
+                    )
+                connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                    (
+                        absolute_path,
+                        stat.st_size,
+                        stat.st_mtime,
+                        count,
+                        datetime.utcnow().isoformat(),
+                    ),
+                )
+        finally:
+            connection.close()
+        logger.info(f"Ingested {count} rows from {path}")
+        return count
+
+    def ingest(self, path: str, **kwargs) -> int:
+        """Ingest a file or all files in a directory, e.g. an OpenAlex snapshot"""
+        if not Path(path).is_dir():
+            return self.ingest_file(path=path, **kwargs)
+        return sum(
+            self.ingest_file(path=str(file), **kwargs)
+            for file in sorted(Path(path).rglob("*"))
+            if file.suffix in [".gz", ".json", ".jsonl", ".csv"]
+        )
+
+
+doi_index = DoiIndex()
@@ -0,0 +1,26 @@
+from enum import Enum
+
+
+class RequestErrorClass(Enum):
+    """The reason a request failed when checking a URL"""
+
+    DNS = "dns"  # the name could not be resolved
+    DNS_TIMEOUT = "dns timeout"  # the resolver did not answer in time
+    CONNECTION_REFUSED = "connection refused"
+    CONNECT_TIMEOUT = "connect timeout"
+    READ_TIMEOUT = "read timeout"
+    DEADLINE = "deadline"  # the whole check took longer than allowed
+    SSL_CERTIFICATE = "ssl certificate"  # the certificate could not be verified
+    SSL = "ssl"  # any other TLS error e.g. a failed handshake
+    TOO_MANY_REDIRECTS = "too many redirects"
+    MALFORMED_URL = "malformed url"
+    CONNECTION = "connection"  # any other connection error e.g. a reset
+    OTHER = "other"
+
+
+class DoiSourceStatus(Enum):
+    """The outcome of looking up a DOI in one of the sources"""
+
+    OK = "ok"  # also when the DOI was not found
+    TIMEOUT = "timeout"  # the source did not answer in time
+    ERROR = "error"
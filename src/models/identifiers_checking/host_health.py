@@ -0,0 +1,178 @@
+import logging
+from threading import Lock
+from time import monotonic
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+import config
+from src.models.identifiers_checking.enums import RequestErrorClass
+
+logger = logging.getLogger(__name__)
+
+
+class HostHealth(BaseModel):
+    """The recent history of a single host"""
+
+    consecutive_failures: int = 0
+    last_error_class: Optional[RequestErrorClass] = None
+    last_error_details: str = ""
+    # monotonic() when the host was considered down, 0 when it is healthy
+    down_since: float = 0.0
+    probing: bool = False
+    last_failure: float = 0.0  # monotonic()
+
+    @property
+    def is_down(self) -> bool:
+        return bool(self.down_since)
+
+    @property
+    def is_expired(self) -> bool:
+        """Forget a host whose failures are old news
+
+        A host that is down is forgotten if nothing probed it for another TTL."""
+        if self.probing:
+            return False
+        ttl = config.host_health_ttl_seconds
+        if self.is_down:
+            return monotonic() - self.down_since >= 2 * ttl
+        return monotonic() - self.last_failure >= ttl
+
+
+class HostHealthTracker:
+    """Circuit breaker for hosts that are clearly down
+
+    Citation heavy articles often contain dozens of URLs on one defunct
+    domain. After a host failed with one of the failure classes below
+    (a nonexistent name counts immediately, the others after
+    config.host_health_failure_threshold failures in a row) we stop
+    checking URLs on it and the results are inferred from the last failure.
+
+    After config.host_health_ttl_seconds one check is let through as a probe
+    (half-open). If it succeeds the host is healthy again, otherwise it
+    stays down for another TTL. A probe that ends without a verdict, e.g.
+    because the time budget of the request ran out, is released with
+    end_probe() so the next check can probe the host.
+
+    The tracker is shared by all requests handled by this process. It keeps
+    at most config.host_health_max_hosts hosts and forgets the expired ones,
+    see HostHealth.is_expired."""
+
+    failure_classes: List[RequestErrorClass] = [
+        RequestErrorClass.DNS,
+        RequestErrorClass.CONNECTION_REFUSED,
+        RequestErrorClass.CONNECT_TIMEOUT,
+        RequestErrorClass.READ_TIMEOUT,
+        RequestErrorClass.DEADLINE,
+    ]
+
+    def __init__(self):
+        self.hosts: Dict[str, HostHealth] = {}
+        self.lock = Lock()
+
+    @staticmethod
+    def __get_key__(host: str) -> str:
+        return host.lower()
+
+    def should_check(self, host: str) -> bool:
+        """Return False if the host is down and the result should be inferred"""
+        if not config.host_health_enabled or not host:
+            return True
+        with self.lock:
+            health = self.__get_unexpired__(key=self.__get_key__(host))
+            if not health or not health.is_down:
+                return True
+            if health.probing:
+                # Another check is already probing the host
+                return False
+            if monotonic() - health.down_since >= config.host_health_ttl_seconds:
+                logger.info(f"Probing {host} which was down")
+                health.probing = True
+                return True
+            return False
+
+    def end_probe(self, host: str) -> None:
+        """Let the next check probe the host if this one gave no verdict
+
+        record_success() and record_failure() already end the probe."""
+        if not config.host_health_enabled or not host:
+            return
+        with self.lock:
+            health = self.hosts.get(self.__get_key__(host))
+            if health and health.probing:
+                logger.info(f"The probe of {host} gave no verdict")
+                health.probing = False
+
+    def get_health(self, host: str) -> Optional[HostHealth]:
+        with self.lock:
+            health = self.__get_unexpired__(key=self.__get_key__(host))
+            return health.copy() if health else None
+
+    def __get_unexpired__(self, key: str) -> Optional[HostHealth]:
+        """Call with the lock held"""
+        health = self.hosts.get(key)
+        if health and health.is_expired:
+            del self.hosts[key]
+            return None
+        return health
+
+    def __get_for_failure__(self, key: str) -> HostHealth:
+        """Return the entry as the most recently failed one, call with the lock held
+
+        Dicts keep the insertion order so the first entry failed longest ago."""
+        health = self.__get_unexpired__(key=key)
+        if health:
+            del self.hosts[key]
+        else:
+            health = HostHealth()
+            if len(self.hosts) >= config.host_health_max_hosts:
+                self.__remove_expired__()
+            while len(self.hosts) >= config.host_health_max_hosts:
+                del self.hosts[next(iter(self.hosts))]
+        self.hosts[key] = health
+        return health
+
+    def __remove_expired__(self) -> None:
+        """Call with the lock held"""
+        for key in [key for key, health in self.hosts.items() if health.is_expired]:
+            del self.hosts[key]
+
+    def record_success(self, host: str) -> None:
+        if not config.host_health_enabled or not host:
+            return
+        with self.lock:
+            # Forget the host, it is healthy
+            self.hosts.pop(self.__get_key__(host), None)
+
+    def record_failure(
+        self, host: str, error_class: RequestErrorClass, details: str = ""
+    ) -> None:
+        if not config.host_health_enabled or not host:
+            return
+        if error_class not in self.failure_classes:
+            # e.g. a certificate error means the host is up
+            self.record_success(host=host)
+            return
+        with self.lock:
+            health = self.__get_for_failure__(key=self.__get_key__(host))
+            health.last_failure = monotonic()
+            health.consecutive_failures += 1
+            health.last_error_class = error_class
+            health.last_error_details = details
+            if (
+                health.probing
+                or error_class == RequestErrorClass.DNS
+                or health.consecutive_failures >= config.host_health_failure_threshold
+            ):
+                if not health.is_down or health.probing:
+                    logger.info(f"Considering {host} down because of {error_class}")
+                health.down_since = monotonic()
+                health.probing = False
+
+    def clear(self) -> None:  # dead: disable
+        """Convenience method used in tests"""
+        with self.lock:
+            self.hosts.clear()
+
+
+host_health_tracker = HostHealthTracker()
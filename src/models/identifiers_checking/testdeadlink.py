@@ -0,0 +1,95 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import requests
+from requests import RequestException
+
+import config
+from src.models.api.deadline import Deadline
+
+if TYPE_CHECKING:
+    from src.models.identifiers_checking.url import Url
+
+logger = logging.getLogger(__name__)
+
+
+class TestdeadlinkClient:
+    """Client for the testdeadlink API provided by Max and Owen
+
+    The API accepts many newline-separated URLs in one request and
+    returns a map from URL to status code. We send the URLs in chunks of
+    config.testdeadlink_chunk_size with a few chunks in flight at a time
+    so an article with hundreds of URLs needs only a handful of requests."""
+
+    __test__ = False  # This is not a test class for pytest
+
+    def __init__(self, api_url: str = ""):
+        self.api_url = api_url or config.testdeadlink_api_url
+
+    def __check_chunk__(
+        self, urls: List[str], deadline: Optional[Deadline] = None
+    ) -> Dict[str, int]:
+        data = {
+            "urls": "\n".join(urls),
+            "authcode": config.testdeadlink_authcode,
+            "returncodes": 1,
+        }
+        try:
+            response = requests.post(
+                self.api_url,
+                data=data,
+                timeout=(deadline or Deadline()).get_timeout(
+                    timeout=config.testdeadlink_timeout_seconds
+                ),
+            )
+        except RequestException as e:
+            logger.error(f"Could not reach the testdeadlink API: {e}")
+            return {}
+        if response.status_code != 200:
+            logger.error(f"Got {response.status_code} from the testdeadlink API")
+            return {}
+        try:
+            results = response.json().get("results", {})
+            return {url: int(code) for url, code in results.items()}
+        except (ValueError, TypeError, AttributeError) as e:
+            # e.g. an HTML error page of a proxy
+            logger.error(f"Got an invalid response from the testdeadlink API: {e}")
+            return {}
+
+    def check_urls(
+        self, urls: List[str], deadline: Optional[Deadline] = None
+    ) -> Dict[str, int]:
+        """Return the status code for every URL the API gave an answer for
+
+        The requests stay within the time budget of the deadline if we got one"""
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        size = config.testdeadlink_chunk_size
+        chunks = [
+            unique_urls[index : index + size]
+            for index in range(0, len(unique_urls), size)
+        ]
+        status_codes: Dict[str, int] = {}
+        if len(chunks) == 1:
+            # Avoid the thread pool for the common case of a single URL
+            status_codes.update(self.__check_chunk__(urls=chunks[0], deadline=deadline))
+        elif chunks:
+            with ThreadPoolExecutor(
+                max_workers=config.testdeadlink_max_concurrent_requests
+            ) as executor:
+                check_chunk = partial(self.__check_chunk__, deadline=deadline)
+                for results in executor.map(check_chunk, chunks):
+                    status_codes.update(results)
+        return status_codes
+
+    def check(self, urls: List["Url"], deadline: Optional[Deadline] = None) -> None:
+        """Check the URLs and set testdeadlink_status_code on each of them"""
+        status_codes = self.check_urls(
+            urls=[url.url for url in urls], deadline=deadline
+        )
+        for url in urls:
+            url.testdeadlink_status_code = status_codes.get(url.url, 0)
+
+
+testdeadlink_client = TestdeadlinkClient()
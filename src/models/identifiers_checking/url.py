@@ -1,10 +1,11 @@
 import logging
-import sys
-from typing import Any, Dict
+import socket
+import ssl
+from time import perf_counter
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
 
 import requests
-from dns.name import EmptyLabel
-from dns.resolver import NXDOMAIN, LifetimeTimeout, NoAnswer, NoNameservers, resolve
 from requests import (
     ConnectionError,
     ConnectTimeout,
@@ -22,11 +23,22 @@ from requests.exceptions import (
     ProxyError,
     RetryError,
     SSLError,
+    TooManyRedirects,
 )
-from requests.models import LocationParseError
+from requests.models import LocationParseError, Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 
+import config
+from src.models.api.deadline import Deadline
 from src.models.api.handlers import BaseHandler
-from src.models.exceptions import ResolveError
+from src.models.api.revalidation import conditional_headers_by_validator
+from src.models.exceptions import DeadlineExceededError, UrlCheckDeadlineError
+from src.models.file_io.document_store import document_store
+from src.models.identifiers_checking.dns_cache import DnsAnswer, dns_cache
+from src.models.identifiers_checking.enums import RequestErrorClass
+from src.models.identifiers_checking.host_health import host_health_tracker
+from src.models.identifiers_checking.testdeadlink import testdeadlink_client
 from src.models.wikimedia.wikipedia.url import WikipediaUrl
 
 logger = logging.getLogger(__name__)
@@ -47,6 +59,11 @@ class Url(WikipediaUrl):
 
     request_error: bool = False
     request_error_details: str = ""
+    request_error_class: Optional[RequestErrorClass] = None
+    ssl_error: bool = False  # the certificate could not be verified
+    # True if we did not fetch the URL because the host was down recently
+    # and the error attributes are copied from that failure
+    inferred: bool = False
     dns_record_found: bool = False
     dns_no_answer: bool = False
     dns_error: bool = False
@@ -57,6 +74,15 @@ class Url(WikipediaUrl):
     dns_error_details: str = ""
     response_headers: Dict = {}
     text: str = ""
+    body_bytes_read: int = 0
+    body_truncated: bool = False  # we stopped reading because of the size or time limit
+    from_document_store: bool = False  # we used a recent fetch instead of fetching it
+    # Sent with the request to only get the URL if it changed, see src/models/api/revalidation.py
+    conditional_headers: Dict[str, str] = {}
+    not_modified: bool = False  # we got 304 Not Modified to the conditional request
+    deadline: Deadline = Deadline()  # the time budget of the request, see the job
+    # The time budget ran out before we could check it, nothing is known about the URL then
+    incomplete: bool = False
     detected_language: str = ""
     detected_language_error: bool = False
     detected_language_error_details: str = ""
@@ -65,59 +91,69 @@ class Url(WikipediaUrl):
     # def __check_soft404__(self):
     #     raise NotImplementedError()
 
-    def check(self):
+    def check(self, testdeadlink: bool = True, refresh: bool = False):
+        """Check the URL
+
+        Pass testdeadlink=False when checking many URLs and get their
+        testdeadlink status codes in one go with testdeadlink_client.check()
+        Pass refresh=True to fetch it even if it is in the document store
+
+        If the conditional request gets 304 Not Modified we stop there
+        because the caller already has the result of the earlier check"""
         if self.url:
             self.extract()
             if self.is_valid:
-                self.__check_url__()
-                self.__check_url_with_testdeadlink_api__()
+                self.__check_url__(refresh=refresh)
+                if self.not_modified:
+                    return
+                if testdeadlink:
+                    self.__check_url_with_testdeadlink_api__()
                 self.__detect_language__()
 
+    @property
+    def __hostname__(self) -> str:
+        """The netloc without port and credentials"""
+        return urlparse(self.url).hostname or ""
+
     def __get_dns_record__(self) -> None:
         from src import app
 
         app.logger.debug("__get_dns_record__: running")
         # if domain name is available
         if self.netloc:
-            logger.info(f"Trying to resolve {self.netloc}")
-            try:
-                answers = resolve(self.netloc)
-                if answers:
-                    self.dns_record_found = True
-                else:
-                    raise ResolveError("no answers")
-            except NXDOMAIN:
-                pass
-            except (LifetimeTimeout, NoNameservers, EmptyLabel) as e:
-                self.dns_error = True
-                self.dns_error_details = str(e)
-            except NoAnswer:
-                self.dns_no_answer = True
+            answer = dns_cache.resolve(name=self.__hostname__)
+            self.__set_dns_details_from_answer__(answer=answer)
         else:
             logger.warning("Could not get DNS because netloc was empty")
 
+    def __set_dns_details_from_answer__(self, answer: DnsAnswer) -> None:
+        self.dns_record_found = answer.found
+        self.dns_no_answer = answer.no_answer
+        self.dns_error = answer.error
+        self.dns_error_details = answer.error_details
+
     def __check_with_https_verify__(self):
         from src import app
 
         app.logger.debug("__check_with_https_verify__: running")
+        self.__attempt__(verify=True)
+
+    def __check_without_https_verify__(self):
+        from src import app
+
+        # https://jcutrer.com/python/requests-ignore-invalid-ssl-certificates
+        app.logger.debug("__check_without_https_verify__: running")
+        self.__attempt__(verify=False)
 
+    def __attempt__(self, verify: bool) -> None:
+        """Fetch the URL and record the class of failure if any"""
+        self.request_error = False
+        self.request_error_details = ""
+        self.request_error_class = None
         try:
             # https://stackoverflow.com/questions/66710047/
             # python-requests-library-get-the-status-code-without-downloading-the-target
-            r = requests.get(
-                self.url,
-                timeout=self.timeout,
-                verify=True,
-                headers=self.__spoofing_headers__,
-                allow_redirects=True,
-            )
-            self.status_code = r.status_code
-            logger.debug(self.url + "\tStatus: " + str(r.status_code))
-            self.response_headers = dict(r.headers)
-            if r.status_code == 200:
-                self.text = r.text
-            # if r.status_code == 200:
-            #     self.check_soft404
+            self.__fetch__(verify=verify)
         # https://stackoverflow.com/questions/6470428/catch-multiple-exceptions-in-one-line-except-block
         except (
             ReadTimeout,
@@ -132,68 +168,289 @@ class Url(WikipediaUrl):
             LocationParseError,
         ) as e:
             logger.debug(f"got exception: {e}")
+            if isinstance(e, Timeout) and self.deadline.expired:
+                # Our time ran out, not the time of the server
+                self.incomplete = True
             self.request_error = True
             self.request_error_details = str(e)
-        except (MissingSchema, InvalidSchema, InvalidURL, InvalidProxyURL) as e:
-            logger.debug(f"got exception: {e}")
-            self.malformed_url = True
-            self.request_error = True
-            self.request_error_details = str(e)
-        except SSLError:
-            self.request_error = True
-            self.ssl_error = True
+            self.request_error_class = self.__classify_request_error__(exception=e)
+            if self.request_error_class == RequestErrorClass.MALFORMED_URL:
+                self.malformed_url = True
 
-    def __check_without_https_verify__(self):
-        from src import app
-
-        # https://jcutrer.com/python/requests-ignore-invalid-ssl-certificates
-        app.logger.debug("__check_without_https_verify__: running")
+    @staticmethod
+    def __get_exception_chain__(exception: BaseException) -> List[BaseException]:
+        """Return the exception and everything that caused it
 
-        try:
-            # https://stackoverflow.com/questions/66710047/
-            # python-requests-library-get-the-status-code-without-downloading-the-target
-            r = requests.get(
-                self.url,
-                timeout=self.timeout,
-                verify=False,
-                headers=self.__spoofing_headers__,
-                allow_redirects=True,
+        requests wraps the urllib3 exceptions which wrap the socket
+        and ssl exceptions in args, reason, __cause__ or __context__"""
+        chain: List[BaseException] = []
+        queue: List[Any] = [exception]
+        while queue:
+            current = queue.pop(0)
+            if not isinstance(current, BaseException) or current in chain:
+                continue
+            chain.append(current)
+            queue.extend(current.args)
+            queue.extend(
+                [
+                    getattr(current, "reason", None),
+                    current.__cause__,
+                    current.__context__,
+                ]
             )
+        return chain
+
+    def __classify_request_error__(self, exception: BaseException) -> RequestErrorClass:
+        chain = self.__get_exception_chain__(exception=exception)
+        # The order matters, e.g. ConnectTimeout is also a ConnectionError
+        # and a failed name resolution is wrapped in a ConnectionError
+        classes: List[Tuple[Tuple[type, ...], RequestErrorClass]] = [
+            (
+                (
+                    MissingSchema,
+                    InvalidSchema,
+                    InvalidURL,
+                    InvalidProxyURL,
+                    LocationParseError,
+                ),
+                RequestErrorClass.MALFORMED_URL,
+            ),
+            (
+                (UrlCheckDeadlineError, DeadlineExceededError),
+                RequestErrorClass.DEADLINE,
+            ),
+            ((ssl.SSLCertVerificationError,), RequestErrorClass.SSL_CERTIFICATE),
+            ((SSLError, ssl.SSLError), RequestErrorClass.SSL),
+            ((socket.gaierror,), RequestErrorClass.DNS),
+            ((ConnectionRefusedError,), RequestErrorClass.CONNECTION_REFUSED),
+            ((ConnectTimeout,), RequestErrorClass.CONNECT_TIMEOUT),
+            ((ReadTimeout, Timeout, socket.timeout), RequestErrorClass.READ_TIMEOUT),
+            ((TooManyRedirects,), RequestErrorClass.TOO_MANY_REDIRECTS),
+            ((ConnectionError,), RequestErrorClass.CONNECTION),
+        ]
+        for types, error_class in classes:
+            links = [link for link in chain if isinstance(link, types)]
+            if links:
+                if (
+                    error_class == RequestErrorClass.DNS
+                    and getattr(links[0], "errno", None) == socket.EAI_AGAIN
+                ):
+                    return RequestErrorClass.DNS_TIMEOUT
+                return error_class
+        return RequestErrorClass.OTHER
+
+    def __set_dns_details_from_request__(self) -> None:
+        """The HTTP request resolves the name anyway so we use its outcome
+        instead of doing a separate DNS lookup"""
+        if self.request_error_class == RequestErrorClass.DNS:
+            # The name does not exist or has no address
+            self.dns_record_found = False
+        elif self.request_error_class == RequestErrorClass.DNS_TIMEOUT:
+            self.dns_error = True
+            self.dns_error_details = self.request_error_details
+        elif self.request_error_class != RequestErrorClass.MALFORMED_URL:
+            # We got far enough to connect or at least try to
+            self.dns_record_found = True
+
+    def __fetch__(self, verify: bool) -> None:
+        """Fetch the status code, the headers and a sample of the body
+
+        We stream the response so a URL pointing at e.g. a large video
+        never gets downloaded. The body is only read for text content types
+        and at most config.url_check_max_bytes of it.
+
+        The timeout only bounds each connect and read, so we enforce
+        config.url_check_max_seconds for the whole fetch ourselves.
+        Both are capped by what is left of the time budget of the request.
+        Note that a single stalled read can still overrun it by the timeout."""
+        timeout = self.deadline.get_timeout(timeout=self.timeout)
+        max_seconds = self.deadline.cap(seconds=config.url_check_max_seconds)
+        deadline = perf_counter() + max_seconds
+
+        def check_deadline(response: Response, **kwargs) -> None:  # noqa: ARG001
+            """This is called for every response including redirects"""
+            if perf_counter() > deadline:
+                response.close()
+                raise UrlCheckDeadlineError(
+                    f"Gave up after {round(max_seconds, 3)} seconds "
+                    f"at {response.url}"
+                )
+
+        with requests.get(
+            self.url,
+            timeout=timeout,
+            verify=verify,
+            headers=self.__request_headers__,
+            allow_redirects=True,
+            stream=True,
+            hooks={"response": check_deadline},
+        ) as r:
             self.status_code = r.status_code
             logger.debug(self.url + "\tStatus: " + str(r.status_code))
             self.response_headers = dict(r.headers)
-            if r.status_code == 200:
-                self.text = r.text
+            self.not_modified = r.status_code == 304 and bool(self.conditional_headers)
+            if r.status_code == 200 and self.__is_text__(headers=r.headers):
+                self.text = self.__read_text__(response=r, deadline=deadline)
             # if r.status_code == 200:
             #     self.check_soft404
-        # https://stackoverflow.com/questions/6470428/catch-multiple-exceptions-in-one-line-except-block
-        except (
-            ReadTimeout,
-            ConnectTimeout,
-            RetryError,
-            InvalidHeader,
-            Timeout,
-            ConnectionError,
-            RequestException,
-            HTTPError,
-            ProxyError,
-            LocationParseError,
-        ) as e:
-            logger.debug(f"got exception: {e}")
-            self.request_error = True
-            self.request_error_details = str(e)
-        except (MissingSchema, InvalidSchema, InvalidURL, InvalidProxyURL) as e:
-            logger.debug(f"got exception: {e}")
-            self.malformed_url = True
-            self.request_error = True
-            self.request_error_details = str(e)
 
-    def __check_url__(self):
+    @staticmethod
+    def __is_text__(headers: Mapping[str, str]) -> bool:
+        content_type = headers.get("content-type", "")
+        media_type = content_type.split(";")[0].strip().lower()
+        # Some servers don't send a content type, we assume text then
+        return not media_type or media_type in config.url_check_text_content_types
+
+    def __read_text__(self, response: Response, deadline: float) -> str:
+        """Read the body until the size or time limit and decode it"""
+        content = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            content.extend(chunk)
+            if len(content) > config.url_check_max_bytes or perf_counter() > deadline:
+                self.body_truncated = True
+                self.incomplete = self.deadline.expired
+                break
+        content = content[: config.url_check_max_bytes]
+        self.body_bytes_read = len(content)
+        if not self.body_truncated:
+            # The pdf and xhtml endpoints can use it
+            document_store.put(
+                url=self.url,
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                content=bytes(content),
+            )
+        return self.__decode__(content=content, encoding=response.encoding)
+
+    @staticmethod
+    def __decode__(content: bytes, encoding: Optional[str]) -> str:
+        # requests falls back to ISO-8859-1 for text/* without a charset
+        try:
+            return content.decode(encoding or "utf-8", errors="replace")
+        except LookupError:
+            # The server sent an unknown charset
+            return content.decode("utf-8", errors="replace")
+
+    def __read_from_document_store__(self) -> bool:
+        """Use the response to a recent fetch of the URL by any endpoint
+
+        Only successful fetches with the whole body are stored."""
+        stored = document_store.get(url=self.url)
+        if not stored or stored.status_code != 200:
+            return False
+        logger.info(f"Using {self.url} from the document store")
+        self.from_document_store = True
+        self.status_code = stored.status_code
+        self.response_headers = stored.headers
+        headers = CaseInsensitiveDict(stored.headers)
+        # The fetch resolved the name
+        self.dns_record_found = True
+        if (
+            self.__is_text__(headers=headers)
+            and stored.size <= config.url_check_max_bytes
+        ):
+            content = document_store.read(document=stored)
+            self.body_bytes_read = len(content)
+            self.text = self.__decode__(
+                content=content, encoding=get_encoding_from_headers(headers)
+            )
+        return True
+
+    def __check_url__(self, refresh: bool = False):
+        """Check the URL with at most one request in the common case
+
+        We only retry without verifying the certificate if the certificate
+        was the problem. A timeout or a DNS failure is not retried.
+        Without refresh a recent fetch from the document store is used."""
+        if not refresh and self.__read_from_document_store__():
+            return
+        should_check = host_health_tracker.should_check(host=self.netloc)
+        if not should_check and self.__infer_from_host_health__():
+            return
+        try:
+            self.__request_url__()
+        finally:
+            if should_check:
+                # This may have been the probe of a host that was down
+                host_health_tracker.end_probe(host=self.netloc)
+
+    def __request_url__(self) -> None:
+        if self.__is_known_to_not_exist__():
+            return
+        if self.deadline.expired:
+            logger.warning(f"Not checking {self.url} because the time ran out")
+            self.incomplete = True
+            return
         print(f"Trying to check: {self.url}")
-        self.__get_dns_record__()
         self.__check_with_https_verify__()
-        if self.request_error:
+        self.__set_dns_details_from_request__()
+        if self.request_error_class == RequestErrorClass.DNS and self.netloc:
+            # This is fast because the name just failed to resolve and it
+            # caches the negative answer for the other URLs on this host
+            self.__get_dns_record__()
+        if self.request_error_class == RequestErrorClass.SSL_CERTIFICATE:
+            self.ssl_error = True
             self.__check_without_https_verify__()
+        if not self.incomplete:
+            # Running out of time tells us nothing about the host
+            self.__record_host_health__()
+
+    def __is_known_to_not_exist__(self) -> bool:
+        """Skip the request if the DNS cache knows that the name does not exist
+
+        A name without addresses is still fetched because the system resolver
+        may find addresses we did not ask for."""
+        answer = dns_cache.get(name=self.__hostname__) if self.netloc else None
+        if answer and answer.nxdomain:
+            self.__set_dns_details_from_answer__(answer=answer)
+            self.request_error = True
+            self.request_error_class = RequestErrorClass.DNS
+            self.request_error_details = f"Could not resolve {self.__hostname__}"
+            return True
+        return False
+
+    def __record_host_health__(self) -> None:
+        if self.request_error_class:
+            host_health_tracker.record_failure(
+                host=self.netloc,
+                error_class=self.request_error_class,
+                details=self.request_error_details,
+            )
+        else:
+            host_health_tracker.record_success(host=self.netloc)
+
+    def __infer_from_host_health__(self) -> bool:
+        """Copy the last failure of the host instead of fetching the URL
+
+        Returns False if the host recovered in the meantime"""
+        from src import app
+
+        health = host_health_tracker.get_health(host=self.netloc)
+        if not health:
+            return False
+        app.logger.info(f"Inferring the result for {self.url} because the host is down")
+        self.inferred = True
+        self.request_error = True
+        self.request_error_class = health.last_error_class
+        self.request_error_details = (
+            f"Not fetched because {self.netloc} failed recently: "
+            f"{health.last_error_details}"
+        )
+        self.__set_dns_details_from_request__()
+        return True
+
+    @property
+    def __request_headers__(self) -> Dict[str, str]:
+        """The spoofing headers with the validators of our earlier check
+        instead of the spoofed ones if we have them"""
+        if not self.conditional_headers:
+            return self.__spoofing_headers__
+        headers = {
+            key: value
+            for key, value in self.__spoofing_headers__.items()
+            if key not in conditional_headers_by_validator.values()
+        }
+        return {**headers, **self.conditional_headers}
 
     @property
     def __spoofing_headers__(self) -> Dict[str, str]:
@@ -227,34 +484,19 @@ class Url(WikipediaUrl):
         # carry over attributes
         self.detected_language = handler.detected_language
         self.detected_language_error = handler.detected_language_error
-        self.detected_language_error_details = self.detected_language_error_details
+        self.detected_language_error_details = handler.detected_language_error_details
 
     @property
     def get_dict(self) -> Dict[str, Any]:
-        url = self.dict()
+        url = self.dict(exclude={"conditional_headers", "deadline"})
         if self.malformed_url_details:
             url.update({"malformed_url_details": self.malformed_url_details.value})
+        if self.request_error_class:
+            url.update({"request_error_class": self.request_error_class.value})
         return url
 
     def __check_url_with_testdeadlink_api__(self):
-        """This fetches the status code from the testdeadlink API provided by Max and Owen"""
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
+        """This fetches the status code from the testdeadlink API provided by Max and Owen
 
-        data = (
-            f"urls={self.url}&authcode=579331d2dc3f96739b7c622ed248a7d3&returncodes=1"
-        )
-
-        response = requests.post(
-            "https://iabot-api.archive.org/testdeadlink.php", headers=headers, data=data
-        )
-        # get the status code
-        if response.status_code == 200:
-            data = response.json()
-            # print(data)
-            if "results" in data:
-                results = data["results"]
-                for result in results:
-                    self.testdeadlink_status_code = results[result]
-                    break
+        Use testdeadlink_client.check() directly to check many URLs at once"""
+        testdeadlink_client.check(urls=[self], deadline=self.deadline)
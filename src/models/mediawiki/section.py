@@ -6,6 +6,8 @@ import mwparserfromhell  # type: ignore
 from mwparserfromhell.wikicode import Wikicode  # type: ignore
 from pydantic import BaseModel
 
+import config
+from src.models.api.enums import TimingStage
 from src.models.api.job.article_job import ArticleJob
 from src.models.exceptions import MissingInformationError
 from src.models.wikimedia.wikipedia.reference.generic import WikipediaReference
@@ -22,6 +24,8 @@ class MediawikiSection(BaseModel):
     wikitext: str = ""
     references: List[WikipediaReference] = []
     job: ArticleJob
+    # We stop extracting at this many references, see config.wikitext_max_references
+    max_references: int = config.wikitext_max_references
 
     class Config:  # dead: disable
         arbitrary_types_allowed = True  # dead: disable
@@ -78,6 +82,8 @@ class MediawikiSection(BaseModel):
                 f"Extracting {len(lines_without_heading)} lines form section {lines[0]}"
             )
             for line in lines_without_heading:
+                if self.__stop_extracting__:
+                    break
                 logger.info(f"Working on line: {line}")
                 # Guard against empty line
                 # logger.debug("Parsing line")
@@ -113,6 +119,8 @@ class MediawikiSection(BaseModel):
         refs = self.wikicode.filter_tags(matches=lambda tag: tag.tag.lower() == "ref")
         app.logger.debug(f"Number of refs found: {len(refs)}")
         for ref in refs:
+            if self.__stop_extracting__:
+                break
             reference = WikipediaReference(
                 wikicode=ref,
                 # wikibase=self.wikibase,
@@ -123,6 +131,24 @@ class MediawikiSection(BaseModel):
             reference.extract_and_check()
             self.references.append(reference)
 
+    @property
+    def __stop_extracting__(self) -> bool:
+        """Stop if the time ran out or we have the maximum number of references
+
+        The extraction is marked incomplete in both cases"""
+        from src import app
+
+        if self.job.deadline.ran_out(stage=TimingStage.EXTRACT):
+            app.logger.warning("Stopped extracting because the time ran out")
+            return True
+        if len(self.references) >= self.max_references:
+            app.logger.warning(
+                f"Stopped extracting at the maximum of {self.max_references} references"
+            )
+            self.job.deadline.mark_incomplete(stage=TimingStage.EXTRACT)
+            return True
+        return False
+
     def extract(self):
         if not self.wikicode and not self.wikitext:
             raise MissingInformationError(
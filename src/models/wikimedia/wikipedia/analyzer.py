@@ -86,6 +86,9 @@ class WikipediaAnalyzer(WariBaseModel):
                 revision_isodate=self.article.revision_isodate.isoformat(),
                 revision_timestamp=self.article.revision_timestamp,
                 revision_id=self.article.revision_id,
+                timing=self.job.timer.get_dict(),
+                incomplete=self.job.deadline.incomplete,
+                incomplete_stages=self.job.deadline.incomplete_stages,
             )
 
     def get_statistics(self) -> Dict[str, Any]:
@@ -5,8 +5,10 @@ from typing import Any, Dict, Optional
 import requests
 from dateutil.parser import isoparse
 from pydantic import validate_arguments
+from requests import Timeout
 
 import config
+from src.models.api.enums import TimingStage
 from src.models.api.job.article_job import ArticleJob
 from src.models.base import WariBaseModel
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
@@ -70,6 +72,14 @@ class WikipediaArticle(WariBaseModel):
     def url(self):
         return self.job.url
 
+    @property
+    def __timeout__(self) -> float:
+        """The timeout of a request to the Wikipedia APIs or ORES
+        within the time budget of the request"""
+        return self.job.deadline.get_timeout(
+            timeout=config.wikimedia_api_timeout_seconds
+        )
+
     # @property
     # def wikibase_url(self):
     #     if self.wikibase.item_prefixed_wikibase:
@@ -125,10 +135,11 @@ class WikipediaArticle(WariBaseModel):
         app.logger.debug("__fetch_page_data__: Running")
         self.__check_if_title_is_empty__()
         if not self.wikitext:
-            if self.revision_id:
-                self.__fetch_data_for_a_specific_revision__()
-            else:
-                self.__fetch_data_for_the_latest_revision__()
+            with self.job.timer.measure(stage=TimingStage.FETCH):
+                if self.revision_id:
+                    self.__fetch_data_for_a_specific_revision__()
+                else:
+                    self.__fetch_data_for_the_latest_revision__()
         else:
             logger.info(
                 "Not fetching data via the Wikipedia REST API. We have already got all the data we need"
@@ -482,9 +493,21 @@ class WikipediaArticle(WariBaseModel):
             # if self.job.lang == "da":
             #     ores_error = "This "
             wiki_project = f"{self.job.lang}wiki"
-            response = requests.get(
-                f"https://ores.wikimedia.org/v3/scores/{wiki_project}/{self.revision_id}/articlequality"
-            )
+            if self.job.deadline.expired:
+                logger.warning("Skipped the ORES score because the time ran out")
+                self.job.deadline.mark_incomplete(stage=TimingStage.ORES)
+                return
+            try:
+                with self.job.timer.measure(stage=TimingStage.ORES):
+                    response = requests.get(
+                        f"https://ores.wikimedia.org/v3/scores/{wiki_project}/{self.revision_id}/articlequality",
+                        timeout=self.__timeout__,
+                    )
+            except Timeout as e:
+                # The score is nice to have so we return the rest without it
+                logger.warning(f"Skipped the ORES score: {e}")
+                self.job.deadline.mark_incomplete(stage=TimingStage.ORES)
+                return
             if response.status_code == 200:
                 data = response.json()
                 # console.print(data)
@@ -517,7 +540,10 @@ class WikipediaArticle(WariBaseModel):
         prop = "ids|timestamp|content"
         headers = {"User-Agent": config.user_agent}
         response = requests.get(
-            url, params={"action": "query", "prop": prop}, headers=headers
+            url,
+            params={"action": "query", "prop": prop},
+            headers=headers,
+            timeout=self.__timeout__,
         )
         # console.print(response.json())
         if response.status_code == 200:
@@ -546,7 +572,7 @@ class WikipediaArticle(WariBaseModel):
             f"w/rest.php/v1/page/{self.job.quoted_title}"
         )
         headers = {"User-Agent": config.user_agent}
-        response = requests.get(url, headers=headers)
+        response = requests.get(url, headers=headers, timeout=self.__timeout__)
         # console.print(response.json())
         if response.status_code == 200:
             data = response.json()
@@ -2,14 +2,16 @@ import logging
 from copy import deepcopy
 from typing import Dict, List
 
-import mwparserfromhell  # type: ignore
 from mwparserfromhell.wikicode import Wikicode  # type: ignore
 
+import config
+from src.models.api.enums import TimingStage
 from src.models.api.job.article_job import ArticleJob
 from src.models.base import WariBaseModel
 from src.models.exceptions import MissingInformationError
 from src.models.mediawiki.section import MediawikiSection
 from src.models.wikimedia.wikipedia.reference.generic import WikipediaReference
+from src.models.wikimedia.wikipedia.reference.parsing import parse_wikitext
 from src.models.wikimedia.wikipedia.url import WikipediaUrl
 
 # logging.basicConfig(level=config.loglevel)
@@ -23,6 +25,10 @@ class WikipediaReferenceExtractor(WariBaseModel):
     * first we get the wikicode
     * we parse it with mwparser from hell
     * we extract the raw references -> WikipediaReference
+
+    Wikitext that is too large or complex raises WikitextTooComplexError
+    and we stop at config.wikitext_max_references references,
+    see src/models/wikimedia/wikipedia/reference/parsing.py
     """
 
     job: ArticleJob
@@ -181,9 +187,11 @@ class WikipediaReferenceExtractor(WariBaseModel):
         app.logger.debug("extract_all_references: running")
         if not self.job:
             raise MissingInformationError("no job")
-        self.__parse_wikitext__()
-        self.__extract_sections__()
-        self.__populate_references__()
+        with self.job.timer.measure(stage=TimingStage.PARSE):
+            self.__parse_wikitext__()
+        with self.job.timer.measure(stage=TimingStage.EXTRACT):
+            self.__extract_sections__()
+            self.__populate_references__()
         app.logger.info("Done extracting all references")
 
     def __extract_sections__(self) -> None:
@@ -210,28 +218,57 @@ class WikipediaReferenceExtractor(WariBaseModel):
                 testing=self.testing,
                 language_code=self.language_code,
                 job=self.job,
+                max_references=self.__remaining_references__,
             )
             mw_section.extract()
             self.sections.append(mw_section)
         else:
             self.__extract_root_section__()
             for section in sections:
+                if self.__stop_extracting__:
+                    # We return the references of the sections done so far
+                    break
                 mw_section = MediawikiSection(
                     wikicode=section,
                     testing=self.testing,
                     language_code=self.language_code,
                     job=self.job,
+                    max_references=self.__remaining_references__,
                 )
                 mw_section.extract()
                 self.sections.append(mw_section)
         app.logger.debug(f"Number of sections found: {len(self.sections)}")
 
+    @property
+    def __remaining_references__(self) -> int:
+        extracted = sum(len(section.references) for section in self.sections)
+        return config.wikitext_max_references - extracted
+
+    @property
+    def __stop_extracting__(self) -> bool:
+        """Like MediawikiSection.__stop_extracting__() but between the sections"""
+        from src import app
+
+        if self.job.deadline.ran_out(stage=TimingStage.EXTRACT):
+            app.logger.warning("Stopped extracting because the time ran out")
+            return True
+        if self.__remaining_references__ <= 0:
+            app.logger.warning(
+                f"Stopped extracting at the maximum of "
+                f"{config.wikitext_max_references} references"
+            )
+            self.job.deadline.mark_incomplete(stage=TimingStage.EXTRACT)
+            return True
+        return False
+
     def __parse_wikitext__(self):
         from src import app
 
         app.logger.debug("__parse_wikitext__: running")
         if not self.wikicode:
-            self.wikicode = mwparserfromhell.parse(self.wikitext)
+            self.wikicode = parse_wikitext(
+                wikitext=self.wikitext, deadline=self.job.deadline
+            )
 
     @property
     def reference_ids(self) -> List[str]:
@@ -267,6 +304,7 @@ class WikipediaReferenceExtractor(WariBaseModel):
                 testing=self.testing,
                 language_code=self.language_code,
                 job=self.job,
+                max_references=self.__remaining_references__,
             )
             mw_section.extract()
             self.sections.append(mw_section)
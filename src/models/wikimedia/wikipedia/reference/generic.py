@@ -3,7 +3,6 @@ import logging
 import re
 from typing import Any, Dict, List, Optional, Union
 
-from bs4 import BeautifulSoup, Comment
 from mwparserfromhell.nodes import Tag  # type: ignore
 from mwparserfromhell.wikicode import Wikicode  # type: ignore
 
@@ -54,7 +53,7 @@ class WikipediaReference(JobBaseModel):
     reference_id: str = ""
     section: str
     soup: Optional[Any] = None
-    comments: List[Comment] = []
+    comments: List[Any] = []  # bs4 Comments
 
     class Config:  # dead: disable
         arbitrary_types_allowed = True  # dead: disable
@@ -160,6 +159,8 @@ class WikipediaReference(JobBaseModel):
         return len(self.templates)
 
     def __parse_xhtml__(self):
+        from bs4 import BeautifulSoup
+
         self.soup = BeautifulSoup(str(self.wikicode), "lxml")
 
     def __extract_template_urls__(self) -> None:
@@ -363,6 +364,8 @@ class WikipediaReference(JobBaseModel):
         self.reference_id = hashlib.md5(f"{self.wikicode}".encode()).hexdigest()[:8]
 
     def __extract_xhtml_comments__(self):
+        from bs4 import Comment
+
         if not self.soup:
             raise MissingInformationError()
         # Find all comment tags in the HTML
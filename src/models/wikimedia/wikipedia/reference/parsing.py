@@ -0,0 +1,112 @@
+"""Guards against pathological wikitext
+
+Giant tables, deeply nested templates and unclosed markup can keep
+mwparserfromhell busy for minutes, e.g. a few thousand unclosed templates
+take more than 10 seconds. We refuse wikitext that is too large or too
+deeply nested before parsing it, see check_complexity().
+
+With config.wikitext_parse_in_subprocess the parsing runs in a separate
+process with a limit on its CPU time. The process is killed when it
+reaches the limit or the time budget of the request runs out, so a worker
+is never stuck in the parser."""
+import logging
+import multiprocessing
+import re
+from multiprocessing.connection import Connection
+from typing import Optional
+
+import mwparserfromhell  # type: ignore
+from mwparserfromhell.wikicode import Wikicode  # type: ignore
+
+import config
+from src.models.api.deadline import Deadline
+from src.models.exceptions import DeadlineExceededError, WikitextTooComplexError
+
+logger = logging.getLogger(__name__)
+
+template_brace_regex = re.compile(r"\{\{|\}\}")
+
+
+def get_template_depth(wikitext: str) -> int:
+    """The deepest nesting of templates without parsing
+
+    Unclosed templates count as nested which is what makes them slow to parse."""
+    depth = max_depth = 0
+    for match in template_brace_regex.finditer(wikitext):
+        if match.group() == "{{":
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif depth:
+            depth -= 1
+    return max_depth
+
+
+def check_complexity(wikitext: str) -> None:
+    """Raise WikitextTooComplexError if the wikitext is too large or too deeply nested"""
+    if len(wikitext) > config.wikitext_max_characters:
+        raise WikitextTooComplexError(
+            f"The wikitext has {len(wikitext)} characters "
+            f"which is more than the maximum of {config.wikitext_max_characters}"
+        )
+    depth = get_template_depth(wikitext=wikitext)
+    if depth > config.wikitext_max_template_depth:
+        raise WikitextTooComplexError(
+            f"The templates are nested {depth} levels deep "
+            f"which is more than the maximum of {config.wikitext_max_template_depth}"
+        )
+
+
+def parse_with_cpu_limit(connection: Connection, wikitext: str, seconds: int) -> None:
+    """Run in the subprocess, the kernel kills it with SIGXCPU after the seconds"""
+    import resource
+
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+    connection.send(mwparserfromhell.parse(wikitext))
+    connection.close()
+
+
+def parse_in_subprocess(wikitext: str, deadline: Deadline) -> Wikicode:
+    """Parse in a new process and wait for it within the time budget
+
+    Like the process pool of the PDF extraction the process is started
+    with config.wikitext_parse_start_method, see extract_pages_in_parallel()."""
+    context = multiprocessing.get_context(config.wikitext_parse_start_method)
+    if config.wikitext_parse_start_method == "forkserver":
+        context.set_forkserver_preload([__name__])
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(  # type: ignore[attr-defined]
+        target=parse_with_cpu_limit,
+        args=(sender, wikitext, config.wikitext_parse_max_cpu_seconds),
+        daemon=True,
+    )
+    process.start()
+    # The process has its own copy, this lets recv() see it die
+    sender.close()
+    # No deadline means we wait until the CPU time limit kills it
+    timeout: Optional[float] = deadline.remaining if deadline.seconds else None
+    try:
+        if not receiver.poll(timeout):
+            raise DeadlineExceededError(
+                "Gave up parsing the wikitext because the time ran out"
+            )
+        wikicode: Wikicode = receiver.recv()
+    except EOFError as e:
+        # The process died without sending anything
+        raise WikitextTooComplexError(
+            f"Parsing the wikitext took more than "
+            f"{config.wikitext_parse_max_cpu_seconds} seconds of CPU time"
+        ) from e
+    finally:
+        process.kill()
+        process.join()
+        receiver.close()
+    return wikicode
+
+
+def parse_wikitext(wikitext: str, deadline: Deadline) -> Wikicode:
+    """Parse the wikitext if it passes the guards"""
+    check_complexity(wikitext=wikitext)
+    if config.wikitext_parse_in_subprocess:
+        logger.info(f"Parsing {len(wikitext)} characters in a subprocess")
+        return parse_in_subprocess(wikitext=wikitext, deadline=deadline)
+    return mwparserfromhell.parse(wikitext)
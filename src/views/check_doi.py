@@ -2,6 +2,7 @@ import hashlib
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+from src.models.api.enums import TimingStage
 from src.models.api.job.check_doi_job import CheckDoiJob
 from src.models.api.schema.check_doi_schema import CheckDoiSchema
 from src.models.exceptions import MissingInformationError
@@ -48,17 +49,21 @@ class CheckDoi(StatisticsWriteView):
         else:
             doi_string = self.job.unquoted_doi
             app.logger.info(f"Got {doi_string}")
-            doi = Doi(doi=doi_string, timeout=self.job.timeout)
-            doi.lookup_doi()
-            data = doi.get_doi_dictionary()
-            timestamp = datetime.timestamp(datetime.utcnow())
-            data["timestamp"] = int(timestamp)
-            isodate = datetime.isoformat(datetime.utcnow())
-            data["isodate"] = str(isodate)
+            doi = Doi(
+                doi=doi_string,
+                timeout=self.job.timeout,
+                request_deadline=self.job.deadline,
+            )
+            with self.job.timer.measure(stage=TimingStage.FETCH):
+                doi.lookup_doi()
             doi_hash_id = self.__doi_hash_id__
-            data["id"] = doi_hash_id
-            write = DoiFileIo(data=data, hash_based_id=doi_hash_id)
-            write.write_to_disk()
+            data = self.compile_data(doi=doi, doi_hash_id=doi_hash_id)
+            if doi.partial:
+                # Don't cache it so the next patron gets a chance of a full result
+                app.logger.info("Not caching the partial result")
+            else:
+                write = DoiFileIo(job=self.job, data=data, hash_based_id=doi_hash_id)
+                write.write_to_disk()
             if self.job.refresh:
                 self.__print_log_message_about_refresh__()
                 data["refreshed_now"] = True
@@ -67,12 +72,27 @@ class CheckDoi(StatisticsWriteView):
             return data, 200
 
     def __setup_io__(self):
-        self.io = DoiFileIo(hash_based_id=self.__doi_hash_id__)
+        self.io = DoiFileIo(job=self.job, hash_based_id=self.__doi_hash_id__)
 
     @property
     def __doi_hash_id__(self) -> str:
-        """This generates an 8-char long id based on the md5 hash of
-        the raw upper cased doi supplied by the user"""
         if not self.job:
             raise MissingInformationError()
-        return hashlib.md5(f"{self.job.doi.upper()}".encode()).hexdigest()[:8]
+        return self.get_doi_hash_id(doi=self.job.doi)
+
+    @staticmethod
+    def get_doi_hash_id(doi: str) -> str:
+        """This generates an 8-char long id based on the md5 hash of
+        the raw upper cased doi supplied by the user"""
+        return hashlib.md5(f"{doi.upper()}".encode()).hexdigest()[:8]
+
+    @staticmethod
+    def compile_data(doi: Doi, doi_hash_id: str) -> Dict[str, Any]:
+        """Add the time of the lookup and the id to the result of the lookup"""
+        data = doi.get_doi_dictionary()
+        timestamp = datetime.timestamp(datetime.utcnow())
+        data["timestamp"] = int(timestamp)
+        isodate = datetime.isoformat(datetime.utcnow())
+        data["isodate"] = str(isodate)
+        data["id"] = doi_hash_id
+        return data
@@ -0,0 +1,88 @@
+from typing import Any, Dict, Optional
+
+from marshmallow import Schema
+
+from src.models.api.enums import TimingStage
+from src.models.api.job.check_dois_job import CheckDoisJob
+from src.models.api.schema.check_dois_schema import CheckDoisSchema
+from src.models.file_io.doi_file_io import DoiFileIo
+from src.models.identifiers_checking.doi_batch import DoiBatch, normalize_doi
+from src.views.check_doi import CheckDoi
+from src.views.statistics.json_body_view import JsonBodyView
+
+
+class CheckDois(JsonBodyView):
+    """
+    Look up many DOIs in one request
+
+    The patron posts a json body like {"dois": ["10.1136/gut.52.12.1678", ...]}.
+    DOIs are deduplicated case-insensitively, cached results are served
+    from disk and the rest are looked up in batches, see DoiBatch.
+
+    This view does not contain any of the checking logic.
+    See src/models/checking
+    """
+
+    job: Optional[CheckDoisJob] = None
+    schema: Schema = CheckDoisSchema()
+    headers: Dict[str, Any] = {
+        "Access-Control-Allow-Origin": "*",
+    }
+
+    def post(self):
+        """This is the main method and the entrypoint for flask
+        Every branch in this method has to return a tuple (Any,response_code)"""
+        from src import app
+
+        app.logger.debug("post: running")
+        self.__validate_and_get_job__()
+        if self.job:
+            return self.__handle_valid_job__()
+
+    def __handle_valid_job__(self):
+        from src import app
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for doi in self.job.unquoted_dois:
+            results.setdefault(normalize_doi(doi), {})
+        if not self.job.refresh:
+            for doi in results:
+                io = DoiFileIo(
+                    job=self.job, hash_based_id=CheckDoi.get_doi_hash_id(doi)
+                )
+                io.read_from_disk()
+                results[doi] = io.data
+        misses = [doi for doi, data in results.items() if not data]
+        app.logger.info(
+            f"Got {len(results)} unique DOIs, looking up {len(misses)} of them"
+        )
+        batch = DoiBatch(
+            dois=misses, timeout=self.job.timeout, deadline=self.job.deadline
+        )
+        with self.job.timer.measure(stage=TimingStage.FETCH):
+            batch.lookup()
+        for doi in misses:
+            results[doi] = self.__get_fresh_data__(doi=doi, batch=batch)
+        return (
+            {
+                "dois": list(results.values()),
+                # Some DOIs were not looked up in all sources because the time ran out
+                "incomplete": self.job.deadline.expired,
+            },
+            200,
+            self.headers,
+        )
+
+    def __get_fresh_data__(self, doi, batch):
+        from src import app
+
+        data = CheckDoi.compile_data(
+            doi=batch.dois[doi], doi_hash_id=CheckDoi.get_doi_hash_id(doi)
+        )
+        if batch.dois[doi].partial:
+            # Don't cache it so the next patron gets a chance of a full result
+            app.logger.info(f"Not caching the partial result for {doi}")
+        elif not self.job.testing:
+            DoiFileIo(job=self.job, data=data, hash_based_id=data["id"]).write_to_disk()
+        data["refreshed_now"] = self.job.refresh
+        return data
@@ -6,6 +6,7 @@ from typing import Any, Dict, Optional
 from flask_restful import Resource, abort  # type: ignore
 from marshmallow import Schema
 
+from src.models.api.enums import TimingStage
 from src.models.api.job.check_url_job import UrlJob
 from src.models.api.schema.check_url_schema import UrlSchema
 from src.models.exceptions import MissingInformationError
@@ -33,11 +34,26 @@ class CheckUrl(StatisticsWriteView):
 
     @property
     def __url_hash_id__(self) -> str:
-        """This generates an 8-char long id based on the md5 hash of
-        the raw upper cased URL supplied by the user"""
         if not self.job:
             raise MissingInformationError()
-        return hashlib.md5(f"{self.job.unquoted_url.upper()}".encode()).hexdigest()[:8]
+        return self.get_url_hash_id(unquoted_url=self.job.unquoted_url)
+
+    @staticmethod
+    def get_url_hash_id(unquoted_url: str) -> str:
+        """This generates an 8-char long id based on the md5 hash of
+        the raw upper cased URL supplied by the user"""
+        return hashlib.md5(f"{unquoted_url.upper()}".encode()).hexdigest()[:8]
+
+    @staticmethod
+    def compile_data(url: Url, url_hash_id: str) -> Dict[str, Any]:
+        """Add the time of the check and the id to the result of the check"""
+        data = url.get_dict
+        timestamp = datetime.timestamp(datetime.utcnow())
+        data["timestamp"] = int(timestamp)
+        isodate = datetime.isoformat(datetime.utcnow())
+        data["isodate"] = str(isodate)
+        data["id"] = url_hash_id
+        return data
 
     def get(self):
         """This is the main method and the entrypoint for flask
@@ -50,19 +66,17 @@ class CheckUrl(StatisticsWriteView):
             return self.__handle_valid_job__()
 
     def __setup_io__(self):
-        self.io = UrlFileIo(hash_based_id=self.__url_hash_id__)
+        self.io = UrlFileIo(job=self.job, hash_based_id=self.__url_hash_id__)
 
     def __handle_valid_job__(self):
         from src import app
 
         app.logger.debug("__handle_valid_job__; running")
 
-        if not self.job.refresh:
-            self.__setup_and_read_from_cache__()
-            if self.io.data:
-                return self.io.data, 200
-            else:
-                return self.__return_fresh_data__()
+        # On refresh we still read the cache for the validators of the earlier check
+        self.__setup_and_read_from_cache__()
+        if self.io.data and not self.job.refresh:
+            return self.io.data, 200
         else:
             return self.__return_fresh_data__()
 
@@ -71,15 +85,19 @@ class CheckUrl(StatisticsWriteView):
 
         url_string = self.job.unquoted_url
         app.logger.info(f"Got {url_string}")
-        url = Url(url=url_string, timeout=self.job.timeout)
-        url.check()
-        data = url.get_dict
-        timestamp = datetime.timestamp(datetime.utcnow())
-        data["timestamp"] = int(timestamp)
-        isodate = datetime.isoformat(datetime.utcnow())
-        data["isodate"] = str(isodate)
-        url_hash_id = self.__url_hash_id__
-        data["id"] = url_hash_id
+        url = Url(
+            url=url_string,
+            timeout=self.job.timeout,
+            deadline=self.job.deadline,
+            conditional_headers=self.__get_conditional_headers__(
+                validators_key="response_headers"
+            ),
+        )
+        with self.job.timer.measure(stage=TimingStage.FETCH):
+            url.check(refresh=self.job.refresh)
+        if url.not_modified:
+            return self.__revalidate_cached_data__(), 200
+        data = self.compile_data(url=url, url_hash_id=self.__url_hash_id__)
         data_without_text = deepcopy(data)
         del data_without_text["text"]
         self.__write_to_cache__(data_without_text=data_without_text)
@@ -97,6 +115,8 @@ class CheckUrl(StatisticsWriteView):
         # We skip writes during testing
         if not self.job.testing:
             write = UrlFileIo(
-                data=data_without_text, hash_based_id=data_without_text["id"]
+                job=self.job,
+                data=data_without_text,
+                hash_based_id=data_without_text["id"],
             )
             write.write_to_disk()
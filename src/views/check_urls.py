@@ -0,0 +1,203 @@
+import json
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+from flask import Response, stream_with_context
+from marshmallow import Schema
+
+import config
+from src.models.api.job.check_urls_job import CheckUrlsJob
+from src.models.api.schema.check_urls_schema import CheckUrlsSchema
+from src.models.exceptions import MissingInformationError
+from src.models.file_io.url_file_io import UrlFileIo
+from src.models.identifiers_checking.dns_cache import dns_cache
+from src.models.identifiers_checking.testdeadlink import testdeadlink_client
+from src.models.identifiers_checking.url import Url
+from src.views.check_url import CheckUrl
+from src.views.statistics.json_body_view import JsonBodyView
+
+
+class CheckUrls(JsonBodyView):
+    """
+    Check many URLs in one request
+
+    The patron posts a json body like {"urls": ["https://example.com", ...]}.
+    URLs are deduplicated by the same id as check-url uses.
+    Cached results are returned first and the rest are checked concurrently
+    after resolving their hosts concurrently.
+    Every result is streamed as one line of json (NDJSON) as soon as it is ready
+    so the patron does not have to wait for the slowest URL.
+
+    This view does not contain any of the checking logic.
+    See src/models/checking
+    """
+
+    job: Optional[CheckUrlsJob] = None
+    schema: Schema = CheckUrlsSchema()
+    headers: Dict[str, Any] = {
+        "Access-Control-Allow-Origin": "*",
+    }
+
+    def post(self):
+        """This is the main method and the entrypoint for flask"""
+        from src import app
+
+        app.logger.debug("post: running")
+        self.__validate_and_get_job__()
+        if self.job:
+            return self.__handle_valid_job__()
+
+    def __get_unique_urls__(self):
+        """Map the id to the first URL with that id"""
+        unique_urls = {}
+        for url in self.job.unquoted_urls:
+            unique_urls.setdefault(CheckUrl.get_url_hash_id(unquoted_url=url), url)
+        return unique_urls
+
+    def __read_from_cache__(self, url_hash_id: str) -> Dict[str, Any]:
+        io = UrlFileIo(job=self.job, hash_based_id=url_hash_id)
+        io.read_from_disk()
+        return io.data
+
+    def __handle_valid_job__(self):
+        from src import app
+
+        unique_urls = self.__get_unique_urls__()
+        app.logger.info(
+            f"Got {len(self.job.urls)} URLs of which {len(unique_urls)} are unique"
+        )
+        cached: List[Dict[str, Any]] = []
+        misses: Dict[str, str] = {}
+        for url_hash_id, url in unique_urls.items():
+            data = {} if self.job.refresh else self.__read_from_cache__(url_hash_id)
+            if data:
+                cached.append(data)
+            else:
+                misses[url_hash_id] = url
+        app.logger.info(f"Serving {len(cached)} from cache, checking {len(misses)}")
+        return Response(
+            stream_with_context(self.__generate_lines__(cached=cached, misses=misses)),
+            mimetype="application/x-ndjson",
+            headers=self.headers,
+        )
+
+    def __generate_lines__(
+        self, cached: List[Dict[str, Any]], misses: Dict[str, str]
+    ) -> Iterator[str]:
+        """Yield every result as soon as its check is done
+
+        The testdeadlink status codes of the results sent before the
+        testdeadlink API answered follow in one update line per URL.
+        A check that fails gives an error line for its URL."""
+        from src import app
+
+        if not self.job:
+            raise MissingInformationError()
+        for data in cached:
+            yield self.__to_line__(data=data)
+        if not misses:
+            return
+        with ThreadPoolExecutor(
+            max_workers=config.check_urls_max_concurrent_checks + 1
+        ) as executor:
+            # All the misses are sent to the testdeadlink API in a few batches
+            # while we check them ourselves
+            testdeadlink_future = executor.submit(
+                testdeadlink_client.check_urls,
+                list(misses.values()),
+                self.job.deadline,
+            )
+            # Resolving the distinct hosts concurrently up front lets the
+            # checks skip the hosts that do not exist
+            dns_cache.resolve_hosts(urls=misses.values(), deadline=self.job.deadline)
+            futures: Dict[Future, str] = {
+                executor.submit(self.__check__, url): url_hash_id
+                for url_hash_id, url in misses.items()
+            }
+            # The results waiting for their testdeadlink status code
+            waiting: Dict[str, Dict[str, Any]] = {}
+            for future in as_completed(futures):
+                url_hash_id = futures[future]
+                try:
+                    url = future.result()
+                except Exception as e:  # noqa: BLE001 one URL must not end the stream
+                    app.logger.exception(f"Checking {misses[url_hash_id]} failed")
+                    yield self.__to_line__(
+                        data={
+                            "id": url_hash_id,
+                            "url": misses[url_hash_id],
+                            "error": str(e),
+                        }
+                    )
+                    continue
+                data = CheckUrl.compile_data(url=url, url_hash_id=url_hash_id)
+                text = data.pop("text")
+                if testdeadlink_future.done():
+                    data["testdeadlink_status_code"] = self.__get_status_codes__(
+                        future=testdeadlink_future
+                    ).get(url.url, 0)
+                    self.__write__(data=data, url_hash_id=url_hash_id)
+                else:
+                    waiting[url_hash_id] = data
+                yield self.__to_line__(
+                    data=self.__get_line_data__(
+                        data=data, text=text, pending=url_hash_id in waiting
+                    )
+                )
+            if waiting:
+                status_codes = self.__get_status_codes__(future=testdeadlink_future)
+                for url_hash_id, data in waiting.items():
+                    data["testdeadlink_status_code"] = status_codes.get(data["url"], 0)
+                    self.__write__(data=data, url_hash_id=url_hash_id)
+                    yield self.__to_line__(
+                        data={
+                            "id": url_hash_id,
+                            "url": data["url"],
+                            "testdeadlink_status_code": data[
+                                "testdeadlink_status_code"
+                            ],
+                        }
+                    )
+
+    def __check__(self, url_string):
+        url = Url(url=url_string, timeout=self.job.timeout, deadline=self.job.deadline)
+        url.check(testdeadlink=False, refresh=self.job.refresh)
+        return url
+
+    @staticmethod
+    def __get_status_codes__(future: Future) -> Dict[str, int]:
+        """The testdeadlink status codes or none if the API calls failed"""
+        from src import app
+
+        try:
+            status_codes: Dict[str, int] = future.result()
+        except Exception:  # noqa: BLE001 the results are still useful
+            app.logger.exception("Getting the testdeadlink status codes failed")
+            return {}
+        return status_codes
+
+    def __write__(self, data: Dict[str, Any], url_hash_id: str) -> None:
+        if not self.job:
+            raise MissingInformationError()
+        # We skip writes during testing
+        if not self.job.testing:
+            # We pass no job because the timer does not support concurrent stages
+            UrlFileIo(data=data, hash_based_id=url_hash_id).write_to_disk()
+
+    def __get_line_data__(
+        self, data: Dict[str, Any], text: str, pending: bool
+    ) -> Dict[str, Any]:
+        if not self.job:
+            raise MissingInformationError()
+        line_data = dict(data)
+        if pending:
+            # It follows in an update line
+            line_data["testdeadlink_status_code"] = None
+        line_data["refreshed_now"] = self.job.refresh
+        if self.job.debug:
+            line_data["text"] = text
+        return line_data
+
+    @staticmethod
+    def __to_line__(data: Dict[str, Any]) -> str:
+        return json.dumps(data, ensure_ascii=False) + "\n"
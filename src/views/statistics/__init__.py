@@ -1,13 +1,19 @@
 from datetime import datetime
-from typing import Optional
+from time import perf_counter
+from typing import Any, Dict, Optional
 
 from flask import request
 from flask_restful import Resource, abort  # type: ignore
+from flask_restful.utils import unpack  # type: ignore
 from marshmallow import Schema
+from requests import Timeout
+from werkzeug.wrappers import Response as ResponseBase
 
 from src.helpers.console import console
+from src.models.api.deadline import Deadline
 from src.models.api.job import Job
-from src.models.exceptions import MissingInformationError
+from src.models.api.profiler import RequestProfiler
+from src.models.exceptions import DeadlineExceededError, MissingInformationError
 from src.models.file_io import FileIo
 from src.models.wikimedia.wikipedia.analyzer import WikipediaAnalyzer
 
@@ -29,10 +35,85 @@ class StatisticsView(Resource):
     serving_from_json: bool = False
     io: Optional[FileIo] = None
 
+    def dispatch_request(self, *args, **kwargs):
+        """We wrap the flask-restful dispatch to add a Server-Timing
+        header based on the timer on the job to every response
+
+        If the patron asked for profiling and is allowed to
+        we run the whole request in the profiler"""
+        start = perf_counter()
+        profiler = self.__setup_profiler__()
+        response = (
+            profiler.run(self.__dispatch_within_deadline__, *args, **kwargs)
+            if profiler
+            else self.__dispatch_within_deadline__(*args, **kwargs)
+        )
+        headers = {}
+        job = getattr(self, "job", None)
+        if isinstance(job, Job):
+            headers["Server-Timing"] = job.timer.get_server_timing_header(
+                total_seconds=perf_counter() - start
+            )
+        if profiler:
+            headers["X-Profile-Artifact"] = profiler.write_to_disk()
+            response = self.__add_profile_summary__(
+                response=response, summary=profiler.get_summary()
+            )
+        return self.__add_headers__(response=response, headers=headers)
+
+    def __dispatch_within_deadline__(self, *args, **kwargs):
+        """Steps that cannot return anything useful without the rest
+        raise DeadlineExceededError when the time budget runs out and a
+        request timing out then is cut short by the budget as well"""
+        from src import app
+
+        try:
+            return super().dispatch_request(*args, **kwargs)
+        except Timeout as e:
+            job = getattr(self, "job", None)
+            if not isinstance(e, DeadlineExceededError) and not (
+                isinstance(job, Job) and job.deadline.expired
+            ):
+                raise
+            app.logger.warning(f"Gave up on {request.path}: {e}")
+            return {"error": str(e), "incomplete": True}, 504
+
+    @staticmethod
+    def __setup_profiler__() -> Optional[RequestProfiler]:
+        if str(request.args.get("profile", "")).lower() not in ["true", "1"]:
+            return None
+        if not RequestProfiler.is_allowed(
+            admin_token=request.headers.get("X-Admin-Token", "")
+        ):
+            abort(403, error="Profiling is not enabled on this instance")
+        return RequestProfiler(name=RequestProfiler.generate_name(request.path))
+
+    @staticmethod
+    def __add_profile_summary__(response, summary: Dict[str, Any]):
+        """We return the summary alongside the data if the data is a dictionary"""
+        if isinstance(response, ResponseBase):
+            return response
+        data, code, headers = unpack(response)
+        if isinstance(data, dict):
+            # We copy to avoid changing data that might be cached
+            data = {**data, "profile": summary}
+        return data, code, headers
+
+    @staticmethod
+    def __add_headers__(response, headers: Dict[str, str]):
+        if not headers:
+            return response
+        if isinstance(response, ResponseBase):
+            response.headers.update(headers)
+            return response
+        data, code, existing_headers = unpack(response)
+        return data, code, {**dict(existing_headers or {}), **headers}
+
     def __validate_and_get_job__(self):
         """Helper method"""
         self.__validate__()
         self.__parse_into_job__()
+        self.__start_deadline__()
 
     def __validate__(self):
         from src import app
@@ -53,6 +134,11 @@ class StatisticsView(Resource):
         self.job = self.schema.load(request.args)
         console.print(self.job)
 
+    def __start_deadline__(self):
+        """Start the time budget of the request, see src/models/api/deadline.py"""
+        if isinstance(self.job, Job):
+            self.job.deadline = Deadline.start_now(seconds=self.job.deadline_seconds)
+
     def __print_log_message_about_refresh__(self):
         from src import app
 
@@ -1,3 +1,4 @@
+from src.models.api.enums import TimingStage
 from src.models.api.handlers.all import AllHandler
 from src.models.api.job.article_job import ArticleJob
 from src.models.api.schema.article_schema import ArticleSchema
@@ -17,5 +18,6 @@ class All(StatisticsView):
     def get(self):
         self.__validate_and_get_job__()
         handler = AllHandler(job=self.job)
-        handler.fetch_and_compile()
+        with self.job.timer.measure(stage=TimingStage.FETCH):
+            handler.fetch_and_compile()
         return handler.compilation, 200
@@ -5,7 +5,7 @@ from flask_restful import Resource, abort  # type: ignore
 
 from src.models.api.job.article_job import ArticleJob
 from src.models.api.schema.article_schema import ArticleSchema
-from src.models.exceptions import MissingInformationError
+from src.models.exceptions import MissingInformationError, WikitextTooComplexError
 from src.models.file_io.article_file_io import ArticleFileIo
 from src.models.file_io.references import ReferencesFileIo
 from src.models.wikimedia.enums import AnalyzerReturn, WikimediaDomain
@@ -69,7 +69,11 @@ class Article(StatisticsWriteView):
             # This will run if we did not return an analysis from disk yet
             self.__print_log_message_about_refresh__()
             self.__setup_wikipedia_analyzer__()
-            return self.__analyze_and_write_and_return__()
+            try:
+                return self.__analyze_and_write_and_return__()
+            except WikitextTooComplexError as e:
+                app.logger.warning(f"Refused to analyze {self.job.title}: {e}")
+                return {"error": str(e)}, 422
 
     def __get_statistics__(self):
         from src import app
@@ -88,6 +92,7 @@ class Article(StatisticsWriteView):
             self.io.data["timestamp"] = int(timestamp)
             isodate = datetime.isoformat(datetime.utcnow())
             self.io.data["isodate"] = str(isodate)
+            self.io.data["timing"] = self.job.timer.get_dict()
         else:
             raise ValueError("not a dict")
 
@@ -145,6 +150,6 @@ class Article(StatisticsWriteView):
 
     def __write_references_to_disk__(self):
         references_file_io = ReferencesFileIo(
-            references=self.wikipedia_analyzer.reference_statistics
+            job=self.job, references=self.wikipedia_analyzer.reference_statistics
         )
         references_file_io.write_references_to_disk()
@@ -0,0 +1,34 @@
+from flask import request
+from flask_restful import abort  # type: ignore
+
+from src.models.exceptions import MissingInformationError
+from src.views.statistics import StatisticsView
+
+
+class JsonBodyView(StatisticsView):
+    """Abstract class for endpoints that get their input in a json body
+    of a post request instead of the query string"""
+
+    @staticmethod
+    def __get_body__():
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            abort(400, error="Expected a json object in the body")
+        return body
+
+    def __validate__(self):
+        from src import app
+
+        app.logger.debug("__validate__: running")
+        errors = self.schema.validate(self.__get_body__())
+        if errors:
+            app.logger.debug(f"Found errors: {errors}")
+            abort(400, error=str(errors))
+
+    def __parse_into_job__(self):
+        from src import app
+
+        app.logger.debug("__parse_into_job__: running")
+        if not self.schema:
+            raise MissingInformationError()
+        self.job = self.schema.load(self.__get_body__())
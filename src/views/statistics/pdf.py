@@ -1,12 +1,13 @@
 import hashlib
-from copy import deepcopy
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from src.models.api.handlers.pdf import PdfHandler
+import config
+from src.models.api.handlers.pdf import PdfHandler, debug_output_formats
 from src.models.api.job.check_url_job import UrlJob
 from src.models.api.schema.check_url_schema import UrlSchema
 from src.models.exceptions import MissingInformationError
+from src.models.file_io.pdf_debug_file_io import PdfDebugFileIo
 from src.models.file_io.pdf_file_io import PdfFileIo
 from src.views.statistics.write_view import StatisticsWriteView
 
@@ -47,18 +48,49 @@ class Pdf(StatisticsWriteView):
             return self.__handle_valid_job__()
 
     def __setup_io__(self):
-        self.io = PdfFileIo(hash_based_id=self.__url_hash_id__)
-
-    def __handle_debug_job__(self, data):
-        if not self.job.html:
-            del data["debug_html"]
-        if not self.job.xml:
-            del data["debug_xml"]
-        if not self.job.json_:
-            del data["debug_json"]
-        if not self.job.blocks:
-            del data["debug_blocks"]
-        return data, 200
+        self.io = PdfFileIo(job=self.job, hash_based_id=self.__url_hash_id__)
+
+    @property
+    def __requested_debug_outputs__(self) -> List[str]:
+        """The debug renderings the patron asked for"""
+        if not self.job:
+            raise MissingInformationError()
+        if not self.job.debug:
+            return []
+        flags = {
+            "html": self.job.html,
+            "xml": self.job.xml,
+            "json": self.job.json_,
+            "blocks": self.job.blocks,
+        }
+        return [
+            output_format
+            for output_format in debug_output_formats
+            if flags[output_format]
+        ]
+
+    def __get_debug_file_io__(self, output_format: str, data=None) -> PdfDebugFileIo:
+        return PdfDebugFileIo(
+            job=self.job,
+            data=data or {},
+            hash_based_id=f"{self.__url_hash_id__}-{output_format}",
+        )
+
+    def __write_debug_outputs__(self, data: Dict[str, Any]) -> None:
+        for output_format in self.__requested_debug_outputs__:
+            self.__get_debug_file_io__(
+                output_format=output_format,
+                data={"pages": data[f"debug_{output_format}"]},
+            ).write_to_disk()
+
+    def __add_cached_debug_outputs__(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the debug renderings we have on disk to the cached data"""
+        for output_format in self.__requested_debug_outputs__:
+            io = self.__get_debug_file_io__(output_format=output_format)
+            io.read_from_disk()
+            if io.data:
+                data[f"debug_{output_format}"] = io.data["pages"]
+        return data
 
     def __handle_valid_job__(self):
         from src import app
@@ -67,17 +99,28 @@ class Pdf(StatisticsWriteView):
 
         self.__setup_and_read_from_cache__()
         if self.io.data and not self.job.refresh:
+            if config.pdf_cache_debug_outputs:
+                return self.__add_cached_debug_outputs__(data=self.io.data), 200
             return self.io.data, 200
         else:
             url_string = self.job.unquoted_url
             app.logger.info(f"Got {url_string}")
-            pdf = PdfHandler(job=self.job)
-            pdf.download_and_extract()
-            if pdf.error:
-                if not isinstance(pdf.error_details, tuple):
-                    raise TypeError()
-                return pdf.error_details[1], pdf.error_details[0]
-            data = pdf.get_dict()
+            # The document is closed and a temporary file deleted when we are done
+            with PdfHandler(
+                job=self.job,
+                conditional_headers=self.__get_conditional_headers__(
+                    validators_key="validators"
+                ),
+            ) as pdf:
+                pdf.download_and_extract()
+                if pdf.error:
+                    if not isinstance(pdf.error_details, tuple):
+                        raise TypeError()
+                    return pdf.error_details[1], pdf.error_details[0]
+                if pdf.not_modified:
+                    return self.__revalidate_cached_data__(), 200
+                # The renderings are expensive so we only make the ones requested
+                data = pdf.get_dict(debug_outputs=self.__requested_debug_outputs__)
             timestamp = datetime.timestamp(datetime.utcnow())
             data["timestamp"] = int(timestamp)
             isodate = datetime.isoformat(datetime.utcnow())
@@ -85,29 +128,34 @@ class Pdf(StatisticsWriteView):
             url_hash_id = self.__url_hash_id__
             data["id"] = url_hash_id
             # Remove debug information
-            data_without_debug_information = deepcopy(data)
-            del data_without_debug_information["debug_url_annotations"]
-            del data_without_debug_information["debug_text_original"]
-            del data_without_debug_information["debug_text_without_linebreaks"]
-            del data_without_debug_information["debug_text_without_spaces"]
-            del data_without_debug_information["debug_html"]
-            del data_without_debug_information["debug_xml"]
-            del data_without_debug_information["debug_json"]
-            del data_without_debug_information["debug_blocks"]
+            data_without_debug_information = {
+                key: value
+                for key, value in data.items()
+                if not key.startswith("debug_")
+            }
             # console.print(data)
             # sys.exit()
             # We don't write during tests because it breaks the CI
             if not self.job.testing:
                 write = PdfFileIo(
-                    data=data_without_debug_information, hash_based_id=url_hash_id
+                    job=self.job,
+                    data=data_without_debug_information,
+                    hash_based_id=url_hash_id,
                 )
                 write.write_to_disk()
+                if config.pdf_cache_debug_outputs:
+                    self.__write_debug_outputs__(data=data)
             if self.job.refresh:
                 self.__print_log_message_about_refresh__()
                 data["refreshed_now"] = True
             else:
                 data["refreshed_now"] = False
+            data["not_modified"] = False
             if self.job.debug:
-                return self.__handle_debug_job__(data=data)
+                return data, 200
             else:
-                return data_without_debug_information, 200
+                return {
+                    **data_without_debug_information,
+                    "refreshed_now": data["refreshed_now"],
+                    "not_modified": False,
+                }, 200
@@ -1,3 +1,4 @@
+from src.models.api.enums import TimingStage
 from src.models.api.job.references_job import ReferencesJob
 from src.models.api.schema.references_schema import ReferencesSchema
 from src.models.exceptions import MissingInformationError
@@ -17,6 +18,10 @@ class References(StatisticsView):
 
     def get(self):
         self.__validate_and_get_job__()
+        with self.job.timer.measure(stage=TimingStage.CACHE_READ):
+            return self.__read_references_from_cache__()
+
+    def __read_references_from_cache__(self):
         # load the article json
         articlefileio = ArticleFileIo(wari_id=self.job.wari_id)
         articlefileio.read_from_disk()
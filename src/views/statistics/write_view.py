@@ -1,3 +1,8 @@
+from datetime import datetime
+from typing import Any, Dict
+
+from src.models.api.revalidation import get_conditional_headers
+from src.models.exceptions import MissingInformationError
 from src.views.statistics import StatisticsView
 
 
@@ -11,3 +16,44 @@ class StatisticsWriteView(StatisticsView):
     def __setup_and_read_from_cache__(self):
         self.__setup_io__()
         self.io.read_from_disk()
+
+    def __get_conditional_headers__(self, validators_key: str) -> Dict[str, str]:
+        """The headers to only download the document again if it changed
+        since the cached result was made
+
+        The validators are in the cached result under validators_key.
+        Debug output needs the document so we always download it then."""
+        if not self.job:
+            raise MissingInformationError()
+        if (
+            not self.job.refresh
+            or getattr(self.job, "debug", False)
+            or not self.io
+            or not self.io.data
+        ):
+            return {}
+        return get_conditional_headers(
+            validators=self.io.data.get(validators_key) or {}
+        )
+
+    def __revalidate_cached_data__(self) -> Dict[str, Any]:
+        """The document did not change so we serve the cached result
+        with the time of this check"""
+        from src import app
+
+        if not self.job or not self.io:
+            raise MissingInformationError()
+        app.logger.info("The document was not modified, serving the cached result")
+        data = {
+            key: value
+            for key, value in self.io.data.items()
+            if key != "served_from_cache"
+        }
+        data["timestamp"] = int(datetime.timestamp(datetime.utcnow()))
+        data["isodate"] = str(datetime.isoformat(datetime.utcnow()))
+        # We don't write during tests because it breaks the CI
+        if not self.job.testing:
+            self.io.data = data
+            self.io.write_to_disk()
+        self.__print_log_message_about_refresh__()
+        return {**data, "refreshed_now": True, "not_modified": True}
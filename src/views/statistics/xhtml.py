@@ -43,7 +43,7 @@ class Xhtml(StatisticsWriteView):
             return self.__handle_valid_job__()
 
     def __setup_io__(self):
-        self.io = XhtmlFileIo(hash_based_id=self.__url_hash_id__)
+        self.io = XhtmlFileIo(job=self.job, hash_based_id=self.__url_hash_id__)
 
     def __handle_valid_job__(self):
         from src import app
@@ -56,10 +56,17 @@ class Xhtml(StatisticsWriteView):
         else:
             url_string = self.job.unquoted_url
             app.logger.info(f"Got {url_string}")
-            handler = XhtmlHandler(job=self.job)
+            handler = XhtmlHandler(
+                job=self.job,
+                conditional_headers=self.__get_conditional_headers__(
+                    validators_key="validators"
+                ),
+            )
             handler.download_and_extract()
             if handler.error:
                 return handler.error_details, 400
+            if handler.not_modified:
+                return self.__revalidate_cached_data__(), 200
             data = handler.get_dict()
             # console.print(data)
             # exit()
@@ -71,11 +78,12 @@ class Xhtml(StatisticsWriteView):
             data["id"] = url_hash_id
             # We don't write during tests because it breaks the CI
             if not self.job.testing:
-                write = XhtmlFileIo(data=data, hash_based_id=url_hash_id)
+                write = XhtmlFileIo(job=self.job, data=data, hash_based_id=url_hash_id)
                 write.write_to_disk()
             if self.job.refresh:
                 self.__print_log_message_about_refresh__()
                 data["refreshed_now"] = True
             else:
                 data["refreshed_now"] = False
+            data["not_modified"] = False
             return data, 200
@@ -0,0 +1,64 @@
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.api.handlers.pdf import PdfHandler
+from src.models.api.job.check_url_job import UrlJob
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+pdf = Path("test_data/FFO-FLASH-REPORT-REV.pdf").read_bytes()
+
+
+class PdfFileHandler(QuietHandler):
+    def do_GET(self):  # noqa: N802
+        body = b"" if self.path == "/empty.pdf" else pdf
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        if self.path != "/without-length.pdf":
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestPdfDownload(TestCase):
+    """Offline tests of the streamed download with a local server"""
+
+    def download(self, path: str) -> PdfHandler:
+        with LocalServer(handler=PdfFileHandler) as server:
+            handler = PdfHandler(job=UrlJob(url=f"{server.url}{path}"))
+            handler.download_and_extract()
+        return handler
+
+    def test_small_pdf_is_kept_in_memory(self):
+        with self.download(path="/report.pdf") as handler:
+            assert handler.content == pdf
+            assert handler.spool_path == ""
+            assert handler.number_of_links_from_annotations == 9
+
+    def test_large_pdf_is_spooled_to_disk(self):
+        with patch.object(config, "pdf_spool_threshold_bytes", new=100_000):
+            handler = self.download(path="/without-length.pdf")
+        with handler:
+            assert handler.content == b""
+            assert Path(handler.spool_path).read_bytes() == pdf
+            spool_path = handler.spool_path
+            assert handler.number_of_links_from_annotations == 9
+            assert handler.get_dict(debug_outputs=["xml"])["pages_total"] == 6
+        assert not Path(spool_path).exists()
+        assert handler.pdf_document is None
+
+    def test_too_large_pdf(self):
+        for path in ["/report.pdf", "/without-length.pdf"]:
+            with patch.multiple(
+                config, pdf_max_bytes=len(pdf) - 1, pdf_spool_threshold_bytes=100_000
+            ):
+                handler = self.download(path=path)
+            assert handler.error is True
+            assert handler.error_details[0] == 413
+            assert handler.spool_path == ""
+
+    def test_empty_response(self):
+        handler = self.download(path="/empty.pdf")
+        assert handler.error is True
+        assert handler.error_details[0] == 400
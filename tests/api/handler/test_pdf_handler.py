@@ -151,3 +151,13 @@ class TestPdfHandler(unittest.TestCase):
 
     def test_number_of_characters(self):
         assert self.pdf_handler5.number_of_total_text_characters == 2148
+
+    def test_debug_outputs_are_only_rendered_when_requested(self):
+        data = self.pdf_handler4.get_dict()
+        assert not [key for key in data if key in ["debug_html", "debug_blocks"]]
+        assert self.pdf_handler4.debug_outputs == {}
+        data = self.pdf_handler4.get_dict(debug_outputs=["html", "blocks"])
+        assert data["debug_html"][0].startswith("<div")
+        assert data["debug_blocks"][0][0]["block_no"] == 0
+        assert "debug_xml" not in data
+        assert list(self.pdf_handler4.debug_outputs) == ["html", "blocks"]
@@ -0,0 +1,72 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.api.handlers import pdf_pages
+from src.models.api.handlers.pdf import PdfHandler
+from src.models.api.handlers.pdf_pages import (
+    PageUrlValidator,
+    get_page_ranges,
+    use_process_pool,
+)
+from src.models.api.job.check_url_job import UrlJob
+
+
+def extract(file_path: str) -> PdfHandler:
+    handler = PdfHandler(job=UrlJob(url=""), file_path=file_path)
+    handler.read_and_extract()
+    return handler
+
+
+class TestPdfPages(TestCase):
+    file_path = "test_data/FFO-FLASH-REPORT-REV.pdf"
+
+    def test_get_page_ranges(self):
+        assert get_page_ranges(page_count=6, workers=4) == [(0, 2), (2, 4), (4, 6)]
+        assert get_page_ranges(page_count=300, workers=4)[-1] == (225, 300)
+
+    def test_small_pdfs_are_extracted_in_process(self):
+        with patch.multiple(
+            config,
+            pdf_parallel_extraction_min_pages=100,
+            pdf_parallel_extraction_max_workers=4,
+        ):
+            assert use_process_pool(page_count=99) is False
+            assert use_process_pool(page_count=100) is True
+        with patch.object(config, "pdf_parallel_extraction_max_workers", new=1):
+            assert use_process_pool(page_count=1000) is False
+
+    def test_parallel_extraction_gives_the_same_result(self):
+        serial = extract(file_path=self.file_path)
+        with patch.multiple(
+            config,
+            pdf_parallel_extraction_min_pages=2,
+            pdf_parallel_extraction_max_workers=3,
+        ):
+            parallel = extract(file_path=self.file_path)
+        assert parallel.get_dict() == serial.get_dict()
+        assert parallel.number_of_links_from_annotations == 9
+        assert list(parallel.text_pages) == [0, 1, 2, 3, 4, 5]
+
+    def test_failing_process_pool_falls_back_to_serial(self):
+        with patch.multiple(
+            config,
+            pdf_parallel_extraction_min_pages=2,
+            pdf_parallel_extraction_max_workers=3,
+        ), patch.object(
+            pdf_pages, "extract_pages_in_parallel", side_effect=OSError("no fork")
+        ):
+            handler = extract(file_path=self.file_path)
+        assert handler.number_of_links_from_annotations == 9
+
+    def test_urls_are_validated_once_per_page(self):
+        validator = PageUrlValidator()
+        text = "See https://example.com/a and https://example.com/a"
+        with patch.object(
+            pdf_pages.validators, "url", wraps=pdf_pages.validators.url
+        ) as url:
+            links = validator.get_links(page_num=3, text=text)
+            # The text without linebreaks is often the same
+            links += validator.get_links(page_num=3, text=text)
+        assert links == [(3, "https://example.com/a")] * 4
+        assert url.call_count == 1
@@ -1,7 +1,5 @@
 import unittest
 
-from bs4 import Tag
-
 from src.models.api.handlers.xhtml import XhtmlHandler
 from src.models.api.job.check_url_job import UrlJob
 from src.models.api.link.xhtml_link import XhtmlLink
@@ -45,15 +43,14 @@ class TestXhtmlHandler(unittest.TestCase):
         assert "links" in data
         assert len(data["links"]) == 60
         first_link = data["links"][0]
-        # remove the Tag which causes a test error
-        test_tag = Tag(name="test")
-        first_link["context"] = first_link["parent"] = test_tag
         assert first_link == XhtmlLink(
-            context=test_tag,
+            context=first_link["context"],
             href="https://crates.io/crates/encoding_rs",
             title="",
-            parent=test_tag,
+            parent=first_link["parent"],
         )
+        assert first_link["context"].startswith('<a href="https://crates.io/')
+        assert first_link["context"] in first_link["parent"]
         assert data["detected_language"] == "en"
 
     def test_get_dict2(self):
@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+from src.models.api.handlers.xhtml_links import (
+    LinkCollector,
+    XhtmlStreamParser,
+    extract_links_and_text,
+    get_encoding,
+)
+
+page = """<html><head><meta charset="utf-8"><title>Title</title>
+<script>var link = "<a href='https://example.net'>";</script></head><body>
+<a href="https://example.org" title="top">top &amp; link</a>
+<div><p>Héllo <a href="https://example.com/a?b=1&amp;c=2" title='say "hi"'>a <b>bold</b><br>link</a>
+and <a href="relative">a relative link</a></p></div>
+<style>p {}</style></body></html>""".encode()
+
+
+class TestXhtmlLinks(TestCase):
+    def test_links(self):
+        links = [link.get_dict() for link in extract_links_and_text(page).links]
+        assert links == [
+            {
+                "context": '<a href="https://example.org" title="top">top &amp; link</a>',
+                # Links directly in the body are their own parent
+                "parent": '<a href="https://example.org" title="top">top &amp; link</a>',
+                "title": "top",
+                "href": "https://example.org",
+            },
+            {
+                "context": (
+                    '<a href="https://example.com/a?b=1&amp;c=2" '
+                    'title="say &quot;hi&quot;">a <b>bold</b><br/>link</a>'
+                ),
+                "parent": (
+                    '<p>Héllo <a href="https://example.com/a?b=1&amp;c=2" '
+                    'title="say &quot;hi&quot;">a <b>bold</b><br/>link</a>\n'
+                    'and <a href="relative">a relative link</a></p>'
+                ),
+                "title": 'say "hi"',
+                "href": "https://example.com/a?b=1&c=2",
+            },
+        ]
+
+    def test_text(self):
+        text = extract_links_and_text(page).text
+        assert "Title" in text
+        assert "Héllo a boldlink\nand a relative link" in text
+        assert "var link" not in text
+        assert "p {}" not in text
+
+    def test_chunks(self):
+        parser = XhtmlStreamParser()
+        for start in range(0, len(page), 7):
+            parser.feed(page[start : start + 7])
+        assert parser.close() == extract_links_and_text(page)
+
+    def test_encoding(self):
+        latin = '<meta charset="iso-8859-1"><p>Héllo</p>'.encode("latin-1")
+        assert get_encoding(latin) == "iso-8859-1"
+        assert extract_links_and_text(latin).text == "Héllo"
+        assert extract_links_and_text("<p>Héllo</p>".encode()).text == "Héllo"
+        assert (
+            extract_links_and_text(
+                "<p>Héllo</p>".encode("cp1252"), encoding="cp1252"
+            ).text
+            == "Héllo"
+        )
+
+    def test_empty(self):
+        assert extract_links_and_text(b"").links == []
+
+    def test_markup_is_dropped_after_each_block(self):
+        collector = LinkCollector()
+        collector.start("html", {})
+        collector.start("body", {})
+        for _ in range(100):
+            collector.start("p", {})
+            collector.data("text ")
+            collector.end("p")
+        assert collector.fragments == []
+        assert collector.close().text == "text " * 100
@@ -0,0 +1,65 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+import config
+from src.views.check_doi import CheckDoi
+from src.views.check_dois import CheckDois
+from tests.stubs.doi_sources import DoiSourcesHandler, local_doi_sources
+
+
+class TestCheckDois(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+
+        api.add_resource(CheckDois, "/check-dois")
+        app.testing = True
+        self.test_client = app.test_client()
+
+    def test_dois_are_deduplicated(self):
+        dois = ["10.1234/Plain", "10.1234/PLAIN", "10.1234/retracted"]
+        with local_doi_sources():
+            response = self.test_client.post(
+                "/check-dois", json={"dois": dois, "testing": True}
+            )
+        self.assertEqual(200, response.status_code)
+        results = response.json["dois"]
+        assert [result["doi"] for result in results] == [
+            "10.1234/plain",
+            "10.1234/retracted",
+        ]
+        assert results[0]["id"] == CheckDoi.get_doi_hash_id("10.1234/Plain")
+        assert results[1]["openalex"]["retracted"] is True
+        assert results[1]["partial"] is False
+
+    def test_cached_dois_are_not_looked_up(self):
+        dois = ["10.1234/plain", "10.1234/retracted"]
+        with TemporaryDirectory() as directory, patch.object(
+            config, "subdirectory_for_json", f"{directory}/"
+        ), local_doi_sources():
+            Path(directory, "dois").mkdir()
+            self.test_client.post("/check-dois", json={"dois": dois[:1]})
+            DoiSourcesHandler.reset()
+            response = self.test_client.post("/check-dois", json={"dois": dois})
+            results = response.json["dois"]
+            assert results[0]["served_from_cache"] is True
+            assert "served_from_cache" not in results[1]
+            # Only the DOI that was not cached is looked up
+            assert DoiSourcesHandler.requests.count("fatcat") == 1
+
+    def test_invalid_body(self):
+        assert (
+            self.test_client.post("/check-dois", json={"dois": []}).status_code == 400
+        )
+        assert (
+            self.test_client.post("/check-dois", json={"doi": "a"}).status_code == 400
+        )
+        response = self.test_client.post(
+            "/check-dois", json={"dois": ["10.1234/plain", "  "]}
+        )
+        assert response.status_code == 400
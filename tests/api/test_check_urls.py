@@ -0,0 +1,168 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import sleep
+from typing import Any, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+import config
+from src.models.identifiers_checking.dns_cache import dns_cache
+from src.models.identifiers_checking.testdeadlink import testdeadlink_client
+from src.views.check_url import CheckUrl
+from src.views.check_urls import CheckUrls
+from tests.stubs.fake_dns import FakeDnsServer
+from tests.stubs.local_server import LocalServer, QuietHandler
+from tests.stubs.testdeadlink_api import TestdeadlinkApiHandler
+
+
+class PageHandler(QuietHandler):
+    def do_GET(self):  # noqa: N802
+        if self.path == "/slow":
+            sleep(1)
+        self.send_response(404 if self.path == "/missing" else 200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(b"<p>This is a page.</p>")
+
+
+def merge_updates(lines: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Map the URLs to their results in the order they were sent with the
+    testdeadlink status codes from the update lines"""
+    results: Dict[str, Dict[str, Any]] = {}
+    for line in lines:
+        results.setdefault(line["url"], {}).update(line)
+    return results
+
+
+class TestCheckUrls(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+
+        api.add_resource(CheckUrls, "/check-urls")
+        app.testing = True
+        self.test_client = app.test_client()
+        TestdeadlinkApiHandler.reset()
+
+    def post(self, body):
+        with LocalServer(handler=TestdeadlinkApiHandler) as api, patch.object(
+            testdeadlink_client, "api_url", new=api.url
+        ):
+            response = self.test_client.post("/check-urls", json=body)
+            lines = [json.loads(line) for line in response.data.splitlines()]
+        return response, lines
+
+    def test_urls_are_deduplicated_and_streamed(self):
+        with LocalServer(handler=PageHandler) as server:
+            urls = [
+                f"{server.url}/slow",
+                f"{server.url}/page",
+                f"{server.url}/PAGE",
+                f"{server.url}/missing",
+                f"{server.url}/page",
+            ]
+            response, lines = self.post(body={"urls": urls, "testing": True})
+        self.assertEqual(200, response.status_code)
+        assert response.mimetype == "application/x-ndjson"
+        assert "Server-Timing" in response.headers
+        results = merge_updates(lines=lines)
+        # The ids are based on the upper cased URL so /PAGE is the same as /page
+        assert len(results) == 3
+        # The slow URL comes last
+        assert list(results)[-1] == urls[0]
+        assert results[urls[1]]["status_code"] == 200
+        assert results[urls[1]]["id"] == CheckUrl.get_url_hash_id(urls[1])
+        assert results[urls[3]]["status_code"] == 404
+        assert all("text" not in line for line in lines)
+        # All the URLs were sent to the testdeadlink API in one request
+        assert len(TestdeadlinkApiHandler.requests) == 1
+        assert all(
+            result["testdeadlink_status_code"] == 200 for result in results.values()
+        )
+
+    def test_results_do_not_wait_for_testdeadlink(self):
+        with LocalServer(handler=PageHandler) as server, patch.object(
+            TestdeadlinkApiHandler, "delay", new=1
+        ):
+            urls = [f"{server.url}/page", f"{server.url}/missing"]
+            _, lines = self.post(body={"urls": urls, "testing": True})
+        # The results come first and the status codes follow
+        assert len(lines) == 4
+        assert all(line["testdeadlink_status_code"] is None for line in lines[:2])
+        assert all(line["status_code"] for line in lines[:2])
+        assert {line["url"] for line in lines[2:]} == set(urls)
+        assert all(line["testdeadlink_status_code"] == 200 for line in lines[2:])
+
+    def test_failed_check_gives_an_error_line(self):
+        check = CheckUrls.__check__
+
+        def fail_on_broken(view, url_string):
+            if url_string.endswith("/broken"):
+                raise ValueError("Something broke")
+            return check(view, url_string)
+
+        with LocalServer(handler=PageHandler) as server, patch.object(
+            CheckUrls, "__check__", new=fail_on_broken
+        ):
+            urls = [f"{server.url}/page", f"{server.url}/broken"]
+            response, lines = self.post(body={"urls": urls, "testing": True})
+        assert response.status_code == 200
+        results = merge_updates(lines=lines)
+        assert results[urls[0]]["status_code"] == 200
+        assert results[urls[1]] == {
+            "id": CheckUrl.get_url_hash_id(urls[1]),
+            "url": urls[1],
+            "error": "Something broke",
+        }
+
+    def test_cached_urls_are_not_checked(self):
+        with TemporaryDirectory() as directory, patch.object(
+            config, "subdirectory_for_json", f"{directory}/"
+        ), LocalServer(handler=PageHandler) as server:
+            Path(directory, "urls").mkdir()
+            urls = [f"{server.url}/page", f"{server.url}/missing"]
+            _, lines = self.post(body={"urls": urls})
+            assert len(merge_updates(lines=lines)) == 2
+            assert len(TestdeadlinkApiHandler.requests) == 1
+            # Both results are written to the cache and served from it next time
+            TestdeadlinkApiHandler.reset()
+            _, lines = self.post(body={"urls": urls})
+            assert len(lines) == 2
+            assert all(line["served_from_cache"] for line in lines)
+            assert TestdeadlinkApiHandler.requests == []
+            # A refresh checks them again
+            _, lines = self.post(body={"urls": urls, "refresh": True})
+            results = merge_updates(lines=lines)
+            assert all(result["refreshed_now"] for result in results.values())
+            assert len(TestdeadlinkApiHandler.requests) == 1
+
+    def test_hosts_are_resolved_up_front(self):
+        dns_cache.clear()
+        with FakeDnsServer(records={}) as dns_server, patch.object(
+            dns_cache, "resolver", new=dns_server.resolver
+        ), LocalServer(handler=PageHandler) as server:
+            urls = [
+                f"{server.url}/page",
+                "http://defunct.example.com/a",
+                "http://defunct.example.com/b",
+            ]
+            _, lines = self.post(body={"urls": urls, "testing": True})
+        dns_cache.clear()
+        # The IP address of the local server is not looked up
+        assert list(dns_server.queries) == ["defunct.example.com"]
+        results = merge_updates(lines=lines)
+        assert results[urls[0]]["status_code"] == 200
+        for url in urls[1:]:
+            assert results[url]["dns_record_found"] is False
+            assert results[url]["request_error"] is True
+
+    def test_invalid_body(self):
+        assert self.test_client.post("/check-urls", data="a").status_code == 400
+        assert (
+            self.test_client.post("/check-urls", json={"urls": []}).status_code == 400
+        )
+        assert self.test_client.post("/check-urls", json=["a"]).status_code == 400
@@ -0,0 +1,185 @@
+import json
+from tempfile import TemporaryDirectory
+from time import monotonic, perf_counter, sleep
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+import config
+from src.models.api.deadline import Deadline
+from src.models.api.downloader import Downloader, DownloadPolicy
+from src.models.api.enums import TimingStage
+from src.models.api.job.article_job import ArticleJob
+from src.models.exceptions import DeadlineExceededError
+from src.models.file_io import FileIo
+from src.models.identifiers_checking.doi_batch import DoiBatch
+from src.models.identifiers_checking.host_health import host_health_tracker
+from src.models.identifiers_checking.testdeadlink import testdeadlink_client
+from src.models.identifiers_checking.url import Url
+from src.models.wikimedia.wikipedia.reference.extractor import (
+    WikipediaReferenceExtractor,
+)
+from src.views.check_url import CheckUrl
+from src.views.statistics.pdf import Pdf
+from tests.stubs.doi_sources import DoiSourcesHandler, local_doi_sources
+from tests.stubs.local_server import LocalServer, QuietHandler
+from tests.stubs.testdeadlink_api import TestdeadlinkApiHandler
+
+
+def expired() -> Deadline:
+    return Deadline(seconds=1, start=monotonic() - 2)
+
+
+class SlowHandler(QuietHandler):
+    """Sends the headers right away and the body in pieces over a second"""
+
+    def do_GET(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        try:
+            for _ in range(10):
+                self.wfile.write(b"<p>slow</p>" * 10_000)
+                self.wfile.flush()
+                sleep(0.1)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class TestDeadline(TestCase):
+    def test_start_now(self):
+        assert Deadline.start_now().seconds == config.request_deadline_seconds
+        assert Deadline.start_now(seconds=5).seconds == 5
+        # Patrons cannot ask for more than the config allows
+        assert (
+            Deadline.start_now(seconds=10_000).seconds
+            == config.request_deadline_seconds
+        )
+
+    def test_no_deadline(self):
+        deadline = Deadline()
+        assert deadline.expired is False
+        assert deadline.get_timeout(timeout=2) == 2
+
+    def test_get_timeout(self):
+        deadline = Deadline.start_now(seconds=1)
+        assert 0 < deadline.get_timeout(timeout=5) <= 1
+        assert deadline.get_timeout(timeout=0.5) == 0.5
+        with self.assertRaises(DeadlineExceededError):
+            expired().get_timeout(timeout=5)
+
+    def test_ran_out(self):
+        deadline = expired()
+        assert deadline.ran_out(stage=TimingStage.EXTRACT) is True
+        assert deadline.ran_out(stage=TimingStage.EXTRACT) is True
+        assert deadline.incomplete_stages == ["extract"]
+        assert Deadline.start_now().ran_out(stage=TimingStage.EXTRACT) is False
+
+    def test_incomplete_data_is_not_written(self):
+        with TemporaryDirectory() as directory, patch.object(
+            config, "subdirectory_for_json", f"{directory}/"
+        ):
+            io = FileIo(wari_id="test", data={"a": 1, "incomplete": True})
+            io.write_to_disk()
+            io = FileIo(wari_id="test")
+            io.read_from_disk()
+        assert io.data == {}
+
+
+class TestDeadlinePropagation(TestCase):
+    def test_extraction_stops(self):
+        job = ArticleJob(title="Test", regex="bibliography", deadline=expired())
+        extractor = WikipediaReferenceExtractor(
+            testing=True,
+            wikitext="Text<ref>a</ref>\n==Notes==\n<ref>b</ref>",
+            job=job,
+        )
+        extractor.extract_all_references()
+        assert extractor.number_of_references == 0
+        assert job.deadline.incomplete_stages == ["extract"]
+
+    def test_url_is_not_checked(self):
+        with LocalServer(handler=SlowHandler) as server:
+            url = Url(url=f"{server.url}/page", deadline=expired())
+            url.check(testdeadlink=False)
+        assert url.incomplete is True
+        assert url.status_code == 0
+        assert url.request_error is False
+        assert "deadline" not in url.get_dict
+
+    def test_url_check_is_cut_short(self):
+        with LocalServer(handler=SlowHandler) as server:
+            url = Url(
+                url=f"{server.url}/page",
+                timeout=5,
+                deadline=Deadline.start_now(seconds=0.3),
+            )
+            start = perf_counter()
+            url.check(testdeadlink=False)
+            assert perf_counter() - start < 1
+        assert url.incomplete is True
+        assert url.body_truncated is True
+        # Our time running out says nothing about the host
+        assert host_health_tracker.get_health(host=url.netloc) is None
+
+    def test_download_is_cut_short(self):
+        policy = DownloadPolicy(name="XHTML", max_bytes=10_000_000, chunk_size=1024)
+        with LocalServer(handler=SlowHandler) as server:
+            downloader = Downloader(
+                policy=policy, deadline=Deadline.start_now(seconds=0.3)
+            )
+            with self.assertRaises(DeadlineExceededError):
+                downloader.download(
+                    url=f"{server.url}/page", timeout=5, conditional_headers=None
+                )
+
+    def test_dois_are_not_looked_up(self):
+        with local_doi_sources():
+            batch = DoiBatch(dois=["10.1234/plain"], deadline=expired())
+            batch.lookup()
+            assert DoiSourcesHandler.requests == []
+        doi = batch.dois["10.1234/plain"]
+        assert doi.partial is True
+        assert set(doi.sources.values()) == {"timeout"}
+
+
+class TestDeadlineViews(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_resource(CheckUrl, "/check-url")
+        api.add_resource(Pdf, "/pdf")
+        app.testing = True
+        self.test_client = app.test_client()
+
+    def get(self, path):
+        with TemporaryDirectory() as directory, patch.object(
+            config, "subdirectory_for_json", f"{directory}/"
+        ), LocalServer(handler=TestdeadlinkApiHandler) as api, patch.object(
+            testdeadlink_client, "api_url", new=api.url
+        ):
+            return self.test_client.get(path)
+
+    def test_check_url_returns_incomplete_result(self):
+        with LocalServer(handler=SlowHandler) as server:
+            response = self.get(
+                f"/check-url?url={server.url}/page&timeout=5&deadline=0.3"
+            )
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["incomplete"] is True
+        assert data["body_truncated"] is True
+
+    def test_pdf_gives_up(self):
+        with LocalServer(handler=SlowHandler) as server:
+            response = self.get(f"/pdf?url={server.url}/file.pdf&deadline=0.3")
+        assert response.status_code == 504
+        assert json.loads(response.data)["incomplete"] is True
+
+    def test_invalid_deadline(self):
+        assert (
+            self.get("/check-url?url=https://example.com&deadline=-1").status_code
+            == 400
+        )
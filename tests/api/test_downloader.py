@@ -0,0 +1,122 @@
+from pathlib import Path
+from unittest import TestCase
+
+from src.models.api.downloader import Downloader, DownloadPolicy, get_charset
+from src.models.api.handlers.xhtml import XhtmlHandler
+from src.models.api.job.check_url_job import UrlJob
+from src.models.exceptions import DownloadError
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+body = "<html><body><p>Héllo <a href='https://example.com'>link</a></p></body></html>"
+
+
+class ContentTypeHandler(QuietHandler):
+    """Serves a body of 50 MB with the content type given in the path
+
+    The number of bytes written is recorded on the class"""
+
+    bytes_written = 0
+
+    def do_GET(self):  # noqa: N802
+        content_type = self.path.strip("/").replace("_", "/")
+        if self.path == "/missing":
+            content, content_type = body.encode(), ""
+        elif self.path == "/latin":
+            content, content_type = body.encode("latin-1"), "text/html; charset=latin-1"
+        else:
+            content = body.encode()
+        self.send_response(200)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.end_headers()
+        self.wfile.write(content)
+        if self.path in ["/missing", "/latin"]:
+            return
+        # Much more than the socket buffers can hold
+        padding = b" " * 64 * 1024
+        try:
+            for _ in range(800):
+                self.wfile.write(padding)
+                type(self).bytes_written += len(padding)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class TestDownloader(TestCase):
+    policy = DownloadPolicy(
+        name="XHTML",
+        content_types=["text/html"],
+        max_bytes=1_000_000,
+        chunk_size=64 * 1024,
+    )
+
+    def setUp(self) -> None:
+        ContentTypeHandler.bytes_written = 0
+
+    def download(self, path: str):
+        with LocalServer(handler=ContentTypeHandler) as server:
+            return Downloader(policy=self.policy).download(
+                url=f"{server.url}{path}", timeout=2, conditional_headers=None
+            )
+
+    def test_content_type_is_checked_before_the_body(self):
+        with self.assertRaises(DownloadError) as context:
+            self.download(path="/video_mp4")
+        assert context.exception.status_code == 415
+        assert context.exception.message == (
+            "Invalid content type for XHTML file. Got video/mp4"
+        )
+        assert ContentTypeHandler.bytes_written < 50_000_000
+
+    def test_max_bytes(self):
+        with self.assertRaises(DownloadError) as context:
+            self.download(path="/text_html")
+        assert context.exception.status_code == 413
+        assert ContentTypeHandler.bytes_written < 50_000_000
+
+    def test_missing_content_type(self):
+        with self.assertRaises(DownloadError) as context:
+            self.download(path="/missing")
+        assert context.exception.message == (
+            "Invalid content type for XHTML file. Got no content type"
+        )
+
+    def test_spooling(self):
+        policy = self.policy.copy(
+            update={"max_bytes": 100_000_000, "spool_threshold_bytes": 100_000}
+        )
+        with LocalServer(handler=ContentTypeHandler) as server:
+            download = Downloader(policy=policy).download(
+                url=f"{server.url}/text_html", timeout=2, conditional_headers=None
+            )
+        path = Path(download.spool_path)
+        assert download.content == b""
+        assert path.stat().st_size == download.size
+        path.unlink()
+
+    def test_charset(self):
+        assert get_charset("text/html; charset=ISO-8859-1") == "ISO-8859-1"
+        assert get_charset('text/html;charset="utf-8"') == "utf-8"
+        assert get_charset("text/html") is None
+
+
+class TestXhtmlDownload(TestCase):
+    def download(self, path: str) -> XhtmlHandler:
+        with LocalServer(handler=ContentTypeHandler) as server:
+            handler = XhtmlHandler(job=UrlJob(url=f"{server.url}{path}"))
+            handler.download_and_extract()
+        return handler
+
+    def test_charset_from_the_headers(self):
+        handler = self.download(path="/latin")
+        assert handler.error is False
+        assert handler.encoding == "latin-1"
+        assert "Héllo" in handler.text
+        assert handler.__total_number_of_links__ == 1
+
+    def test_missing_content_type(self):
+        handler = self.download(path="/missing")
+        assert handler.error is True
+        assert handler.error_details == (
+            "Invalid content type for XHTML file. Got no content type"
+        )
@@ -0,0 +1,80 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.api.handlers import BaseHandler
+from src.models.api.language_detection import (
+    LanguageDetectionBackend,
+    LanguageDetector,
+    get_sample,
+    language_detector,
+)
+from src.models.exceptions import LanguageDetectionError
+
+english = "This is a sentence in English about the references of the article. "
+german = "Dies ist ein deutscher Satz über die Quellen des Artikels. "
+
+
+class RecordingBackend(LanguageDetectionBackend):
+    texts: list = []
+
+    def load(self) -> None:
+        pass
+
+    def detect(self, text: str) -> str:
+        self.texts.append(text)
+        return "xx"
+
+
+class TestLanguageDetection(TestCase):
+    def test_short_text_is_not_sampled(self):
+        text = english * 10
+        assert get_sample(text=text) == text
+
+    def test_sample_is_spread_over_the_text(self):
+        text = german * 100 + english * 1000 + german * 100
+        sample = get_sample(text=text)
+        assert len(sample) <= (
+            config.language_detection_samples
+            * (config.language_detection_sample_characters + 1)
+        )
+        assert sample.startswith("Dies ist")
+        assert "English" in sample
+        assert sample.rstrip().endswith("Artikels.")
+
+    def test_detect(self):
+        assert language_detector.detect(text=english * 1000) == "en"
+        assert language_detector.detect(text=german * 10) == "de"
+
+    def test_detect_is_deterministic(self):
+        # A mixed text where an unseeded langdetect gives different answers
+        text = (english + german) * 5
+        results = {language_detector.detect(text=text) for _ in range(20)}
+        assert len(results) == 1
+
+    def test_short_text(self):
+        with self.assertRaises(LanguageDetectionError):
+            language_detector.detect(text=english[:50])
+
+    def test_configured_backend(self):
+        with patch.object(
+            config,
+            "language_detection_backend",
+            new="tests.api.test_language_detection.RecordingBackend",
+        ):
+            detector = LanguageDetector()
+            assert detector.detect(text=english * 1000) == "xx"
+        assert len(RecordingBackend.texts[-1]) < len(english) * 100
+
+    def test_handler(self):
+        handler = BaseHandler(text=english * 10)
+        handler.__detect_language__()
+        assert handler.detected_language == "en"
+        assert handler.detected_language_error is False
+        handler = BaseHandler(text=english[:50])
+        handler.__detect_language__()
+        assert handler.detected_language_error is True
+        assert (
+            handler.detected_language_error_details
+            == "Not enough text for us to reliably detect the language"
+        )
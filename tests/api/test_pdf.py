@@ -1,10 +1,23 @@
 import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 from flask import Flask
 from flask_restful import Api  # type: ignore
 
+import config
 from src import Pdf
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+
+class PdfFileHandler(QuietHandler):
+    def do_GET(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.end_headers()
+        self.wfile.write(Path("test_data/FFO-FLASH-REPORT-REV.pdf").read_bytes())
 
 
 class TestPdf(TestCase):
@@ -105,3 +118,47 @@ class TestPdf(TestCase):
         ]
         for key in debug_keys:
             assert key not in data
+
+
+class TestPdfDebugOutputs(TestCase):
+    """Offline tests of the debug renderings with a local server"""
+
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+
+        api.add_resource(Pdf, "/pdf")
+        app.testing = True
+        self.test_client = app.test_client()
+
+    def get(self, server, parameters):
+        response = self.test_client.get(
+            f"/pdf?url={server.url}/report.pdf&{parameters}"
+        )
+        self.assertEqual(200, response.status_code)
+        return json.loads(response.data)
+
+    def test_only_requested_outputs_are_returned(self):
+        with LocalServer(handler=PdfFileHandler) as server:
+            data = self.get(server, "testing=true&refresh=true&debug=true&xml=true")
+        assert data["debug_xml"]["0"].startswith("<page")
+        assert "debug_text_original" in data
+        for key in ["debug_html", "debug_json", "debug_blocks"]:
+            assert key not in data
+
+    def test_cached_debug_outputs(self):
+        with TemporaryDirectory() as directory, patch.multiple(
+            config,
+            subdirectory_for_json=f"{directory}/",
+            pdf_cache_debug_outputs=True,
+        ), LocalServer(handler=PdfFileHandler) as server:
+            Path(directory, "pdfs", "debug").mkdir(parents=True)
+            fresh = self.get(server, "refresh=true&debug=true&blocks=true")
+            assert len(list(Path(directory, "pdfs", "debug").iterdir())) == 1
+            cached = self.get(server, "debug=true&blocks=true&html=true")
+            without_debug = self.get(server, "")
+        assert cached["served_from_cache"] is True
+        assert cached["debug_blocks"] == fresh["debug_blocks"]
+        # It was not rendered before
+        assert "debug_html" not in cached
+        assert "debug_blocks" not in without_debug
@@ -0,0 +1,133 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from time import sleep
+from unittest import TestCase
+from unittest.mock import patch
+
+import mwparserfromhell  # type: ignore
+import requests
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+import config
+from src.models.api.profiler import RequestProfiler
+from src.models.api.schema.check_url_schema import UrlSchema
+from src.views.statistics import StatisticsView
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+
+class ParsingView(StatisticsView):
+    """Minimal view that does not need network access"""
+
+    schema = UrlSchema()
+
+    def get(self):
+        self.__validate_and_get_job__()
+        wikicode = mwparserfromhell.parse("{{cite web|url=https://example.com}}" * 50)
+        return {"templates": len(wikicode.filter_templates())}, 200
+
+
+class SlowHandler(QuietHandler):
+    def do_GET(self):  # noqa: N802
+        sleep(0.5)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(b"<p>slow</p>")
+
+
+# This is not a real secret, it is only used in these tests
+admin_value = "test-admin-value"
+
+
+class TestRequestProfiler(TestCase):
+    def test_is_allowed_disabled(self):
+        with patch.object(config, "profiling_enabled", new=False), patch.object(
+            config, "profiling_admin_token", ""
+        ):
+            assert RequestProfiler.is_allowed() is False
+            assert RequestProfiler.is_allowed(admin_token=admin_value) is False
+
+    def test_is_allowed_enabled(self):
+        with patch.object(config, "profiling_enabled", new=True):
+            assert RequestProfiler.is_allowed() is True
+
+    def test_is_allowed_admin_token(self):
+        with patch.object(config, "profiling_enabled", new=False), patch.object(
+            config, "profiling_admin_token", admin_value
+        ):
+            assert RequestProfiler.is_allowed(admin_token=admin_value) is True
+            assert RequestProfiler.is_allowed(admin_token=admin_value[::-1]) is False
+
+    def test_run_and_summary(self):
+        profiler = RequestProfiler(name="test")
+        result = profiler.run(mwparserfromhell.parse, "{{test}}" * 100)
+        assert len(result.filter_templates()) == 100
+        summary = profiler.get_summary()
+        assert "mwparserfromhell" in summary["by_package"]
+        assert summary["top_functions"]
+
+    def test_network_time(self):
+        profiler = RequestProfiler(name="test")
+        with LocalServer(handler=SlowHandler) as server:
+            response = profiler.run(requests.get, f"{server.url}/page", timeout=5)
+        assert response.status_code == 200
+        summary = profiler.get_summary()
+        # The wait is in builtins like socket.recv_into which have no file
+        assert summary["by_package"]["network"] >= 0.4
+        assert summary["by_package"].get("other", 0.0) < 0.1
+
+    def test_write_to_disk(self):
+        profiler = RequestProfiler(name="test")
+        profiler.run(sum, [1, 2, 3])
+        with TemporaryDirectory() as directory, patch.object(
+            config, "subdirectory_for_json", f"{directory}/"
+        ):
+            path = profiler.write_to_disk()
+            assert path == f"{directory}/profiles/test.pstats"
+            assert os.path.exists(path)
+
+
+class TestProfilingView(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+
+        api.add_resource(ParsingView, "/parse")
+        app.testing = True
+        self.test_client = app.test_client()
+
+    def test_profile_not_allowed(self):
+        with patch.object(config, "profiling_enabled", new=False), patch.object(
+            config, "profiling_admin_token", ""
+        ):
+            response = self.test_client.get(
+                "/parse?url=https://example.com&profile=true"
+            )
+        self.assertEqual(403, response.status_code)
+
+    def test_profile_with_admin_token(self):
+        with TemporaryDirectory() as directory, patch.object(
+            config, "subdirectory_for_json", f"{directory}/"
+        ), patch.object(config, "profiling_enabled", new=False), patch.object(
+            config, "profiling_admin_token", admin_value
+        ):
+            response = self.test_client.get(
+                "/parse?url=https://example.com&profile=true",
+                headers={"X-Admin-Token": admin_value},
+            )
+            self.assertEqual(200, response.status_code)
+            artifact = response.headers["X-Profile-Artifact"]
+            assert artifact.startswith(f"{directory}/profiles/parse-")
+            assert os.path.exists(artifact)
+        data = json.loads(response.data)
+        assert data["templates"] == 50
+        assert "mwparserfromhell" in data["profile"]["by_package"]
+        assert "Server-Timing" in response.headers
+
+    def test_no_profile(self):
+        response = self.test_client.get("/parse?url=https://example.com")
+        self.assertEqual(200, response.status_code)
+        assert "profile" not in json.loads(response.data)
+        assert "X-Profile-Artifact" not in response.headers
@@ -0,0 +1,150 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+import config
+from src import CheckUrl, Pdf, Xhtml
+from src.models.api.handlers import pdf_pages
+from src.models.api.revalidation import get_conditional_headers, get_validators
+from src.models.identifiers_checking.testdeadlink import testdeadlink_client
+from tests.stubs.local_server import LocalServer, QuietHandler
+from tests.stubs.testdeadlink_api import TestdeadlinkApiHandler
+
+pdf = Path("test_data/FFO-FLASH-REPORT-REV.pdf").read_bytes()
+html = b'<html><body><p>A page about <a href="https://example.com">it</a></p></body></html>'
+last_modified = "Mon, 02 Oct 2023 10:00:00 GMT"
+
+
+class ConditionalHandler(QuietHandler):
+    """Answers 304 if the patron has the current ETag of the document
+
+    The conditional headers of the requests are recorded on the class"""
+
+    etag = '"v1"'
+    requests: list = []
+
+    def do_GET(self):  # noqa: N802
+        self.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        if self.path.endswith(".pdf"):
+            content_type, body = "application/pdf", pdf
+        else:
+            content_type, body = "text/html", html
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestRevalidation(TestCase):
+    def test_conditional_headers(self):
+        validators = get_validators(
+            headers={"etag": '"v1"', "Last-Modified": last_modified, "Server": "x"}
+        )
+        assert validators == {"etag": '"v1"', "last-modified": last_modified}
+        assert get_conditional_headers(validators=validators) == {
+            "if-none-match": '"v1"',
+            "if-modified-since": last_modified,
+        }
+        assert get_conditional_headers(validators={"Server": "x"}) == {}
+        with patch.object(config, "conditional_refresh_enabled", new=False):
+            assert get_conditional_headers(validators=validators) == {}
+
+
+class TestRefreshViews(TestCase):
+    """A refresh reuses the cached result if the document did not change"""
+
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_resource(CheckUrl, "/check-url")
+        api.add_resource(Pdf, "/pdf")
+        api.add_resource(Xhtml, "/xhtml")
+        app.testing = True
+        self.test_client = app.test_client()
+        self.directory = TemporaryDirectory()
+        for subfolder in ["pdfs", "xhtmls", "urls"]:
+            Path(self.directory.name, subfolder).mkdir()
+        self.patcher = patch.object(
+            config, "subdirectory_for_json", new=f"{self.directory.name}/"
+        )
+        self.patcher.start()
+        ConditionalHandler.etag = '"v1"'
+        ConditionalHandler.requests = []
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.directory.cleanup()
+
+    def get(self, endpoint, url, parameters="refresh=true"):
+        with LocalServer(handler=TestdeadlinkApiHandler) as api, patch.object(
+            testdeadlink_client, "api_url", new=api.url
+        ):
+            response = self.test_client.get(f"/{endpoint}?url={url}&{parameters}")
+        self.assertEqual(200, response.status_code)
+        return json.loads(response.data)
+
+    def test_pdf(self):
+        with LocalServer(handler=ConditionalHandler) as server, patch(
+            "src.models.api.handlers.pdf.extract_all_pages",
+            wraps=pdf_pages.extract_all_pages,
+        ) as extract:
+            url = f"{server.url}/report.pdf"
+            fresh = self.get("pdf", url)
+            revalidated = self.get("pdf", url)
+            cached = self.get("pdf", url, parameters="")
+        assert ConditionalHandler.requests == [None, '"v1"']
+        assert extract.call_count == 1
+        assert fresh["not_modified"] is False
+        assert fresh["validators"]["etag"] == '"v1"'
+        assert revalidated["not_modified"] is True
+        assert revalidated["refreshed_now"] is True
+        assert revalidated["annotation_links"] == fresh["annotation_links"]
+        assert revalidated["timestamp"] >= fresh["timestamp"]
+        assert cached["isodate"] == revalidated["isodate"]
+
+    def test_changed_document_is_downloaded(self):
+        with LocalServer(handler=ConditionalHandler) as server:
+            url = f"{server.url}/page.html"
+            self.get("xhtml", url)
+            ConditionalHandler.etag = '"v2"'
+            changed = self.get("xhtml", url)
+            revalidated = self.get("xhtml", url)
+        assert ConditionalHandler.requests == [None, '"v1"', '"v2"']
+        assert changed["not_modified"] is False
+        assert changed["validators"]["etag"] == '"v2"'
+        assert revalidated["not_modified"] is True
+        assert revalidated["links_total"] == 1
+
+    def test_check_url(self):
+        with LocalServer(handler=ConditionalHandler) as server:
+            url = f"{server.url}/page.html"
+            fresh = self.get("check-url", url)
+            revalidated = self.get("check-url", url)
+        # The first request only has the spoofed validators
+        assert ConditionalHandler.requests[1] == '"v1"'
+        assert fresh["status_code"] == 200
+        assert revalidated["not_modified"] is True
+        assert revalidated["status_code"] == 200
+        assert revalidated["id"] == fresh["id"]
+
+    def test_debug_downloads_the_document(self):
+        with LocalServer(handler=ConditionalHandler) as server:
+            url = f"{server.url}/report.pdf"
+            self.get("pdf", url)
+            debug = self.get("pdf", url, parameters="refresh=true&debug=true")
+        assert ConditionalHandler.requests == [None, None]
+        assert debug["not_modified"] is False
+        assert "debug_text_original" in debug
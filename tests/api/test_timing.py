@@ -0,0 +1,86 @@
+from time import sleep
+from unittest import TestCase
+
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+from src.models.api.enums import TimingStage
+from src.models.api.schema.check_url_schema import UrlSchema
+from src.models.api.timing import StageTimer
+from src.views.statistics import StatisticsView
+
+
+class TimedView(StatisticsView):
+    """Minimal view that does not need network access"""
+
+    schema = UrlSchema()
+
+    def get(self):
+        self.__validate_and_get_job__()
+        with self.job.timer.measure(stage=TimingStage.CACHE_READ):
+            pass
+        return "No json in cache", 404
+
+
+class TestStageTimer(TestCase):
+    def test_measure(self):
+        timer = StageTimer()
+        with timer.measure(stage=TimingStage.FETCH):
+            sleep(0.01)
+        assert timer.stages["fetch"] >= 10
+        data = timer.get_dict()
+        assert data["total"] == data["fetch"]
+
+    def test_measure_nested_stages_do_not_overlap(self):
+        timer = StageTimer()
+        with timer.measure(stage=TimingStage.CACHE_READ), timer.measure(
+            stage=TimingStage.FETCH
+        ):
+            sleep(0.02)
+        assert timer.stages["fetch"] >= 20
+        assert timer.stages["cache_read"] < 20
+
+    def test_get_dict_order(self):
+        timer = StageTimer()
+        timer.add(stage=TimingStage.WRITE, seconds=0.001)
+        timer.add(stage=TimingStage.FETCH, seconds=0.002)
+        assert list(timer.get_dict()) == ["fetch", "write", "total"]
+        assert timer.get_dict()["total"] == 3.0
+
+    def test_get_server_timing_header(self):
+        timer = StageTimer()
+        timer.add(stage=TimingStage.FETCH, seconds=0.1)
+        timer.add(stage=TimingStage.PARSE, seconds=0.0025)
+        assert (
+            timer.get_server_timing_header(total_seconds=0.2)
+            == "fetch;dur=100.0, parse;dur=2.5, total;dur=200.0"
+        )
+
+    def test_jobs_do_not_share_timers(self):
+        from src.models.api.job import Job
+
+        job1 = Job()
+        job1.timer.add(stage=TimingStage.FETCH, seconds=1)
+        assert Job().timer.stages == {}
+
+
+class TestServerTimingHeader(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+
+        api.add_resource(TimedView, "/timed")
+        app.testing = True
+        self.test_client = app.test_client()
+
+    def test_server_timing_header_on_cache_miss(self):
+        response = self.test_client.get("/timed?url=https://example.com")
+        self.assertEqual(404, response.status_code)
+        header = response.headers["Server-Timing"]
+        assert header.startswith("cache_read;dur=")
+        assert "total;dur=" in header
+
+    def test_no_server_timing_header_on_invalid_input(self):
+        response = self.test_client.get("/timed?url=https://example.com&timeout=a")
+        self.assertEqual(400, response.status_code)
+        assert "Server-Timing" not in response.headers
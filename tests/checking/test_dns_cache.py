@@ -0,0 +1,152 @@
+from time import monotonic, perf_counter
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.api.deadline import Deadline
+from src.models.identifiers_checking import dns_cache as dns_cache_module
+from src.models.identifiers_checking.dns_cache import DnsCache, dns_cache
+from src.models.identifiers_checking.enums import RequestErrorClass
+from src.models.identifiers_checking.url import Url
+from tests.stubs.fake_dns import FakeDnsServer
+
+records = {
+    "doi.org": ("192.0.2.1", 300),
+    "archive.org": ("192.0.2.2", 60),
+}
+
+
+class TestDnsCache(TestCase):
+    def test_answers_are_cached(self):
+        with FakeDnsServer(records=records) as server:
+            cache = DnsCache(resolver=server.resolver)
+            for _ in range(3):
+                answer = cache.resolve(name="doi.org")
+                assert answer.found is True
+            # Names are case-insensitive
+            assert cache.resolve(name="DOI.org.").found is True
+        assert server.queries["doi.org"] == 1
+
+    def test_ttl_is_honoured(self):
+        with FakeDnsServer(records=records) as server:
+            cache = DnsCache(resolver=server.resolver)
+            with patch.object(dns_cache_module, "monotonic", return_value=1000.0):
+                cache.resolve(name="archive.org")
+            with patch.object(dns_cache_module, "monotonic", return_value=1059.0):
+                cache.resolve(name="archive.org")
+            assert server.queries["archive.org"] == 1
+            with patch.object(dns_cache_module, "monotonic", return_value=1060.0):
+                assert cache.get(name="archive.org") is None
+                cache.resolve(name="archive.org")
+            assert server.queries["archive.org"] == 2
+
+    def test_ttl_is_capped(self):
+        with FakeDnsServer(records=records) as server, patch.object(
+            config, "dns_cache_max_ttl_seconds", new=10
+        ), patch.object(dns_cache_module, "monotonic", return_value=1000.0):
+            cache = DnsCache(resolver=server.resolver)
+            assert cache.resolve(name="doi.org").expires == 1010.0
+
+    def test_nxdomain_is_cached_with_the_negative_ttl(self):
+        with FakeDnsServer(records=records, negative_ttl=30) as server:
+            cache = DnsCache(resolver=server.resolver)
+            with patch.object(dns_cache_module, "monotonic", return_value=1000.0):
+                answer = cache.resolve(name="defunct.example.com")
+                cache.resolve(name="defunct.example.com")
+            assert answer.nxdomain is True
+            assert answer.found is False
+            assert answer.expires == 1030.0
+        assert server.queries["defunct.example.com"] == 1
+
+    def test_errors_are_not_cached(self):
+        with FakeDnsServer(records=records, delay=0.5) as server:
+            resolver = server.resolver
+            resolver.lifetime = 0.2
+            cache = DnsCache(resolver=resolver)
+            answer = cache.resolve(name="doi.org")
+            assert answer.error is True
+            assert cache.get(name="doi.org") is None
+
+    def test_resolve_many_concurrently(self):
+        names = [f"host{number}.example.com" for number in range(20)]
+        many_records = {name: ("192.0.2.3", 60) for name in names}
+        with FakeDnsServer(records=many_records, delay=0.2) as server:
+            cache = DnsCache(resolver=server.resolver)
+            start = perf_counter()
+            answers = cache.resolve_many(names=names + names)
+            elapsed = perf_counter() - start
+        assert len(answers) == 20
+        assert all(answer.found for answer in answers.values())
+        assert all(server.queries[name] == 1 for name in names)
+        # 20 lookups of 0.2 seconds each done sequentially would take 4 seconds
+        assert elapsed < 2
+
+    def test_resolve_hosts(self):
+        with FakeDnsServer(records=records) as server:
+            cache = DnsCache(resolver=server.resolver)
+            answers = cache.resolve_hosts(
+                urls=[
+                    "https://doi.org/10.1234/a",
+                    "https://DOI.org/10.1234/b",
+                    "http://127.0.0.1:8000/page",
+                    "http://localhost/page",
+                    "not a url",
+                ]
+            )
+        assert list(answers) == ["doi.org"]
+        assert list(server.queries) == ["doi.org"]
+
+    def test_ipv6_only_host_is_found(self):
+        ipv6_records = {
+            "ipv6.example.com": ("2001:db8::1", 60),
+            "empty.example.com": ("", 60),
+        }
+        with FakeDnsServer(records=ipv6_records) as server:
+            cache = DnsCache(resolver=server.resolver)
+            assert cache.resolve(name="ipv6.example.com").found is True
+            answer = cache.resolve(name="empty.example.com")
+            assert answer.found is False
+            assert answer.no_answer is True
+
+    def test_resolve_many_stops_at_the_deadline(self):
+        with FakeDnsServer(records=records) as server:
+            cache = DnsCache(resolver=server.resolver)
+            deadline = Deadline(seconds=1, start=monotonic() - 2)
+            assert cache.resolve_many(names=["doi.org"], deadline=deadline) == {}
+        assert server.queries["doi.org"] == 0
+
+
+class TestUrlWithDnsCache(TestCase):
+    def setUp(self) -> None:
+        dns_cache.clear()
+
+    def tearDown(self) -> None:
+        dns_cache.clear()
+
+    def test_nonexistent_name_is_not_fetched_again(self):
+        with FakeDnsServer(records=records) as server, patch.object(
+            dns_cache, "resolver", new=server.resolver
+        ):
+            url = Url(url="https://defunct.example.com/page1")
+            url.extract()
+            url.__get_dns_record__()
+            assert url.dns_record_found is False
+            with patch.object(Url, "__fetch__", autospec=True) as fetch:
+                other_url = Url(url="https://defunct.example.com/page2")
+                other_url.extract()
+                other_url.__check_url__()
+            assert fetch.call_count == 0
+            assert other_url.request_error_class == RequestErrorClass.DNS
+            assert other_url.dns_record_found is False
+        assert server.queries["defunct.example.com"] == 1
+
+    def test_name_without_addresses_is_still_fetched(self):
+        with FakeDnsServer(
+            records={"empty.example.com": ("", 60)}
+        ) as server, patch.object(dns_cache, "resolver", new=server.resolver):
+            dns_cache.resolve(name="empty.example.com")
+            with patch.object(Url, "__fetch__", autospec=True) as fetch:
+                url = Url(url="https://empty.example.com/page")
+                url.extract()
+                url.__check_url__()
+            assert fetch.call_count == 1
@@ -52,7 +52,7 @@ class TestDoi(TestCase):
         doi = Doi(doi=self.retracted_in_wd_but_not_oa)
         doi.__lookup_via_cirrussearch__()
         assert doi.found_in_wikidata is True
-        doi.__get_wikidata_entity__()
+        doi.__get_wikidata_instance_of__()
         doi.__determine_if_retracted_in_wikidata__()
         print(doi.wikidata_entity_uri)
         assert doi.marked_as_retracted_in_wikidata is True
@@ -0,0 +1,81 @@
+from collections import Counter
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.identifiers_checking.doi_batch import DoiBatch
+from tests.stubs.doi_sources import (
+    DoiSourcesHandler,
+    local_doi_sources,
+    scholarly_article,
+)
+
+
+class TestDoiBatch(TestCase):
+    """Offline tests of the batch lookup, see tests/stubs/doi_sources.py"""
+
+    dois = ["10.1234/RETRACTED", "10.1234/retracted ", "10.1234/plain", "10.1234/x"]
+
+    def test_lookup(self):
+        with local_doi_sources():
+            batch = DoiBatch(dois=self.dois)
+            batch.lookup()
+        assert list(batch.dois) == ["10.1234/retracted", "10.1234/plain", "10.1234/x"]
+        retracted = batch.dois["10.1234/retracted"]
+        assert retracted.marked_as_retracted_in_openalex is True
+        assert retracted.marked_as_retracted_in_wikidata is True
+        assert retracted.wikidata_entity_qid == "Q1"
+        assert retracted.fatcat["id"] == "fatcatQ1"
+        plain = batch.dois["10.1234/plain"]
+        assert plain.found_in_openalex is True
+        assert plain.marked_as_retracted_in_wikidata is False
+        assert plain.wikidata == {
+            "id": "Q2",
+            "instance_of": [scholarly_article],
+            "retracted": False,
+        }
+        unknown = batch.dois["10.1234/x"]
+        assert unknown.found_in_openalex is False
+        assert unknown.found_in_wikidata is False
+        assert all(doi.partial is False for doi in batch.dois.values())
+        # One request to OpenAlex and a search and an entity request to Wikidata
+        # for all the DOIs but one request per DOI to the sources without a batch API
+        assert Counter(DoiSourcesHandler.requests) == {
+            "openalex": 1,
+            "wikidata": 2,
+            "internet_archive_scholar": 3,
+            "fatcat": 3,
+        }
+
+    def test_chunks(self):
+        with local_doi_sources(), patch.multiple(
+            config, doi_batch_openalex_chunk_size=2, wikidata_search_max_query_length=50
+        ):
+            batch = DoiBatch(dois=self.dois)
+            batch.lookup()
+        assert batch.dois["10.1234/plain"].found_in_openalex is True
+        assert batch.dois["10.1234/plain"].found_in_wikidata is True
+        assert batch.dois["10.1234/retracted"].found_in_wikidata is True
+        requests = Counter(DoiSourcesHandler.requests)
+        assert requests["openalex"] == 2
+        # Two searches and two entity requests
+        assert requests["wikidata"] == 4
+
+    def test_get_search_chunks(self):
+        dois = [f"10.1234/{number:05}" for number in range(30)]
+        chunks = DoiBatch.__get_search_chunks__(dois=dois)
+        assert [doi for chunk in chunks for doi in chunk] == dois
+        for chunk in chunks:
+            query = f"haswbstatement:{'|'.join(f'P356={doi}' for doi in chunk)}"
+            assert len(query) <= config.wikidata_search_max_query_length
+
+    def test_slow_source_gives_partial_results(self):
+        with local_doi_sources(), patch.object(config, "doi_lookup_max_seconds", new=1):
+            DoiSourcesHandler.delays = {"wikidata": 3}
+            batch = DoiBatch(dois=self.dois, timeout=5)
+            batch.lookup()
+        for doi in batch.dois.values():
+            assert doi.partial is True
+            assert doi.sources["wikidata"] == "timeout"
+            assert doi.sources["openalex"] == "ok"
+        assert batch.dois["10.1234/plain"].found_in_openalex is True
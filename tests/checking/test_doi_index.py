@@ -0,0 +1,147 @@
+import gzip
+import json
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.models.identifiers_checking.doi import Doi
+from src.models.identifiers_checking.doi_batch import DoiBatch
+from src.models.identifiers_checking.doi_index import DoiIndex, doi_index
+from tests.stubs.doi_sources import DoiSourcesHandler, local_doi_sources
+
+
+def write_works(path: Path, works) -> None:
+    with gzip.open(path, mode="wt") as file:
+        for work in works:
+            file.write(json.dumps(work) + "\n")
+
+
+def get_work(doi: str, number: int, retracted: bool = False, updated="2023-01-01"):
+    return {
+        "id": f"https://openalex.org/W{number}",
+        "doi": f"https://doi.org/{doi}" if doi else None,
+        "is_retracted": retracted,
+        "updated_date": updated,
+        "title": "This is not stored",
+    }
+
+
+class TestDoiIndex(TestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.snapshot = Path(self.directory.name, "works", "updated_date=2023-01-01")
+        self.snapshot.mkdir(parents=True)
+        write_works(
+            path=self.snapshot / "part_000.gz",
+            works=[
+                get_work(doi="10.1234/PLAIN", number=1),
+                get_work(doi="10.1234/retracted", number=2, retracted=True),
+                get_work(doi="", number=3),
+            ],
+        )
+        self.index = DoiIndex(path=f"{self.directory.name}/index.sqlite")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_ingest_openalex_snapshot(self):
+        assert self.index.get(doi="10.1234/plain") is None
+        count = self.index.ingest(path=f"{self.directory.name}/works")
+        assert count == 2
+        assert self.index.get(doi="10.1234/Plain ") == {
+            "doi": "10.1234/plain",
+            "openalex_id": "https://openalex.org/W1",
+            "retracted_in_openalex": False,
+            "retracted_in_retraction_list": False,
+            "updated": "2023-01-01",
+        }
+        assert self.index.get(doi="10.1234/retracted")["retracted_in_openalex"]
+        assert self.index.get(doi="10.1234/unknown") is None
+
+    def test_ingest_is_incremental(self):
+        self.index.ingest(path=f"{self.directory.name}/works")
+        # Nothing changed
+        assert self.index.ingest(path=f"{self.directory.name}/works") == 0
+        newer = self.snapshot.parent / "updated_date=2023-02-01"
+        newer.mkdir()
+        write_works(
+            path=newer / "part_000.gz",
+            works=[get_work("10.1234/plain", 1, retracted=True, updated="2023-02-01")],
+        )
+        assert self.index.ingest(path=f"{self.directory.name}/works") == 1
+        assert self.index.get(doi="10.1234/plain")["retracted_in_openalex"] is True
+        # An older record does not replace a newer one
+        older = self.snapshot.parent / "updated_date=2022-01-01"
+        older.mkdir()
+        write_works(
+            path=older / "part_000.gz",
+            works=[get_work("10.1234/plain", 1, updated="2022-01-01")],
+        )
+        self.index.ingest(path=f"{self.directory.name}/works")
+        assert self.index.get(doi="10.1234/plain")["retracted_in_openalex"] is True
+        # A changed file is ingested again
+        part = self.snapshot / "part_000.gz"
+        os.utime(part, (0, part.stat().st_mtime + 10))
+        assert self.index.ingest(path=str(part)) == 2
+
+    def test_ingest_retraction_list(self):
+        self.index.ingest(path=f"{self.directory.name}/works")
+        path = Path(self.directory.name, "retraction_watch.csv")
+        path.write_text(
+            "Record ID,OriginalPaperDOI\n1,10.1234/PLAIN\n2,unavailable\n3,10.1234/other\n"
+        )
+        assert self.index.ingest(path=str(path)) == 2
+        plain = self.index.get(doi="10.1234/plain")
+        # The OpenAlex part is kept
+        assert plain["openalex_id"] == "https://openalex.org/W1"
+        assert plain["retracted_in_openalex"] is False
+        assert plain["retracted_in_retraction_list"] is True
+        other = self.index.get(doi="10.1234/other")
+        assert other["retracted_in_retraction_list"] is True
+        assert other["openalex_id"] is None
+
+    def test_lookup_is_fast(self):
+        dois = [f"10.1234/{number}" for number in range(10_000)]
+        write_works(
+            path=self.snapshot / "part_001.gz",
+            works=[get_work(doi, number) for number, doi in enumerate(dois)],
+        )
+        self.index.ingest(path=f"{self.directory.name}/works")
+        start = perf_counter()
+        for doi in dois[:1000]:
+            assert self.index.get(doi=doi)
+        # Typically around 10 microseconds per lookup
+        assert (perf_counter() - start) / 1000 < 0.001
+
+
+class TestDoiWithIndex(TestCase):
+    def test_known_dois_are_answered_from_the_index(self):
+        with TemporaryDirectory() as directory, local_doi_sources():
+            works = Path(directory, "part_000.gz")
+            write_works(
+                path=works, works=[get_work("10.1234/retracted", 2, retracted=True)]
+            )
+            index_path = f"{directory}/index.sqlite"
+            DoiIndex(path=index_path).ingest(path=str(works))
+            with patch.object(doi_index, "path", new=index_path):
+                doi = Doi(doi="10.1234/RETRACTED")
+                doi.lookup_doi()
+                assert DoiSourcesHandler.requests == []
+                assert doi.found_in_index is True
+                assert doi.marked_as_retracted_in_openalex is True
+                assert doi.sources == {"index": "ok"}
+                assert doi.get_doi_dictionary()["partial"] is False
+                # Misses are looked up in the sources
+                doi = Doi(doi="10.1234/plain")
+                doi.lookup_doi()
+                assert doi.found_in_index is False
+                assert doi.sources["openalex"] == "ok"
+                DoiSourcesHandler.reset()
+                batch = DoiBatch(dois=["10.1234/retracted", "10.1234/plain"])
+                batch.lookup()
+            assert batch.dois["10.1234/retracted"].found_in_index is True
+            assert batch.dois["10.1234/plain"].found_in_wikidata is True
+            assert DoiSourcesHandler.requests.count("fatcat") == 1
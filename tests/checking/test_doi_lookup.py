@@ -0,0 +1,103 @@
+from time import perf_counter
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.identifiers_checking.doi import Doi
+from tests.stubs.doi_sources import (
+    DoiSourcesHandler,
+    local_doi_sources,
+    retracted_item,
+    scholarly_article,
+)
+
+all_sources_ok = {
+    "openalex": "ok",
+    "wikidata": "ok",
+    "internet_archive_scholar": "ok",
+    "fatcat": "ok",
+}
+
+
+class TestDoiLookup(TestCase):
+    """Offline tests of the lookup in all sources, see tests/stubs/doi_sources.py"""
+
+    def test_lookup_retracted(self):
+        with local_doi_sources():
+            doi = Doi(doi="10.1234/RETRACTED")
+            doi.lookup_doi()
+        assert doi.sources == all_sources_ok
+        assert doi.partial is False
+        assert doi.found_in_openalex is True
+        assert doi.marked_as_retracted_in_openalex is True
+        assert doi.found_in_wikidata is True
+        assert doi.wikidata_entity_qid == "Q1"
+        assert doi.marked_as_retracted_in_wikidata is True
+        # Only what we need is stored
+        assert doi.wikidata == {
+            "id": "Q1",
+            "instance_of": [scholarly_article, retracted_item],
+            "retracted": True,
+        }
+        assert doi.fatcat["id"] == "fatcatQ1"
+        assert doi.internet_archive_scholar["count_returned"] == 1
+
+    def test_lookup_unknown(self):
+        with local_doi_sources():
+            doi = Doi(doi="10.1234/unknown")
+            doi.lookup_doi()
+        assert doi.sources == all_sources_ok
+        assert doi.found_in_openalex is False
+        assert doi.found_in_wikidata is False
+        assert doi.fatcat == {}
+        assert doi.get_doi_dictionary()["partial"] is False
+
+    def test_sources_are_looked_up_concurrently(self):
+        with local_doi_sources():
+            DoiSourcesHandler.delays = {
+                "openalex": 0.5,
+                "wikidata": 0.5,
+                "internet_archive_scholar": 0.5,
+                "fatcat": 0.5,
+            }
+            doi = Doi(doi="10.1234/plain")
+            start = perf_counter()
+            doi.lookup_doi()
+            elapsed = perf_counter() - start
+        assert doi.sources == all_sources_ok
+        # The wikidata source makes two requests one after another
+        assert elapsed < 1.5
+
+    def test_slow_source_gives_partial_result(self):
+        with local_doi_sources(), patch.object(config, "doi_lookup_max_seconds", new=1):
+            DoiSourcesHandler.delays = {"fatcat": 3}
+            doi = Doi(doi="10.1234/plain", timeout=5)
+            start = perf_counter()
+            doi.lookup_doi()
+            elapsed = perf_counter() - start
+        assert elapsed < 2
+        assert doi.sources["fatcat"] == "timeout"
+        assert doi.sources["openalex"] == "ok"
+        assert doi.partial is True
+        assert doi.fatcat == {}
+        assert doi.found_in_openalex is True
+
+    def test_timeout_applies_to_every_request(self):
+        with local_doi_sources():
+            DoiSourcesHandler.delays = {"openalex": 3}
+            doi = Doi(doi="10.1234/plain", timeout=1)
+            start = perf_counter()
+            doi.lookup_doi()
+            elapsed = perf_counter() - start
+        assert elapsed < 2
+        assert doi.sources["openalex"] == "timeout"
+        assert doi.found_in_wikidata is True
+
+    def test_failing_source(self):
+        with local_doi_sources():
+            DoiSourcesHandler.failures = {"openalex": 500}
+            doi = Doi(doi="10.1234/plain")
+            doi.lookup_doi()
+        assert doi.sources["openalex"] == "error"
+        assert doi.sources["fatcat"] == "ok"
+        assert doi.partial is True
@@ -0,0 +1,176 @@
+from time import monotonic
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.api.deadline import Deadline
+from src.models.identifiers_checking import host_health
+from src.models.identifiers_checking.enums import RequestErrorClass
+from src.models.identifiers_checking.host_health import (
+    HostHealthTracker,
+    host_health_tracker,
+)
+from src.models.identifiers_checking.url import Url
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+
+def expired() -> Deadline:
+    return Deadline(seconds=1, start=monotonic() - 2)
+
+
+class TestHostHealthTracker(TestCase):
+    host = "defunct.example.com"
+
+    def setUp(self) -> None:
+        self.tracker = HostHealthTracker()
+
+    def __fail__(self, times: int, error_class=RequestErrorClass.CONNECT_TIMEOUT):
+        for _ in range(times):
+            self.tracker.record_failure(
+                host=self.host, error_class=error_class, details="timed out"
+            )
+
+    def test_host_is_down_after_threshold(self):
+        self.__fail__(times=config.host_health_failure_threshold - 1)
+        assert self.tracker.should_check(host=self.host) is True
+        self.__fail__(times=1)
+        assert self.tracker.should_check(host=self.host) is False
+        # The host is case-insensitive
+        assert self.tracker.should_check(host=self.host.upper()) is False
+
+    def test_nonexistent_name_is_down_immediately(self):
+        self.__fail__(times=1, error_class=RequestErrorClass.DNS)
+        assert self.tracker.should_check(host=self.host) is False
+
+    def test_success_resets_the_failures(self):
+        self.__fail__(times=config.host_health_failure_threshold - 1)
+        self.tracker.record_success(host=self.host)
+        self.__fail__(times=1)
+        assert self.tracker.should_check(host=self.host) is True
+
+    def test_certificate_error_does_not_count(self):
+        self.__fail__(times=5, error_class=RequestErrorClass.SSL_CERTIFICATE)
+        assert self.tracker.should_check(host=self.host) is True
+
+    def test_half_open_probe(self):
+        with patch.object(host_health, "monotonic", return_value=1000.0):
+            self.__fail__(times=1, error_class=RequestErrorClass.DNS)
+        later = 1000.0 + config.host_health_ttl_seconds
+        with patch.object(host_health, "monotonic", return_value=later):
+            # Only one check gets to probe the host
+            assert self.tracker.should_check(host=self.host) is True
+            assert self.tracker.should_check(host=self.host) is False
+            # The probe failed so it is down for another TTL
+            self.__fail__(times=1, error_class=RequestErrorClass.DNS)
+            assert self.tracker.should_check(host=self.host) is False
+        even_later = later + config.host_health_ttl_seconds
+        with patch.object(host_health, "monotonic", return_value=even_later):
+            assert self.tracker.should_check(host=self.host) is True
+            self.tracker.record_success(host=self.host)
+            assert self.tracker.should_check(host=self.host) is True
+            assert self.tracker.get_health(host=self.host) is None
+
+    def test_probe_without_verdict(self):
+        with patch.object(host_health, "monotonic", return_value=1000.0):
+            self.__fail__(times=1, error_class=RequestErrorClass.DNS)
+        later = 1000.0 + config.host_health_ttl_seconds
+        with patch.object(host_health, "monotonic", return_value=later):
+            assert self.tracker.should_check(host=self.host) is True
+            self.tracker.end_probe(host=self.host)
+            # The host is still down but the next check probes it
+            assert self.tracker.get_health(host=self.host).is_down is True
+            assert self.tracker.should_check(host=self.host) is True
+            assert self.tracker.should_check(host=self.host) is False
+
+    def test_old_failures_are_forgotten(self):
+        with patch.object(host_health, "monotonic", return_value=1000.0):
+            self.__fail__(times=config.host_health_failure_threshold - 1)
+        later = 1000.0 + config.host_health_ttl_seconds
+        with patch.object(host_health, "monotonic", return_value=later):
+            assert self.tracker.should_check(host=self.host) is True
+            assert self.tracker.hosts == {}
+            # The failures before do not count anymore
+            self.__fail__(times=1)
+            assert self.tracker.should_check(host=self.host) is True
+
+    def test_host_down_without_probe_is_forgotten(self):
+        with patch.object(host_health, "monotonic", return_value=1000.0):
+            self.__fail__(times=1, error_class=RequestErrorClass.DNS)
+        much_later = 1000.0 + 2 * config.host_health_ttl_seconds
+        with patch.object(host_health, "monotonic", return_value=much_later):
+            self.__fail__(times=1, error_class=RequestErrorClass.CONNECT_TIMEOUT)
+            health = self.tracker.get_health(host=self.host)
+            assert health.consecutive_failures == 1
+            assert health.is_down is False
+
+    def test_number_of_hosts_is_capped(self):
+        with patch.object(config, "host_health_max_hosts", new=3):
+            for number in range(5):
+                self.tracker.record_failure(
+                    host=f"host{number}.example.com",
+                    error_class=RequestErrorClass.CONNECT_TIMEOUT,
+                )
+            # A new failure makes host2 the most recent one
+            self.tracker.record_failure(
+                host="host2.example.com",
+                error_class=RequestErrorClass.CONNECT_TIMEOUT,
+            )
+            self.tracker.record_failure(
+                host="host5.example.com",
+                error_class=RequestErrorClass.CONNECT_TIMEOUT,
+            )
+        assert list(self.tracker.hosts) == [
+            "host4.example.com",
+            "host2.example.com",
+            "host5.example.com",
+        ]
+        assert self.tracker.hosts["host2.example.com"].consecutive_failures == 2
+
+    def test_disabled(self):
+        with patch.object(config, "host_health_enabled", new=False):
+            self.__fail__(times=1, error_class=RequestErrorClass.DNS)
+            assert self.tracker.should_check(host=self.host) is True
+
+
+class TestUrlWithHostHealth(TestCase):
+    def setUp(self) -> None:
+        host_health_tracker.clear()
+
+    def tearDown(self) -> None:
+        host_health_tracker.clear()
+
+    def test_results_are_inferred_for_a_host_that_is_down(self):
+        with LocalServer(handler=QuietHandler) as server:
+            closed_url = server.url
+        netloc = closed_url.replace("http://", "")
+        with patch.object(
+            Url, "__fetch__", autospec=True, side_effect=Url.__fetch__
+        ) as fetch:
+            urls = [
+                Url(url=f"{closed_url}/page{number}", netloc=netloc)
+                for number in range(10)
+            ]
+            for url in urls:
+                url.__check_url__()
+        assert fetch.call_count == config.host_health_failure_threshold
+        fetched = urls[: config.host_health_failure_threshold]
+        inferred = urls[config.host_health_failure_threshold :]
+        assert all(url.inferred is False for url in fetched)
+        assert all(url.inferred is True for url in inferred)
+        for url in inferred:
+            assert url.request_error is True
+            assert url.request_error_class == RequestErrorClass.CONNECTION_REFUSED
+            assert url.status_code == 0
+
+    def test_probe_is_released_when_the_time_runs_out(self):
+        host = "127.0.0.1:9"
+        with patch.object(host_health, "monotonic", return_value=1000.0):
+            host_health_tracker.record_failure(
+                host=host, error_class=RequestErrorClass.DNS
+            )
+        later = 1000.0 + config.host_health_ttl_seconds
+        with patch.object(host_health, "monotonic", return_value=later):
+            url = Url(url=f"http://{host}/page", netloc=host, deadline=expired())
+            url.__check_url__()
+            assert url.incomplete is True
+            assert host_health_tracker.should_check(host=host) is True
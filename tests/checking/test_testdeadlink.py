@@ -0,0 +1,63 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.identifiers_checking.testdeadlink import TestdeadlinkClient
+from src.models.identifiers_checking.url import Url
+from tests.stubs.local_server import LocalServer, QuietHandler
+from tests.stubs.testdeadlink_api import TestdeadlinkApiHandler
+
+
+class HtmlErrorPageHandler(QuietHandler):
+    """A proxy answering 200 with an HTML error page"""
+
+    def do_POST(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(b"<html><body>Service unavailable</body></html>")
+
+
+class TestTestdeadlinkClient(TestCase):
+    def setUp(self) -> None:
+        TestdeadlinkApiHandler.reset()
+
+    def test_urls_are_sent_in_chunks(self):
+        urls = [f"https://example.com/page{number}" for number in range(120)]
+        urls += ["https://example.com/dead&link?a=1", urls[0]]
+        with LocalServer(handler=TestdeadlinkApiHandler) as server, patch.object(
+            config, "testdeadlink_chunk_size", new=50
+        ), patch.object(config, "testdeadlink_max_concurrent_requests", new=2):
+            status_codes = TestdeadlinkClient(api_url=server.url).check_urls(urls=urls)
+        # 121 unique URLs
+        chunk_sizes = [len(chunk) for chunk in TestdeadlinkApiHandler.requests]
+        assert sorted(chunk_sizes) == [21, 50, 50]
+        assert TestdeadlinkApiHandler.max_in_flight == 2
+        assert len(status_codes) == 121
+        assert status_codes["https://example.com/page7"] == 200
+        # The URL survives the form encoding
+        assert status_codes["https://example.com/dead&link?a=1"] == 404
+
+    def test_results_are_set_on_the_urls(self):
+        urls = [
+            Url(url="https://example.com/alive"),
+            Url(url="https://example.com/dead"),
+            Url(url="https://example.com/dead"),
+        ]
+        with LocalServer(handler=TestdeadlinkApiHandler) as server:
+            TestdeadlinkClient(api_url=server.url).check(urls=urls)
+        assert len(TestdeadlinkApiHandler.requests) == 1
+        assert [url.testdeadlink_status_code for url in urls] == [200, 404, 404]
+
+    def test_unreachable_api(self):
+        with LocalServer(handler=TestdeadlinkApiHandler) as server:
+            api_url = server.url
+        url = Url(url="https://example.com/alive")
+        TestdeadlinkClient(api_url=api_url).check(urls=[url])
+        assert url.testdeadlink_status_code == 0
+
+    def test_invalid_response(self):
+        url = Url(url="https://example.com/alive")
+        with LocalServer(handler=HtmlErrorPageHandler) as server:
+            TestdeadlinkClient(api_url=server.url).check(urls=[url])
+        assert url.testdeadlink_status_code == 0
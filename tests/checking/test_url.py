@@ -1,6 +1,40 @@
+import ssl
+from time import sleep
 from unittest import TestCase
+from unittest.mock import patch
 
+from requests.exceptions import SSLError
+from urllib3.exceptions import MaxRetryError
+from urllib3.exceptions import SSLError as Urllib3SSLError
+
+import config
+from src.models.identifiers_checking.enums import RequestErrorClass
 from src.models.identifiers_checking.url import Url
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+
+class StreamingHandler(QuietHandler):
+    """Serves large bodies to test the size and time limits"""
+
+    def do_GET(self):  # noqa: N802
+        content_type = "video/mp4" if self.path == "/video" else "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        chunk = b"<p>" + b"This is a large page. " * 100 + b"</p>\n"
+        try:
+            for _ in range(2000):
+                self.wfile.write(chunk)
+                if self.path == "/slow":
+                    sleep(0.05)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading which is what we want
+            pass
+
+
+class HangingHandler(QuietHandler):
+    def do_GET(self):  # noqa: N802
+        sleep(3)
 
 
 class TestUrl(TestCase):
@@ -111,3 +145,93 @@ class TestUrl(TestCase):
         assert url.malformed_url is False
         data = url.get_dict
         assert data["detected_language"] == "en"
+
+    def test_check_caps_the_body(self):
+        with LocalServer(handler=StreamingHandler) as server, patch.object(
+            config, "url_check_max_bytes", new=10_000
+        ):
+            url = Url(url=f"{server.url}/large")
+            url.__check_with_https_verify__()
+        assert url.status_code == 200
+        assert url.request_error is False
+        assert url.body_truncated is True
+        assert url.body_bytes_read == 10_000
+        assert len(url.text) == 10_000
+
+    def test_check_skips_body_of_non_text(self):
+        with LocalServer(handler=StreamingHandler) as server:
+            url = Url(url=f"{server.url}/video")
+            url.__check_with_https_verify__()
+        assert url.status_code == 200
+        assert url.response_headers["Content-Type"] == "video/mp4"
+        assert url.body_bytes_read == 0
+        assert url.text == ""
+
+    def test_check_stops_reading_at_the_deadline(self):
+        with LocalServer(handler=StreamingHandler) as server, patch.object(
+            config, "url_check_max_seconds", new=0.5
+        ):
+            url = Url(url=f"{server.url}/slow")
+            url.__check_with_https_verify__()
+        assert url.status_code == 200
+        assert url.body_truncated is True
+        assert 0 < url.body_bytes_read < config.url_check_max_bytes
+
+    def test_check_refused_is_not_retried(self):
+        with LocalServer(handler=StreamingHandler) as server:
+            closed_url = server.url
+        with patch.object(
+            Url, "__fetch__", autospec=True, side_effect=Url.__fetch__
+        ) as fetch:
+            url = Url(url=f"{closed_url}/page")
+            url.__check_url__()
+        assert fetch.call_count == 1
+        assert url.request_error is True
+        assert url.request_error_class == RequestErrorClass.CONNECTION_REFUSED
+        assert url.dns_record_found is True
+        assert url.get_dict["request_error_class"] == "connection refused"
+
+    def test_check_timeout_is_not_retried(self):
+        with LocalServer(handler=HangingHandler) as server, patch.object(
+            Url, "__fetch__", autospec=True, side_effect=Url.__fetch__
+        ) as fetch:
+            url = Url(url=f"{server.url}/page", timeout=1)
+            url.__check_url__()
+        assert fetch.call_count == 1
+        assert url.request_error_class == RequestErrorClass.READ_TIMEOUT
+        assert url.ssl_error is False
+
+    def test_check_unresolvable_name_is_not_retried(self):
+        with patch.object(
+            Url, "__fetch__", autospec=True, side_effect=Url.__fetch__
+        ) as fetch:
+            url = Url(url="http://does-not-exist.invalid/page")
+            url.__check_url__()
+        assert fetch.call_count == 1
+        assert url.request_error_class in [
+            RequestErrorClass.DNS,
+            RequestErrorClass.DNS_TIMEOUT,
+        ]
+        assert url.dns_record_found is False
+
+    def test_check_certificate_error_is_retried_without_verification(self):
+        certificate_error = SSLError(
+            MaxRetryError(
+                pool=None,
+                url="/",
+                reason=Urllib3SSLError(
+                    ssl.SSLCertVerificationError("certificate verify failed")
+                ),
+            )
+        )
+        with patch.object(
+            Url, "__fetch__", autospec=True, side_effect=[certificate_error, None]
+        ) as fetch:
+            url = Url(url="https://self-signed.example.com/")
+            url.__check_url__()
+        assert fetch.call_count == 2
+        assert fetch.call_args_list[0].kwargs == {"verify": True}
+        assert fetch.call_args_list[1].kwargs == {"verify": False}
+        assert url.ssl_error is True
+        assert url.request_error is False
+        assert url.request_error_class is None
@@ -0,0 +1,205 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import time
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.api.handlers.pdf import PdfHandler
+from src.models.api.handlers.xhtml import XhtmlHandler
+from src.models.api.job.check_url_job import UrlJob
+from src.models.file_io.document_store import DocumentStore, document_store
+from src.models.identifiers_checking.url import Url
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+pdf = Path("test_data/FFO-FLASH-REPORT-REV.pdf").read_bytes()
+html = b'<html><body><p>A page about <a href="https://example.com">it</a></p></body></html>'
+
+
+class DocumentHandler(QuietHandler):
+    paths: list = []
+
+    def do_GET(self):  # noqa: N802
+        self.paths.append(self.path)
+        if self.path.endswith(".pdf"):
+            content_type, body = "application/pdf", pdf
+        else:
+            content_type, body = "text/html", html
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestDocumentStore(TestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.store = DocumentStore(directory=self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_put_and_get(self):
+        assert self.store.get(url="https://example.com/a") is None
+        self.store.put(
+            url="https://example.com/a",
+            status_code=200,
+            headers={"Content-Type": "text/html"},
+            content=html,
+        )
+        document = self.store.get(url="https://example.com/a")
+        assert document.status_code == 200
+        assert document.headers == {"Content-Type": "text/html"}
+        assert document.size == len(html)
+        assert self.store.read(document=document) == html
+
+    def test_identical_documents_are_stored_once(self):
+        for url in ["https://example.com/a", "https://example.org/b"]:
+            self.store.put(url=url, status_code=200, headers={}, content=html)
+        self.store.put(
+            url="https://example.com/c",
+            status_code=200,
+            headers={},
+            content=Path("test_data/FFO-FLASH-REPORT-REV.pdf"),
+        )
+        blobs = [
+            path
+            for path in Path(self.directory.name, "blobs").rglob("*")
+            if path.is_file()
+        ]
+        assert len(blobs) == 2
+        assert self.store.read(self.store.get(url="https://example.com/c")) == pdf
+        assert (
+            self.store.get(url="https://example.com/a").path
+            == self.store.get(url="https://example.org/b").path
+        )
+
+    def test_stale_documents_are_not_returned(self):
+        self.store.put(
+            url="https://example.com/a", status_code=200, headers={}, content=html
+        )
+        with patch.object(config, "document_store_max_age_seconds", new=-1):
+            assert self.store.get(url="https://example.com/a") is None
+
+    def test_store_without_directory_does_nothing(self):
+        store = DocumentStore(directory=f"{self.directory.name}/missing")
+        assert (
+            store.put(
+                url="https://example.com/a", status_code=200, headers={}, content=html
+            )
+            is None
+        )
+        assert store.get(url="https://example.com/a") is None
+
+    def __put__(self, url: str, content: bytes, fetched: float = 0.0) -> None:
+        self.store.put(url=url, status_code=200, headers={}, content=content)
+        if fetched:
+            record_path = self.store.__get_record_path__(url=url)
+            record = json.loads(record_path.read_text())
+            record["fetched"] = fetched
+            record_path.write_text(json.dumps(record))
+
+    def __get_blobs__(self) -> List[Path]:
+        return [
+            path
+            for path in Path(self.directory.name, "blobs").rglob("*")
+            if path.is_file()
+        ]
+
+    def test_prune_removes_expired_records_and_orphaned_blobs(self):
+        expired = time() - config.document_store_max_age_seconds - 1
+        self.__put__(url="https://example.com/old", content=b"old", fetched=expired)
+        self.__put__(url="https://example.com/shared", content=html)
+        self.__put__(
+            url="https://example.com/shared-old", content=html, fetched=expired
+        )
+        self.__put__(url="https://example.com/new", content=b"new")
+        with patch.object(config, "document_store_prune_grace_seconds", new=-1):
+            self.store.prune()
+        assert self.store.get(url="https://example.com/shared") is not None
+        assert self.store.get(url="https://example.com/new") is not None
+        records = list(Path(self.directory.name, "urls").glob("*"))
+        assert len(records) == 2
+        # The blob of the old document is gone, the shared one is still used
+        assert len(self.__get_blobs__()) == 2
+
+    def test_young_orphans_are_kept(self):
+        expired = time() - config.document_store_max_age_seconds - 1
+        self.__put__(url="https://example.com/old", content=b"old", fetched=expired)
+        self.store.prune()
+        assert list(Path(self.directory.name, "urls").glob("*")) == []
+        # The blob may belong to a record that is being written
+        assert len(self.__get_blobs__()) == 1
+
+    def test_prune_removes_the_oldest_documents_above_the_size_limit(self):
+        for number in range(4):
+            self.__put__(
+                url=f"https://example.com/{number}",
+                content=bytes([number]) * 100,
+                fetched=time() - 100 + number,
+            )
+        with patch.object(config, "document_store_max_bytes", new=250):
+            self.store.prune()
+        assert self.store.get(url="https://example.com/0") is None
+        assert self.store.get(url="https://example.com/1") is None
+        assert self.store.get(url="https://example.com/2") is not None
+        assert self.store.get(url="https://example.com/3") is not None
+        assert len(self.__get_blobs__()) == 2
+
+    def test_put_prunes_when_due(self):
+        expired = time() - config.document_store_max_age_seconds - 1
+        self.__put__(url="https://example.com/old", content=b"old", fetched=expired)
+        self.__put__(url="https://example.com/new", content=b"new")
+        assert self.store.get(url="https://example.com/new") is not None
+        assert len(list(Path(self.directory.name, "urls").glob("*"))) == 2
+        with patch.object(config, "document_store_prune_interval_seconds", new=0):
+            self.__put__(url="https://example.com/newer", content=b"newer")
+        assert len(list(Path(self.directory.name, "urls").glob("*"))) == 2
+
+
+class TestDocumentSharing(TestCase):
+    """The endpoints fetch a URL once and share it through the store"""
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.patcher = patch.object(
+            document_store, "directory", new=self.directory.name
+        )
+        self.patcher.start()
+        DocumentHandler.paths = []
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.directory.cleanup()
+
+    def test_check_url_then_xhtml(self):
+        with LocalServer(handler=DocumentHandler) as server:
+            url = Url(url=f"{server.url}/page.html")
+            url.check(testdeadlink=False)
+            assert url.from_document_store is False
+            handler = XhtmlHandler(job=UrlJob(url=f"{server.url}/page.html"))
+            handler.download_and_extract()
+            again = Url(url=f"{server.url}/page.html")
+            again.check(testdeadlink=False)
+        assert DocumentHandler.paths == ["/page.html"]
+        assert handler.__total_number_of_links__ == 1
+        assert again.from_document_store is True
+        assert again.status_code == 200
+        assert again.text == url.text
+
+    def test_pdf_is_fetched_once_unless_refreshed(self):
+        with LocalServer(handler=DocumentHandler) as server, patch.object(
+            config, "pdf_spool_threshold_bytes", new=100_000
+        ):
+            for refresh in [False, False, True]:
+                with PdfHandler(
+                    job=UrlJob(url=f"{server.url}/report.pdf", refresh=refresh)
+                ) as handler:
+                    handler.download_and_extract()
+                    assert handler.number_of_links_from_annotations == 9
+                # The stored file is not deleted with the handler
+                assert handler.spool_path == ""
+        assert DocumentHandler.paths == ["/report.pdf", "/report.pdf"]
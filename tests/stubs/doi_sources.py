@@ -0,0 +1,171 @@
+"""Local stand-ins for the sources we look up DOIs in"""
+import json
+import re
+from contextlib import contextmanager
+from time import sleep
+from typing import Any, Dict, Iterator, List, Optional
+from unittest.mock import patch
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import config
+from tests.stubs.local_server import LocalServer, QuietHandler
+
+retracted_item = "Q45182324"
+scholarly_article = "Q13442814"
+
+
+class DoiSourcesHandler(QuietHandler):
+    """Answers like OpenAlex, Wikidata, Internet Archive Scholar and fatcat
+
+    The works are keyed by the lowercased DOI, Wikidata has them upper-cased.
+    Every request is recorded
+    on the class together with the source it was meant for."""
+
+    works: Dict[str, Dict[str, Any]] = {
+        "10.1234/retracted": {"qid": "Q1", "retracted": True},
+        "10.1234/plain": {"qid": "Q2", "retracted": False},
+    }
+    requests: List[str] = []
+    # Seconds to wait before answering per source
+    delays: Dict[str, float] = {}
+    # Status codes to answer with per source instead of the data
+    failures: Dict[str, int] = {}
+
+    @classmethod
+    def reset(cls) -> None:
+        cls.requests = []
+        cls.delays = {}
+        cls.failures = {}
+
+    def __get_work_by_qid__(self, qid: str) -> Dict[str, Any]:
+        for doi, work in self.works.items():
+            if work["qid"] == qid:
+                return {"doi": doi, **work}
+        return {}
+
+    def __answer__(self, source: str, data: Any) -> None:
+        type(self).requests.append(source)
+        sleep(self.delays.get(source, 0))
+        status_code = self.failures.get(source, 200 if data is not None else 404)
+        body = json.dumps(data if status_code == 200 else {"error": "stub"}).encode()
+        try:
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting
+            pass
+
+    def do_GET(self):  # noqa: N802
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if parts.path.startswith("/works/https://doi.org/"):
+            doi = unquote(parts.path.replace("/works/https://doi.org/", "")).lower()
+            self.__answer__(source="openalex", data=self.__get_work__(doi=doi))
+        elif parts.path == "/works":
+            dois = query["filter"].replace("doi:", "", 1).lower().split("|")
+            results = [self.__get_work__(doi=doi) for doi in dois]
+            self.__answer__(
+                source="openalex",
+                data={"results": [work for work in results if work]},
+            )
+        elif parts.path == "/sparql":
+            self.__answer__(
+                source="wikidata", data=self.__get_sparql_results__(query["query"])
+            )
+        elif parts.path == "/search":
+            doi = query["q"].replace("doi:", "").lower()
+            results = [{"doi": doi}] if doi in self.works else []
+            self.__answer__(
+                source="internet_archive_scholar",
+                data={"count_returned": len(results), "results": results},
+            )
+        elif parts.path == "/release/lookup":
+            work = self.works.get(query["doi"])
+            self.__answer__(
+                source="fatcat",
+                data={"ident": f"fatcat{work['qid']}"} if work else None,
+            )
+        else:
+            self.__answer__(source="unknown", data=None)
+
+    def __get_work__(self, doi: str) -> Optional[Dict[str, Any]]:
+        work = self.works.get(doi)
+        if not work:
+            return None
+        return {
+            "id": f"https://openalex.org/W{work['qid'][1:]}",
+            "doi": f"https://doi.org/{doi}",
+            "is_retracted": work["retracted"],
+        }
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers["Content-Length"])
+        form = {
+            key: values[0]
+            for key, values in parse_qs(self.rfile.read(length).decode()).items()
+        }
+        if form.get("list") == "search":
+            # e.g. haswbstatement:P356=10.1234/a|P356=10.1234/b
+            terms = form["srsearch"].replace("haswbstatement:", "").split("|")
+            # Like Wikidata the values are matched exactly and stored upper-cased
+            qids = [
+                work["qid"]
+                for doi, work in self.works.items()
+                if f"P356={doi.upper()}" in terms
+            ]
+            results = [{"ns": 0, "title": qid} for qid in qids]
+            self.__answer__(source="wikidata", data={"query": {"search": results}})
+        elif form.get("action") == "wbgetclaims":
+            work = self.__get_work_by_qid__(qid=form["entity"])
+            claims = [
+                {
+                    "mainsnak": {
+                        "snaktype": "value",
+                        "property": "P31",
+                        "datavalue": {"value": {"id": item}},
+                    }
+                }
+                for item in self.__get_instance_of__(work=work)
+            ]
+            self.__answer__(source="wikidata", data={"claims": {"P31": claims}})
+        else:
+            self.__answer__(source="unknown", data=None)
+
+    @staticmethod
+    def __get_instance_of__(work: Dict[str, Any]) -> List[str]:
+        return [scholarly_article] + ([retracted_item] if work["retracted"] else [])
+
+    def __get_sparql_results__(self, query: str) -> Dict[str, Any]:
+        rows = []
+        for qid in re.findall(r"wd:(Q\d+)", query):
+            work = self.__get_work_by_qid__(qid=qid)
+            for item in self.__get_instance_of__(work=work):
+                rows.append(
+                    {
+                        "item": {"value": f"http://www.wikidata.org/entity/{qid}"},
+                        # Wikidata has the DOIs in upper case
+                        "doi": {"value": work["doi"].upper()},
+                        "instance_of": {
+                            "value": f"http://www.wikidata.org/entity/{item}"
+                        },
+                    }
+                )
+        return {"results": {"bindings": rows}}
+
+
+@contextmanager
+def local_doi_sources() -> Iterator[LocalServer]:
+    """Point the DOI lookup at the stand-ins"""
+    DoiSourcesHandler.reset()
+    with LocalServer(handler=DoiSourcesHandler) as server, patch.multiple(
+        config,
+        openalex_api_url=server.url,
+        wikidata_api_url=f"{server.url}/w/api.php",
+        wikidata_sparql_url=f"{server.url}/sparql",
+        internet_archive_scholar_url=server.url,
+        fatcat_api_url=server.url,
+    ):
+        yield server
@@ -0,0 +1,88 @@
+"""A local DNS server for tests that must not depend on the internet"""
+import socketserver
+import threading
+from collections import Counter
+from time import sleep
+from typing import Dict, Tuple
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.rrset
+
+
+class FakeDnsServer:
+    """Answer A and AAAA queries from the records and NXDOMAIN for everything else
+
+    A record with an empty address exists but has no addresses.
+
+    Use it as a context manager:
+        with FakeDnsServer(records={"example.com": ("192.0.2.1", 60)}) as server:
+            server.resolver.resolve("example.com")
+    """
+
+    def __init__(
+        self,
+        records: Dict[str, Tuple[str, int]],
+        negative_ttl: int = 30,
+        delay: float = 0.0,
+    ):
+        self.records = records
+        self.negative_ttl = negative_ttl
+        self.delay = delay
+        self.queries: Counter = Counter()
+        fake = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                data, sock = self.request
+                sock.sendto(fake.answer(data), self.client_address)
+
+        self.server = socketserver.ThreadingUDPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def resolver(self) -> dns.resolver.Resolver:
+        resolver = dns.resolver.Resolver(configure=False)
+        resolver.nameservers = ["127.0.0.1"]
+        resolver.port = self.server.server_address[1]
+        resolver.lifetime = 2
+        return resolver
+
+    def answer(self, data: bytes) -> bytes:
+        query = dns.message.from_wire(data)
+        question = query.question[0]
+        name = question.name.to_text(omit_final_dot=True)
+        self.queries[name] += 1
+        sleep(self.delay)
+        response = dns.message.make_response(query)
+        if name in self.records:
+            address, ttl = self.records[name]
+            # IPv6 addresses answer AAAA queries, A queries get no answer
+            record_type = "AAAA" if ":" in address else "A"
+            if address and question.rdtype == dns.rdatatype.from_text(record_type):
+                response.answer.append(
+                    dns.rrset.from_text(question.name, ttl, "IN", record_type, address)
+                )
+        else:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+            response.authority.append(
+                dns.rrset.from_text(
+                    ".",
+                    self.negative_ttl,
+                    "IN",
+                    "SOA",
+                    f"ns.test. hostmaster.test. 1 3600 600 86400 {self.negative_ttl}",
+                )
+            )
+        return response.to_wire()
+
+    def __enter__(self) -> "FakeDnsServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.shutdown()
+        self.server.server_close()
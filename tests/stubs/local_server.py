@@ -0,0 +1,36 @@
+"""A local HTTP server for tests that must not depend on the internet"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Type
+
+
+class LocalServer:
+    """Serve the handler on a free port on localhost in a background thread
+
+    Use it as a context manager:
+        with LocalServer(handler=MyHandler) as server:
+            requests.get(f"{server.url}/path")
+    """
+
+    def __init__(self, handler: Type[BaseHTTPRequestHandler]):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self) -> "LocalServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Base handler that does not log every request to stderr"""
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
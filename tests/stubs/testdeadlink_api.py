@@ -0,0 +1,48 @@
+"""A local stand-in for https://iabot-api.archive.org/testdeadlink.php"""
+import json
+import threading
+from time import sleep
+from typing import List
+from urllib.parse import parse_qs
+
+from tests.stubs.local_server import QuietHandler
+
+
+class TestdeadlinkApiHandler(QuietHandler):
+    """Answers 404 for URLs containing "dead" and 200 for everything else
+
+    The requests are recorded on the class so tests can inspect them"""
+
+    __test__ = False  # This is not a test class for pytest
+
+    requests: List[List[str]] = []
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    delay = 0.1
+
+    @classmethod
+    def reset(cls) -> None:
+        cls.requests = []
+        cls.in_flight = 0
+        cls.max_in_flight = 0
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers["Content-Length"])
+        form = parse_qs(self.rfile.read(length).decode())
+        urls = form["urls"][0].split("\n")
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append(urls)
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        # Give the other chunks a chance to arrive while this one is in flight
+        sleep(cls.delay)
+        results = {url: 404 if "dead" in url else 200 for url in urls}
+        body = json.dumps({"results": results, "errors": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+        with cls.lock:
+            cls.in_flight -= 1
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+from src.helpers.preload import heavy_modules
+
+
+class TestPreload(TestCase):
+    @staticmethod
+    def __get_loaded_heavy_modules__(code: str):
+        """Run the code in a fresh interpreter and return the heavy modules it loaded"""
+        script = (
+            f"import sys\n{code}\n"
+            f"print([module for module in {heavy_modules} if module in sys.modules])"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script],  # noqa: S603
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return output.strip().splitlines()[-1]
+
+    def test_importing_the_app_does_not_load_heavy_modules(self):
+        assert self.__get_loaded_heavy_modules__(code="import wsgi") == "[]"
+
+    def test_preload_loads_heavy_modules(self):
+        loaded = self.__get_loaded_heavy_modules__(
+            code="import wsgi\nfrom src.helpers.preload import preload\npreload()"
+        )
+        assert loaded == str(heavy_modules)
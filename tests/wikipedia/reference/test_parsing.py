@@ -0,0 +1,92 @@
+from time import monotonic, perf_counter
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.models.api.deadline import Deadline
+from src.models.api.job.article_job import ArticleJob
+from src.models.exceptions import DeadlineExceededError, WikitextTooComplexError
+from src.models.wikimedia.wikipedia.reference.extractor import (
+    WikipediaReferenceExtractor,
+)
+from src.models.wikimedia.wikipedia.reference.parsing import (
+    check_complexity,
+    get_template_depth,
+    parse_wikitext,
+)
+
+# Synthetic pathological inputs, both take mwparserfromhell many seconds
+unclosed_templates = "{{cite web|title=" * 5000
+unclosed_external_links = "[http://example.com " * 8000
+references = "".join(
+    f"<ref>{{{{cite web|url=http://a.b/{n}}}}}</ref>" for n in range(5)
+)
+
+
+class TestParsing(TestCase):
+    def test_template_depth(self):
+        assert get_template_depth(wikitext="no templates") == 0
+        assert get_template_depth(wikitext="{{a}} {{b|{{c}}}} {{d}}") == 2
+        assert get_template_depth(wikitext="}} {{a") == 1
+        assert get_template_depth(wikitext=unclosed_templates) == 5000
+
+    def test_check_complexity(self):
+        check_complexity(wikitext=references)
+        with self.assertRaises(WikitextTooComplexError):
+            check_complexity(wikitext=unclosed_templates)
+        with patch.object(
+            config, "wikitext_max_characters", new=100
+        ), self.assertRaises(WikitextTooComplexError):
+            check_complexity(wikitext="a" * 101)
+
+    def test_extractor_refuses_deep_templates(self):
+        extractor = WikipediaReferenceExtractor(
+            testing=True,
+            wikitext=f"Text<ref>{unclosed_templates}</ref>",
+            job=ArticleJob(regex="bibliography"),
+        )
+        start = perf_counter()
+        with self.assertRaises(WikitextTooComplexError):
+            extractor.extract_all_references()
+        assert perf_counter() - start < 1
+
+    def test_max_references(self):
+        job = ArticleJob(regex="bibliography")
+        extractor = WikipediaReferenceExtractor(
+            testing=True,
+            wikitext=f"Text{references}\n==Notes==\n{references}\n==More==\n{references}",
+            job=job,
+        )
+        with patch.object(config, "wikitext_max_references", new=7):
+            extractor.extract_all_references()
+        assert extractor.number_of_references == 7
+        assert job.deadline.incomplete_stages == ["extract"]
+
+
+class TestParsingInSubprocess(TestCase):
+    def setUp(self):
+        self.patcher = patch.object(config, "wikitext_parse_in_subprocess", new=True)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_same_result(self):
+        wikitext = f"Text{references}\n==Notes==\n* {{{{cite book|title=A}}}}"
+        wikicode = parse_wikitext(wikitext=wikitext, deadline=Deadline())
+        assert str(wikicode) == wikitext
+        assert len(wikicode.filter_tags(matches=lambda tag: tag.tag == "ref")) == 5
+
+    def test_cpu_time_limit(self):
+        start = perf_counter()
+        with patch.object(
+            config, "wikitext_parse_max_cpu_seconds", new=1
+        ), self.assertRaises(WikitextTooComplexError):
+            parse_wikitext(wikitext=unclosed_external_links, deadline=Deadline())
+        assert perf_counter() - start < 5
+
+    def test_deadline(self):
+        deadline = Deadline(seconds=0.5, start=monotonic())
+        with self.assertRaises(DeadlineExceededError):
+            parse_wikitext(wikitext=unclosed_external_links, deadline=deadline)
+        assert deadline.expired
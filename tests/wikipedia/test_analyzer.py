@@ -38,6 +38,7 @@ class TestWikipediaAnalyzer(TestCase):
         data["revision_timestamp"] = 0
         data["reference_statistics"] = {}
         data["ores_score"] = {}
+        data["timing"] = {}
         # print(data)
         dictionary = ArticleStatistics(
             page_id=11089416,
@@ -61,6 +62,7 @@ class TestWikipediaAnalyzer(TestCase):
         data["reference_statistics"] = {}
         data["ores_score"] = {}
         data["isodate"] = ""
+        data["timing"] = {}
         # print(data)
         dictionary = ArticleStatistics(
             page_id=11089416,